@@ -0,0 +1,133 @@
+import asyncio
+import collections
+import contextlib
+import contextvars
+import os
+import time
+from typing import Any, AsyncIterator, Deque, Dict, Hashable, Optional
+
+from delivery import TokenBuckets
+
+# OpenAI requests in flight at once, across all users
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+# Requests waiting for a slot before new ones are turned away with a busy reply
+LLM_QUEUE_LIMIT = int(os.getenv('LLM_QUEUE_LIMIT', '32'))
+# Sustained OpenAI requests per second for one user, and how many they may burst
+LLM_USER_RATE = float(os.getenv('LLM_USER_RATE', '0.5'))
+LLM_USER_BURST = int(os.getenv('LLM_USER_BURST', '6'))
+
+_current_user: contextvars.ContextVar[Optional[Hashable]] = contextvars.ContextVar('llm_user', default=None)
+
+
+def set_current_user(user_id: Optional[Hashable]):
+    """Attribute the OpenAI calls made from the current task (and tasks it starts) to `user_id`."""
+    _current_user.set(user_id)
+
+
+class AdmissionRejected(Exception):
+    """Raised instead of queueing an OpenAI call. `reason` is 'busy' or 'rate_limited'."""
+
+    def __init__(self, reason: str):
+        super().__init__(f'OpenAI call not admitted: {reason}')
+        self.reason = reason
+
+
+class AdmissionController:
+    """Caps concurrent OpenAI calls and shares the slots fairly between users.
+
+    Each user has a token bucket; a call over the user's rate is rejected
+    at once. Calls beyond `max_concurrency` wait in per-user queues that are
+    served round-robin, so one user with many queued calls cannot hold back
+    the others. Once `queue_limit` calls are waiting, new ones are rejected
+    so replies stay fast instead of timing out. Calls made outside a user
+    (None) share one queue.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, queue_limit: int = LLM_QUEUE_LIMIT,
+                 user_rate: float = LLM_USER_RATE, user_burst: int = LLM_USER_BURST):
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_limit = queue_limit
+        self._buckets = TokenBuckets(user_rate, user_burst)
+        self._queues: Dict[Optional[Hashable], Deque[asyncio.Future]] = {}
+        self._order: Deque[Optional[Hashable]] = collections.deque()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.rate_limited = 0
+        self.queue_seconds = 0.0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, user: Optional[Hashable] = None) -> AsyncIterator[None]:
+        """Hold one of the concurrent slots; `user` defaults to set_current_user()'s."""
+        if user is None:
+            user = _current_user.get()
+        if user is not None and not self._buckets.get(user).try_acquire():
+            self.rate_limited += 1
+            raise AdmissionRejected('rate_limited')
+        await self._acquire(user)
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, user: Optional[Hashable]):
+        if self.active < self.max_concurrency and not self.waiting:
+            self.active += 1
+            return
+        if self.waiting >= self.queue_limit:
+            self.shed += 1
+            raise AdmissionRejected('busy')
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(user)
+        if queue is None:
+            queue = self._queues[user] = collections.deque()
+            self._order.append(user)
+        queue.append(future)
+        self.waiting += 1
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self._release()
+            elif future in queue:
+                queue.remove(future)
+                self.waiting -= 1
+                if not queue and self._queues.get(user) is queue:
+                    del self._queues[user]
+                    self._order.remove(user)
+            raise
+        finally:
+            self.queue_seconds += time.monotonic() - started
+
+    def _release(self):
+        """Hand the slot to the next user in round-robin order, or free it."""
+        while self._order:
+            user = self._order.popleft()
+            queue = self._queues[user]
+            future = queue.popleft()
+            self.waiting -= 1
+            if queue:
+                self._order.append(user)
+            else:
+                del self._queues[user]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'shed': self.shed,
+            'rate_limited': self.rate_limited,
+            'avg_queue_ms': self.queue_seconds / self.queued * 1000 if self.queued else 0.0,
+        }
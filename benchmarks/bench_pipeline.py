@@ -0,0 +1,256 @@
+"""Offline load test of the full message pipeline, from Update to reply.
+
+Usage:
+    python benchmarks/bench_pipeline.py --messages 5000 --concurrency 50 --openai-latency 0.4 --output pipeline.json
+    python benchmarks/bench_pipeline.py --recordings openai.jsonl --telegram-latency 0.05
+
+Pushes synthetic Telegram updates through messaging.process_message (the
+pipeline behind the per-chat debounce, so every update is timed). OpenAI is
+the local FakeOpenAIServer from replay.py, which replays a capture made with
+OPENAI_RECORD_PATH or synthesizes answers. Telegram is replay.FakeBot, and the
+database is a temporary SQLite file. Reports p50/p99 latency per message kind,
+event-loop lag and time spent holding database connections, as JSON like
+bench_reminders.py. Needs no network access.
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz  # noqa: E402
+from telegram import Update  # noqa: E402
+
+import intents  # noqa: E402
+import messaging  # noqa: E402
+import reminders  # noqa: E402
+from admission import AdmissionController  # noqa: E402
+from benchmarks.bench_reminders import git_commit, latency_summary  # noqa: E402
+from benchmarks.replay import FakeBot, FakeOpenAIServer, Latency, ReplayStore  # noqa: E402
+from cache import TTLCache  # noqa: E402
+from llm_metrics import LLMMetrics  # noqa: E402
+from memory import ConversationMemory  # noqa: E402
+from storage import get_pool  # noqa: E402
+from transport import OpenAITransport  # noqa: E402
+
+TASKS = ('call mom', 'buy milk', 'water the plants', 'pay rent', 'stretch', 'book the dentist')
+# (kind, weight, templates); kinds are the intent each message is written to have
+MESSAGE_MIX = (
+    ('REMINDER', 40, ('Remind me to {task} at {hour}pm tomorrow', 'remind me to {task} in {n} minutes',
+                      "don't let me forget to {task} on friday", 'I need to {task}, remind me at {hour}')),
+    ('LIST_REMINDERS', 15, ('list my reminders', 'What reminders do I have?')),
+    ('EDIT_REMINDER', 5, ('change reminder {n} to {task}',)),
+    ('DELETE_REMINDER', 10, ('delete reminder {n}', 'remove the {task} reminder')),
+    ('CHAT', 30, ('Recommend a book', 'What should I cook tonight?', 'thanks!', 'Tell me a fun fact about {task}')),
+)
+LAG_INTERVAL_SECONDS = 0.01
+
+
+def synthetic_messages(count: int, users: int, rng: random.Random):
+    """(kind, user_id, text) tuples drawn from MESSAGE_MIX."""
+    kinds = [kind for kind, _, _ in MESSAGE_MIX]
+    weights = [weight for _, weight, _ in MESSAGE_MIX]
+    templates = {kind: options for kind, _, options in MESSAGE_MIX}
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        text = rng.choice(templates[kind]).format(
+            task=rng.choice(TASKS), hour=rng.randint(1, 11), n=rng.randint(1, 50),
+        )
+        yield kind, rng.randrange(users), text
+
+
+def build_update(update_id: int, user_id: int, text: str, bot) -> Update:
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'Load {user_id}'},
+            'text': text,
+        },
+    }, bot)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps `interval` seconds."""
+
+    def __init__(self, interval: float = LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def time_pool(pool) -> Dict[str, List[float]]:
+    """Wrap the pool's read()/write() so every borrow records how long it was held (lock waits included)."""
+    timings = {'read': [], 'write': []}
+    for name in timings:
+        borrow = getattr(pool, name)
+
+        @contextlib.asynccontextmanager
+        async def timed(borrow=borrow, samples=timings[name]):
+            started = time.perf_counter()
+            try:
+                async with borrow() as db:
+                    yield db
+            finally:
+                samples.append(time.perf_counter() - started)
+
+        setattr(pool, name, timed)
+    return timings
+
+
+def fresh_state(base_url: str) -> Dict:
+    """New caches, counters, memory and an OpenAI transport pointed at the fake server.
+
+    Returned as {attribute: value} for intents, so a run starts cold and
+    leaves the module as it found it.
+    """
+    return {
+        'openai_transport': OpenAITransport(api_key='replay', base_url=base_url, record_path=None),
+        'openai_admission': AdmissionController(),
+        '_intent_cache': TTLCache(intents.RESPONSE_CACHE_SIZE, intents.INTENT_CACHE_TTL_SECONDS),
+        '_chat_cache': TTLCache(intents.RESPONSE_CACHE_SIZE, intents.CHAT_CACHE_TTL_SECONDS),
+        '_intent_counts': collections.Counter(),
+        'conversation_memory': ConversationMemory(intents.summarize_conversation),
+        'llm_metrics': LLMMetrics(),
+    }
+
+
+async def run_pipeline(messages: int, users: int, concurrency: int, db_path: str,
+                       recordings: Optional[str] = None, openai_latency: float = 0.0, openai_jitter: float = 0.0,
+                       chunk_latency: float = 0.0, telegram_latency: float = 0.0, seed_value: int = 0) -> Dict:
+    rng = random.Random(seed_value)
+    store = ReplayStore.load(recordings)
+    server = FakeOpenAIServer(store, Latency(openai_latency, openai_jitter, seed_value), Latency(chunk_latency)).start()
+    bot = FakeBot(Latency(telegram_latency))
+    context = SimpleNamespace(bot=bot)
+
+    state = fresh_state(server.base_url)
+    original_db_path = reminders.DB_PATH
+    original_state = {name: getattr(intents, name) for name in state}
+    reminders.DB_PATH = db_path
+    for name, value in state.items():
+        setattr(intents, name, value)
+    by_kind: Dict[str, List[float]] = {}
+    errors = 0
+    lag = LoopLagMonitor()
+    try:
+        await reminders.init_db()
+        db_timings = time_pool(get_pool())
+        await state['openai_transport'].warmup()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def handle(update_id: int, kind: str, user_id: int, text: str):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await messaging.process_message(text, (build_update(update_id, user_id, text, bot), context))
+                except Exception as exc:
+                    errors += 1
+                    print(f'Handler error for {text!r}: {exc}', file=sys.stderr)
+                by_kind.setdefault(kind, []).append(time.perf_counter() - started)
+
+        lag.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            handle(update_id, kind, user_id, text)
+            for update_id, (kind, user_id, text) in enumerate(synthetic_messages(messages, users, rng), 1)
+        ))
+        elapsed = time.perf_counter() - started
+        await lag.stop()
+        await state['conversation_memory'].drain()
+        routing = intents.get_intent_stats()
+    finally:
+        await state['openai_transport'].close()
+        await reminders.close_db()
+        server.stop()
+        reminders.DB_PATH = original_db_path
+        for name, value in original_state.items():
+            setattr(intents, name, value)
+
+    all_samples = [sample for samples in by_kind.values() for sample in samples]
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now(pytz.UTC).isoformat(),
+            'commit': git_commit(),
+            'params': {
+                'messages': messages, 'users': users, 'concurrency': concurrency, 'recordings': recordings,
+                'recorded_responses': len(store), 'openai_latency': openai_latency, 'openai_jitter': openai_jitter,
+                'chunk_latency': chunk_latency, 'telegram_latency': telegram_latency, 'seed': seed_value,
+            },
+        },
+        'results': {
+            'seconds': elapsed,
+            'messages_per_second': messages / elapsed if elapsed else 0.0,
+            'errors': errors,
+            'latency': latency_summary(all_samples),
+            'latency_by_kind': {kind: latency_summary(samples) for kind, samples in sorted(by_kind.items())},
+            'event_loop_lag': latency_summary(lag.samples),
+            'db': {
+                name: dict(latency_summary(samples), total_seconds=sum(samples))
+                for name, samples in db_timings.items()
+            },
+            'openai': {'requests': server.requests, 'replayed': store.hits, 'synthesized': store.misses},
+            'admission': state['openai_admission'].stats(),
+            'telegram': bot.stats(),
+            'intent_routing': routing,
+            'llm_calls': state['llm_metrics'].snapshot(),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the message pipeline against fake OpenAI and Telegram')
+    parser.add_argument('--messages', type=int, default=2_000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50, help='updates handled at the same time')
+    parser.add_argument('--recordings', help='JSONL captured with OPENAI_RECORD_PATH')
+    parser.add_argument('--openai-latency', type=float, default=0.3, help='seconds before each OpenAI response')
+    parser.add_argument('--openai-jitter', type=float, default=0.1)
+    parser.add_argument('--chunk-latency', type=float, default=0.02, help='seconds between streamed chunks')
+    parser.add_argument('--telegram-latency', type=float, default=0.05, help='seconds per Telegram API call')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        report = asyncio.run(run_pipeline(
+            args.messages, args.users, args.concurrency, os.path.join(tmpdir, 'pipeline.db'),
+            args.recordings, args.openai_latency, args.openai_jitter, args.chunk_latency,
+            args.telegram_latency, args.seed,
+        ))
+
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(payload + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""Offline benchmark for reminders.py against a synthetic SQLite database.
+
+Usage:
+    python benchmarks/bench_reminders.py --users 10000 --reminders 1000000 --output bench.json
+
+Seeds N users and M future reminders into a temporary database, then measures
+add_reminder throughput, list_reminders and move_due_to_outbox latency, and
+the database cost of a top-of-hour spike. Prints and optionally writes JSON so
+runs can be compared across commits. Needs no Telegram or OpenAI access.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz  # noqa: E402
+
+import reminders  # noqa: E402
+from storage import get_pool  # noqa: E402
+
+TIMEZONES = ('UTC', 'America/Chicago', 'America/New_York', 'Europe/London', 'Asia/Tokyo')
+REPEATS = (None, None, None, 'daily', 'weekly', 'weekdays')
+SEED_CHUNK = 50_000
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """p50/p99/max in milliseconds for samples measured in seconds."""
+    return {
+        'samples': len(samples),
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': max(samples, default=0.0) * 1000,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def seed(users: int, count: int, rng: random.Random):
+    """Insert users and future reminders directly, in large executemany batches."""
+    now = int(time.time())
+    async with get_pool().write() as db:
+        await db.executemany(
+            'INSERT INTO user_settings (user_id, timezone) VALUES (?, ?)',
+            [(user_id, rng.choice(TIMEZONES)) for user_id in range(users)],
+        )
+    for start in range(0, count, SEED_CHUNK):
+        rows = [
+            (
+                rng.randrange(users),
+                f'synthetic reminder {index}',
+                now + rng.randrange(3600, 30 * 86400),
+                rng.choice(REPEATS),
+                rng.choice(TIMEZONES),
+            )
+            for index in range(start, min(count, start + SEED_CHUNK))
+        ]
+        async with get_pool().write() as db:
+            await db.executemany(
+                'INSERT OR IGNORE INTO reminders (user_id, reminder_text, target_datetime, repeat_interval, timezone) VALUES (?, ?, ?, ?, ?)',
+                rows,
+            )
+
+
+async def insert_due(count: int, users: int, rng: random.Random, label: str):
+    """Insert reminders that are already due, bypassing add_reminder's past-time check."""
+    due_at = int(time.time()) - 1
+    rows = [
+        (rng.randrange(users), f'{label} {index} {rng.random()}', due_at, rng.choice(REPEATS), rng.choice(TIMEZONES))
+        for index in range(count)
+    ]
+    async with get_pool().write() as db:
+        await db.executemany(
+            'INSERT INTO reminders (user_id, reminder_text, target_datetime, repeat_interval, timezone) VALUES (?, ?, ?, ?, ?)',
+            rows,
+        )
+
+
+async def drain_outbox() -> int:
+    sent = 0
+    while True:
+        rows = await reminders.claim_outbox(1000)
+        if not rows:
+            return sent
+        await reminders.ack_outbox([outbox_id for outbox_id, _, _ in rows])
+        sent += len(rows)
+
+
+async def run_benchmark(users: int, count: int, adds: int, list_samples: int, due_samples: int,
+                        due_batch: int, spike: int, db_path: str, seed_value: int = 0) -> Dict:
+    rng = random.Random(seed_value)
+    original_db_path = reminders.DB_PATH
+    reminders.DB_PATH = db_path
+    results: Dict = {}
+    try:
+        await reminders.init_db()
+
+        started = time.perf_counter()
+        await seed(users, count, rng)
+        results['seed_seconds'] = time.perf_counter() - started
+
+        future = datetime.datetime.now(pytz.UTC) + datetime.timedelta(days=1)
+        started = time.perf_counter()
+        for index in range(adds):
+            await reminders.add_reminder(rng.randrange(users), f'bench add {index}', future)
+        elapsed = time.perf_counter() - started
+        results['add_reminder'] = {'count': adds, 'seconds': elapsed, 'ops_per_second': adds / elapsed if elapsed else 0.0}
+
+        samples = []
+        for _ in range(list_samples):
+            user_id = rng.randrange(users)
+            started = time.perf_counter()
+            await reminders.list_reminders(user_id)
+            samples.append(time.perf_counter() - started)
+        results['list_reminders'] = latency_summary(samples)
+
+        samples = []
+        for sample in range(due_samples):
+            await insert_due(due_batch, users, rng, f'due sample {sample}')
+            started = time.perf_counter()
+            await reminders.move_due_to_outbox()
+            samples.append(time.perf_counter() - started)
+            await drain_outbox()
+        results['move_due_to_outbox'] = dict(latency_summary(samples), due_per_sample=due_batch)
+
+        await insert_due(spike, users, rng, 'spike')
+        started = time.perf_counter()
+        moved = await reminders.move_due_to_outbox()
+        move_seconds = time.perf_counter() - started
+        sent = await drain_outbox()
+        total = time.perf_counter() - started
+        results['spike'] = {
+            'reminders': spike,
+            'moved': moved,
+            'acknowledged': sent,
+            'move_seconds': move_seconds,
+            'total_seconds': total,
+            'rows_per_second': sent / total if total else 0.0,
+        }
+        results['db_bytes'] = os.path.getsize(db_path)
+    finally:
+        await reminders.close_db()
+        reminders.DB_PATH = original_db_path
+
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now(pytz.UTC).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'params': {
+                'users': users, 'reminders': count, 'adds': adds, 'list_samples': list_samples,
+                'due_samples': due_samples, 'due_batch': due_batch, 'spike': spike, 'seed': seed_value,
+            },
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reminders.py against a synthetic SQLite database')
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--reminders', type=int, default=1_000_000)
+    parser.add_argument('--adds', type=int, default=2_000, help='add_reminder calls to time')
+    parser.add_argument('--list-samples', type=int, default=500)
+    parser.add_argument('--due-samples', type=int, default=200)
+    parser.add_argument('--due-batch', type=int, default=5, help='reminders due per move_due_to_outbox sample')
+    parser.add_argument('--spike', type=int, default=5_000, help='reminders due at the same instant')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help='database file to use (default: a temporary file)')
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = args.db or os.path.join(tmpdir, 'bench.db')
+        report = asyncio.run(run_benchmark(
+            args.users, args.reminders, args.adds, args.list_samples, args.due_samples,
+            args.due_batch, args.spike, db_path, args.seed,
+        ))
+
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(payload + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""Offline stand-ins for OpenAI and Telegram, used by bench_pipeline.py.
+
+FakeOpenAIServer is a local HTTP endpoint that speaks the chat completions
+API, so requests go through the real transport, SDK and httpx pool. It
+replays responses captured with OPENAI_RECORD_PATH (see transport.py) and
+matches them by the last user message. Messages that were never recorded
+get a synthetic answer: the local classifier's intent for function calls,
+and a short canned reply for chat. FakeBot records what the handlers send
+to Telegram. Both can add latency to every call.
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import normalize_key  # noqa: E402
+from classifier import classify_intent  # noqa: E402
+
+CANNED_CHAT_REPLY = 'Sounds good! Let me know if you want a reminder for that.'
+
+
+class Latency:
+    """Seconds to wait per call: `mean` with +/- `jitter` spread uniformly."""
+
+    def __init__(self, mean: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.mean = mean
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        if self.mean <= 0:
+            return 0.0
+        with self._lock:
+            return max(0.0, self.mean + self._rng.uniform(-self.jitter, self.jitter))
+
+
+def _last_user_text(request: Dict) -> str:
+    return next((m.get('content') or '' for m in reversed(request.get('messages') or []) if m.get('role') == 'user'), '')
+
+
+def _replay_key(request: Dict) -> Tuple[bool, str]:
+    """Recordings are matched on (function call or chat, last user message)."""
+    return bool(request.get('tools')), normalize_key(_last_user_text(request))
+
+
+class ReplayStore:
+    """Recorded responses by request; repeated requests cycle through their recordings."""
+
+    def __init__(self, entries=()):
+        self._entries: Dict[Tuple[bool, str], List[Dict]] = {}
+        self._cursors: Dict[Tuple[bool, str], itertools.cycle] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        for entry in entries:
+            self._entries.setdefault(_replay_key(entry['request']), []).append(entry)
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> 'ReplayStore':
+        if not path:
+            return cls()
+        with open(path, encoding='utf-8') as handle:
+            return cls(json.loads(line) for line in handle if line.strip())
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def find(self, request: Dict) -> Optional[Dict]:
+        key = _replay_key(request)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            cursor = self._cursors.setdefault(key, itertools.cycle(self._entries[key]))
+            return next(cursor)
+
+
+def synthesize(request: Dict) -> Dict:
+    """A plausible recorded entry for a request that was never captured."""
+    text = _last_user_text(request)
+    usage = {'prompt_tokens': sum(len(m.get('content') or '') for m in request.get('messages') or []) // 4,
+             'completion_tokens': 12}
+    if request.get('tools'):
+        intent, _ = classify_intent(text)
+        arguments = {'intent': intent}
+        if intent == 'REMINDER':
+            arguments.update(reminder_text=text[:60] or 'Reminder', date='tomorrow', time='09:00')
+        message = {
+            'role': 'assistant',
+            'content': None,
+            'tool_calls': [{'id': 'call_replay', 'type': 'function',
+                            'function': {'name': 'record_message', 'arguments': json.dumps(arguments)}}],
+        }
+    else:
+        message = {'role': 'assistant', 'content': CANNED_CHAT_REPLY}
+    response = {
+        'id': 'chatcmpl-replay', 'object': 'chat.completion', 'created': int(time.time()),
+        'model': request.get('model', 'replay'),
+        'choices': [{'index': 0, 'message': message, 'finish_reason': 'stop'}],
+        'usage': dict(usage, total_tokens=sum(usage.values())),
+    }
+    if not request.get('stream'):
+        return {'request': request, 'response': response}
+    words = CANNED_CHAT_REPLY.split(' ')
+    chunks = [
+        {'id': 'chatcmpl-replay', 'object': 'chat.completion.chunk', 'created': response['created'],
+         'model': response['model'],
+         'choices': [{'index': 0, 'delta': {'content': word if not index else ' ' + word}, 'finish_reason': None}]}
+        for index, word in enumerate(words)
+    ]
+    chunks.append({'id': 'chatcmpl-replay', 'object': 'chat.completion.chunk', 'created': response['created'],
+                   'model': response['model'], 'choices': [], 'usage': response['usage']})
+    return {'request': request, 'chunks': chunks}
+
+
+class FakeOpenAIServer:
+    """Serves /v1/chat/completions from a ReplayStore on 127.0.0.1.
+
+    `latency` is applied before the response (or the first streamed chunk),
+    `chunk_latency` between streamed chunks.
+    """
+
+    def __init__(self, store: ReplayStore, latency: Optional[Latency] = None,
+                 chunk_latency: Optional[Latency] = None, port: int = 0):
+        self.store = store
+        self.latency = latency or Latency()
+        self.chunk_latency = chunk_latency or Latency()
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self._send_json({'object': 'list', 'data': []})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                request = json.loads(body or b'{}')
+                server.requests += 1
+                entry = server.store.find(request) or synthesize(request)
+                time.sleep(server.latency.sample())
+                if request.get('stream'):
+                    self._send_stream(entry.get('chunks') or synthesize(request)['chunks'])
+                else:
+                    self._send_json(entry.get('response') or synthesize(dict(request, stream=False))['response'])
+
+            def _send_json(self, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, chunks):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for index, chunk in enumerate(chunks):
+                    if index:
+                        time.sleep(server.chunk_latency.sample())
+                    self._write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                self._write_chunk(b'data: [DONE]\n\n')
+                self.wfile.write(b'0\r\n\r\n')
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                return
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self) -> 'FakeOpenAIServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeMessage:
+    def __init__(self, message_id: int, chat_id: int, text: str):
+        self.message_id = message_id
+        self.chat_id = chat_id
+        self.text = text
+
+
+class FakeBot:
+    """Just enough of telegram.Bot for the message handlers, with per-call latency."""
+
+    # Read by telegram objects built with Update.de_json
+    defaults = None
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency()
+        self._ids = itertools.count(1)
+        self.sent = 0
+        self.edits = 0
+        self.actions = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.latency.sample())
+        self.sent += 1
+        return FakeMessage(next(self._ids), chat_id, text)
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        await asyncio.sleep(self.latency.sample())
+        self.edits += 1
+        return FakeMessage(message_id, chat_id, text)
+
+    async def delete_message(self, chat_id, message_id, **kwargs):
+        await asyncio.sleep(self.latency.sample())
+        return True
+
+    async def send_chat_action(self, chat_id, action, **kwargs):
+        await asyncio.sleep(self.latency.sample())
+        self.actions += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {'sent': self.sent, 'edits': self.edits, 'chat_actions': self.actions}
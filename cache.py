@@ -0,0 +1,222 @@
+import json
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry, with hit/miss counters."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max(1, max_size)
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self._data),
+            'max_size': self.max_size,
+        }
+
+
+def normalize_key(text: str) -> str:
+    """Cache key for a message: case, spacing and trailing punctuation do not matter."""
+    return ' '.join((text or '').lower().split()).rstrip(' .!?')
+
+
+class CacheBackend:
+    """Second tier behind TTLCache, e.g. on disk so entries survive restarts.
+
+    Values must be JSON-serializable. Implementations should be quick enough
+    to call from the event loop.
+    """
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, expires_at) for an unexpired entry, or None."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, expires_at: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache tier in a local SQLite file, e.g. on the Fly volume under /data."""
+
+    # Expired rows are deleted every this many writes
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        row = self._db.execute(
+            'SELECT value, expires_at FROM cache_entries WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key: str, value: Any, expires_at: float):
+        self._db.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), expires_at),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._db.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (time.time(),))
+
+    def delete(self, key: str):
+        self._db.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def close(self):
+        self._db.close()
+
+
+class TTLCache:
+    """LRU cache whose entries expire after `ttl` seconds, capped by count and approximate bytes.
+
+    With a backend, misses fall through to it and writes go to both tiers;
+    `namespace` keeps several caches apart in one backend.
+    """
+
+    def __init__(self, max_size: int, ttl: float, max_bytes: int = 0,
+                 backend: Optional[CacheBackend] = None, namespace: str = ''):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.expired = 0
+        self._backend = backend
+        self._namespace = namespace
+        self._bytes = 0
+        # key -> (value, expires_at, size)
+        self._data: 'OrderedDict[str, Tuple[Any, float, int]]' = OrderedDict()
+
+    def _backend_key(self, key: str) -> str:
+        return f'{self._namespace}:{key}' if self._namespace else key
+
+    def _store(self, key: str, value: Any, expires_at: float):
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        self._remove(key)
+        self._data[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._data) > self.max_size or (self.max_bytes and self._bytes > self.max_bytes and len(self._data) > 1):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def _remove(self, key: str):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        entry = self._data.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._remove(key)
+            self.expired += 1
+        if self._backend is not None:
+            try:
+                stored = self._backend.get(self._backend_key(key))
+            except Exception as exc:
+                print(f"Cache backend read failed: {exc}")
+                stored = None
+            if stored is not None:
+                self._store(key, stored[0], stored[1])
+                self.hits += 1
+                self.backend_hits += 1
+                return stored[0]
+        self.misses += 1
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._store(key, value, expires_at)
+        if self._backend is not None:
+            try:
+                self._backend.set(self._backend_key(key), value, expires_at)
+            except Exception as exc:
+                print(f"Cache backend write failed: {exc}")
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        self._remove(key)
+        if self._backend is not None:
+            self._backend.delete(self._backend_key(key))
+        return entry[0] if entry is not None else default
+
+    def clear(self):
+        """Empty the in-memory tier; the backend keeps its entries until they expire."""
+        self._data.clear()
+        self._bytes = 0
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[1] > time.time()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'backend_hits': self.backend_hits,
+            'expired': self.expired,
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+        }
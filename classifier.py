@@ -0,0 +1,64 @@
+import re
+from typing import Dict, Tuple
+
+INTENTS = ('REMINDER', 'LIST_REMINDERS', 'EDIT_REMINDER', 'DELETE_REMINDER', 'CHAT')
+
+# Politeness and address that may precede a command: "please", "can you", "zoey,"
+_LEAD = r"^\s*(?:(?:please|pls|can you|could you|would you|zoey|hey zoey)[\s,]+)*"
+
+# (intent, weight, pattern). Command patterns are anchored to the start of the
+# message so "remind me to delete the files" is never read as a delete.
+_RULES = tuple((intent, weight, re.compile(pattern, re.IGNORECASE)) for intent, weight, pattern in (
+    ('REMINDER', 0.95, _LEAD + r"(?:remind me|set (?:up )?(?:a |an )?reminder|add (?:a )?reminder|create (?:a )?reminder|"
+                       r"don'?t let me forget|ping me|alert me|nudge me)\b"),
+    ('LIST_REMINDERS', 0.95, _LEAD + r"(?:show|list|see|view|display|get)\b.*\breminders?\b"),
+    ('LIST_REMINDERS', 0.95, r"^\s*(?:my\s+|upcoming\s+|all\s+)?reminders\s*[?.!]*\s*$"),
+    ('LIST_REMINDERS', 0.9, r"^\s*(?:what|which)\s+reminders\b|^\s*what(?:'s| is| are)\s+(?:on\s+)?my\s+reminders\b"),
+    ('EDIT_REMINDER', 0.95, _LEAD + r"(?:edit|change|update|move|reschedule|rename|postpone|push back)\b.*\breminders?\b"),
+    ('DELETE_REMINDER', 0.95, _LEAD + r"(?:delete|remove|cancel|clear|drop|get rid of)\b.*\breminders?\b"),
+    ('DELETE_REMINDER', 0.9, _LEAD + r"(?:delete|remove|cancel)\s+(?:#|id\s*|number\s*)?\d+\s*[.!]*\s*$"),
+    ('CHAT', 0.9, r"^\s*(?:hi|hello|hey|yo|thanks|thank you|thx|ok|okay|cool|good (?:morning|afternoon|evening|night))"
+                  r"(?:\s+zoey)?\s*[!.]*\s*$"),
+))
+
+# Words that hint at an intent anywhere in the message. Each hit adds
+# KEYWORD_WEIGHT, capped below the fast-path threshold: keywords alone only
+# ever break ties or lower confidence, they never skip the LLM.
+_KEYWORDS = {
+    'REMINDER': frozenset(('remind', 'forget', 'ping', 'alert', 'nudge')),
+    'LIST_REMINDERS': frozenset(('show', 'list', 'view', 'upcoming', 'pending')),
+    'EDIT_REMINDER': frozenset(('edit', 'change', 'update', 'move', 'reschedule', 'postpone')),
+    'DELETE_REMINDER': frozenset(('delete', 'remove', 'cancel', 'clear')),
+}
+KEYWORD_WEIGHT = 0.35
+KEYWORD_MAX = 0.7
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def score_intents(message: str) -> Dict[str, float]:
+    """Score every intent for a message between 0 and 1."""
+    text = (message or '').strip()
+    words = set(_WORD_RE.findall(text.lower()))
+    scores = {
+        intent: min(KEYWORD_MAX, KEYWORD_WEIGHT * len(words & keywords))
+        for intent, keywords in _KEYWORDS.items()
+    }
+    for intent, weight, pattern in _RULES:
+        if weight > scores.get(intent, 0.0) and pattern.search(text):
+            scores[intent] = weight
+    return scores
+
+
+def classify_intent(message: str) -> Tuple[str, float]:
+    """Return (intent, confidence) from local rules.
+
+    Confidence is the best score minus half the runner-up, so a message that
+    looks like two different commands falls below the fast-path threshold.
+    Messages that match nothing come back as ('CHAT', 0.0).
+    """
+    ranked = sorted(score_intents(message).items(), key=lambda item: item[1], reverse=True)
+    if not ranked or ranked[0][1] == 0:
+        return 'CHAT', 0.0
+    best_intent, best = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    return best_intent, max(0.0, best - runner_up / 2)
@@ -0,0 +1,121 @@
+import asyncio
+import contextvars
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+# Messages from one chat this close together are answered as one
+COALESCE_WINDOW_SECONDS = float(os.getenv('COALESCE_WINDOW_SECONDS', '1.0'))
+# A steady stream of messages is still answered this long after its first one
+COALESCE_MAX_WAIT_SECONDS = float(os.getenv('COALESCE_MAX_WAIT_SECONDS', '4.0'))
+
+_current_burst: contextvars.ContextVar[Optional['Burst']] = contextvars.ContextVar('current_burst', default=None)
+
+
+def commit():
+    """Mark the burst being processed as past its point of no return.
+
+    Call it before anything a newer message cannot undo, such as writing to
+    the database or sending a final reply. Until then a newer message from
+    the same chat cancels the work and folds this burst's text into its own.
+    Outside a burst this does nothing.
+    """
+    burst = _current_burst.get()
+    if burst is not None:
+        burst.committed = True
+
+
+class Burst:
+    """Messages from one chat that are answered together."""
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.payload: Any = None
+        self.first_at = self.last_at = time.monotonic()
+        self.committed = False
+        self.task: Optional[asyncio.Task] = None
+
+    def add(self, text: str, payload: Any):
+        self.texts.append(text)
+        self.payload = payload
+        self.last_at = time.monotonic()
+
+    @property
+    def text(self) -> str:
+        return '\n'.join(self.texts)
+
+
+class MessageCoalescer:
+    """Per-chat debounce in front of the message pipeline.
+
+    submit() returns at once. A chat's messages are collected until none
+    has arrived for `window` seconds (or `max_wait` has passed since the
+    first), then `process(text, payload)` runs once with the texts joined by
+    newlines and the payload of the newest message. If another message
+    arrives while that is still running and has not called commit(), the
+    run is cancelled (with any OpenAI request it is waiting on) and its text
+    is merged into the next burst. Bursts of one chat run in order.
+    """
+
+    def __init__(self, process: Callable[[str, Any], Awaitable[None]],
+                 window: float = COALESCE_WINDOW_SECONDS, max_wait: float = COALESCE_MAX_WAIT_SECONDS):
+        self._process = process
+        self.window = window
+        self.max_wait = max(window, max_wait)
+        self._waiting: Dict[Hashable, Burst] = {}
+        self._running: Dict[Hashable, Burst] = {}
+        self.messages = 0
+        self.bursts = 0
+        self.cancelled = 0
+
+    def submit(self, key: Hashable, text: str, payload: Any = None):
+        self.messages += 1
+        burst = self._waiting.get(key)
+        if burst is None:
+            burst = self._waiting[key] = Burst()
+            running = self._running.get(key)
+            if running is not None and not running.committed and not running.task.done():
+                # The newer message makes the answer being worked on obsolete
+                running.task.cancel()
+                self.cancelled += 1
+                burst.texts.extend(running.texts)
+            burst.task = asyncio.create_task(self._run(key, burst))
+        burst.add(text, payload)
+
+    async def _run(self, key: Hashable, burst: Burst):
+        while True:
+            deadline = min(burst.last_at + self.window, burst.first_at + self.max_wait)
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        del self._waiting[key]
+        previous = self._running.get(key)
+        self._running[key] = burst
+        try:
+            if previous is not None and not previous.task.done():
+                # Committed work of the previous burst finishes first; shielded so this run's cancellation spares it
+                await asyncio.shield(asyncio.wait([previous.task]))
+            self.bursts += 1
+            _current_burst.set(burst)
+            await self._process(burst.text, burst.payload)
+        except Exception as exc:
+            print(f"Error processing messages: {exc}")
+        finally:
+            if self._running.get(key) is burst:
+                del self._running[key]
+
+    async def close(self):
+        """Cancel waiting and running bursts."""
+        tasks = [burst.task for burst in (*self._waiting.values(), *self._running.values())]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'messages': self.messages,
+            'bursts': self.bursts,
+            'cancelled': self.cancelled,
+            'bursts_per_message': self.bursts / self.messages if self.messages else 0.0,
+        }
@@ -0,0 +1,276 @@
+import asyncio
+import collections
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+# Telegram allows roughly 30 messages/second per bot and 1/second per chat
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+PER_CHAT_RATE = float(os.getenv('TELEGRAM_PER_CHAT_RATE', '1'))
+PER_CHAT_BURST = int(os.getenv('TELEGRAM_PER_CHAT_BURST', '3'))
+DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', '16'))
+MAX_ATTEMPTS = int(os.getenv('DELIVERY_MAX_ATTEMPTS', '5'))
+# Idle buckets in a TokenBuckets are dropped after this long so memory stays bounded
+BUCKET_IDLE_SECONDS = 300
+THROUGHPUT_WINDOW_SECONDS = 10.0
+
+
+def retry_after_seconds(exc: RetryAfter) -> float:
+    """How long Telegram asked us to wait; retry_after is a timedelta in newer python-telegram-bot versions."""
+    retry_after = exc.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+
+
+class TokenBucket:
+    """Token bucket rate limiter. reserve() may go into debt and returns the wait."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens now and return how many seconds to wait before using them."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= tokens
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens only if they are available right now."""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until or self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    async def acquire(self, tokens: float = 1.0):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def block(self, seconds: float):
+        """Hand out nothing for `seconds`, e.g. after a RetryAfter."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    @property
+    def idle(self) -> bool:
+        now = time.monotonic()
+        return now >= self.blocked_until and self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class TokenBuckets:
+    """One TokenBucket per key (a chat, a user), created on first use.
+
+    Every `idle_seconds` the buckets that are full again are dropped; they
+    would be recreated in the same state.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, idle_seconds: float = BUCKET_IDLE_SECONDS):
+        self.rate = rate
+        self.capacity = capacity
+        self.idle_seconds = idle_seconds
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+        self._last_sweep = time.monotonic()
+
+    def get(self, key: Hashable) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+        now = time.monotonic()
+        if now - self._last_sweep > self.idle_seconds:
+            self._last_sweep = now
+            self._buckets = {k: b for k, b in self._buckets.items() if k == key or not b.idle}
+        return bucket
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+@dataclass
+class Delivery:
+    chat_id: int
+    text: str
+    # Arbitrary caller data passed back to on_result (e.g. an outbox row ID)
+    context: Any = None
+    attempts: int = 0
+    chat_slot_reserved: bool = False
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+# Called with (delivery, ok, error) once a delivery succeeds or gives up
+ResultCallback = Callable[[Delivery, bool, Optional[BaseException]], Any]
+
+
+class DeliveryEngine:
+    """Sends messages from a queue with a pool of workers under Telegram's rate limits.
+
+    A global token bucket caps messages per second for the bot and a bucket
+    per chat caps each chat. A message for a chat that is over its limit is
+    parked with call_later instead of holding a worker, so one busy chat
+    never delays the others. RetryAfter responses block the affected chat
+    and lower the global rate, which recovers gradually after successes.
+    """
+
+    def __init__(self, send: Callable[[int, str], Awaitable[Any]], workers: int = DELIVERY_WORKERS,
+                 global_rate: float = GLOBAL_RATE, per_chat_rate: float = PER_CHAT_RATE,
+                 per_chat_burst: int = PER_CHAT_BURST, on_result: Optional[ResultCallback] = None):
+        self._send = send
+        self.on_result = on_result
+        self._worker_count = max(1, workers)
+        self._max_rate = global_rate
+        self._global = TokenBucket(global_rate)
+        self._chats = TokenBuckets(per_chat_rate, per_chat_burst)
+        self._queue: 'asyncio.Queue[Delivery]' = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._parked = 0
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._sent_times: 'collections.deque[float]' = collections.deque()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self._worker_count)]
+
+    async def stop(self, timeout: float = 10.0):
+        """Give queued messages up to `timeout` seconds to drain, then stop the workers."""
+        try:
+            await asyncio.wait_for(self.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"Delivery engine stopping with {self.pending} messages pending")
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def submit(self, chat_id: int, text: str, context: Any = None):
+        """Queue a message for delivery."""
+        self._idle.clear()
+        self._queue.put_nowait(Delivery(chat_id, text, context))
+
+    async def join(self):
+        """Wait until every submitted message has been sent or has failed."""
+        await self._idle.wait()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() + self._parked + self._in_flight
+
+    def _check_idle(self):
+        if self.pending == 0:
+            self._idle.set()
+
+    def _park(self, delivery: Delivery, delay: float):
+        self._parked += 1
+        asyncio.get_running_loop().call_later(delay, self._unpark, delivery)
+
+    def _unpark(self, delivery: Delivery):
+        self._parked -= 1
+        self._queue.put_nowait(delivery)
+
+    def _finish(self, delivery: Delivery, ok: bool, error: Optional[BaseException] = None):
+        if ok:
+            self.sent += 1
+            now = time.monotonic()
+            self._sent_times.append(now)
+            while self._sent_times[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                self._sent_times.popleft()
+        else:
+            self.failed += 1
+            print(f"Failed to send reminder to user {delivery.chat_id}: {error}")
+        if self.on_result is not None:
+            try:
+                self.on_result(delivery, ok, error)
+            except Exception as exc:
+                print(f"Error in delivery result callback: {exc}")
+
+    def _slow_down(self):
+        self._global.rate = max(1.0, self._global.rate * 0.5)
+
+    def _speed_up(self):
+        if self._global.rate < self._max_rate:
+            self._global.rate = min(self._max_rate, self._global.rate * 1.05)
+
+    async def _deliver(self, delivery: Delivery):
+        if not delivery.chat_slot_reserved:
+            wait = self._chats.get(delivery.chat_id).reserve()
+            delivery.chat_slot_reserved = True
+            if wait > 0:
+                self._park(delivery, wait)
+                return
+        await self._global.acquire()
+        delivery.attempts += 1
+        try:
+            await self._send(delivery.chat_id, delivery.text)
+        except RetryAfter as exc:
+            seconds = retry_after_seconds(exc)
+            self.rate_limited += 1
+            self._chats.get(delivery.chat_id).block(seconds)
+            self._slow_down()
+            self._retry(delivery, seconds, exc)
+        except (Forbidden, BadRequest) as exc:
+            # Blocked by the user or an invalid chat: retrying will not help
+            self._finish(delivery, False, exc)
+        except NetworkError as exc:
+            self._retry(delivery, min(30.0, 2.0 ** delivery.attempts), exc)
+        except Exception as exc:
+            self._finish(delivery, False, exc)
+        else:
+            self._speed_up()
+            self._finish(delivery, True)
+
+    def _retry(self, delivery: Delivery, delay: float, error: BaseException):
+        if delivery.attempts >= MAX_ATTEMPTS:
+            self._finish(delivery, False, error)
+            return
+        self.retried += 1
+        delivery.chat_slot_reserved = False
+        self._park(delivery, delay)
+
+    async def _worker(self):
+        while True:
+            delivery = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self._deliver(delivery)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"Error in delivery worker: {exc}")
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+                self._check_idle()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, queue depth and recent throughput in messages per second."""
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW_SECONDS
+        while self._sent_times and self._sent_times[0] < cutoff:
+            self._sent_times.popleft()
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'rate_limited': self.rate_limited,
+            'queue_depth': self._queue.qsize(),
+            'parked': self._parked,
+            'in_flight': self._in_flight,
+            'throughput': len(self._sent_times) / THROUGHPUT_WINDOW_SECONDS,
+            'global_rate': self._global.rate,
+        }
@@ -5,6 +5,9 @@ from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from threading import Thread
 from urllib.parse import parse_qs, urlencode, urlparse
 
+from llm_metrics import metrics as llm_metrics
+from prompts import prompt_token_counts
+
 
 DEFAULT_METRICS = {
     "steps": 0,
@@ -407,8 +410,12 @@ def _make_google_fit_request(access_token, url, method="GET", body=None):
         return None
 
 
-def start_health_callback_server(host="0.0.0.0", port=None, bot=None):
-    """Start a lightweight HTTP callback server for the Google Health login flow."""
+def start_health_callback_server(host="0.0.0.0", port=None, bot=None, delivery_stats=None):
+    """Start a lightweight HTTP server for the Google Health login flow and /metrics.
+
+    delivery_stats, if given, is called on each /metrics request for the
+    reminder sender's counters.
+    """
     if getattr(start_health_callback_server, "_thread", None) and start_health_callback_server._thread.is_alive():
         return start_health_callback_server._thread
 
@@ -418,6 +425,15 @@ def start_health_callback_server(host="0.0.0.0", port=None, bot=None):
     class HealthCallbackHandler(BaseHTTPRequestHandler):
         def do_GET(self):
             parsed_path = urlparse(self.path)
+            if parsed_path.path == "/metrics":
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                body = {"llm": llm_metrics.snapshot(), "prompts": prompt_token_counts()}
+                if delivery_stats is not None:
+                    body["delivery"] = delivery_stats()
+                self.wfile.write(json.dumps(body).encode("utf-8"))
+                return
             if parsed_path.path != "/health/callback":
                 self.send_response(404)
                 self.end_headers()
@@ -444,4 +460,3 @@ def start_health_callback_server(host="0.0.0.0", port=None, bot=None):
     start_health_callback_server._thread = thread
     start_health_callback_server._server = server
     return thread
-urce .venv/bin/activate && python -m py_compile messaging.py health.py intents.py reminders.py
\ No newline at end of file
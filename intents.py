@@ -1,138 +1,240 @@
 import os
+import collections
 import datetime
-import json
+import re
+from typing import List, Literal, Optional
+
 import pytz
-from openai import AsyncOpenAI
+from pydantic import BaseModel, Field
+from admission import AdmissionController, AdmissionRejected
+from cache import SQLiteCacheBackend, TTLCache, normalize_key
+from classifier import INTENTS, classify_intent
+from memory import ConversationMemory
+from prompts import (
+    CHAT as CHAT_PROMPT,
+    EXTRACT as EXTRACT_PROMPT,
+    INTERPRET as INTERPRET_PROMPT,
+    SUMMARY as SUMMARY_PROMPT,
+    current_time_context,
+)
+from recurrence import normalize_rule
+from timeparse import LOCAL_PARSE_THRESHOLD, parse_reminders
+from llm_metrics import metrics as llm_metrics
+from transport import CircuitOpenError, OpenAITransport
+from tokens import CONVERSATION_SUMMARY_TOKENS
 from reminders import (
     add_reminder,
+    add_reminders,
     get_user_timezone,
+    get_user_tzinfo,
     set_user_timezone,
-    list_reminders,
+    list_reminders_page,
     edit_reminder,
     delete_reminder,
+    find_reminders,
+    search_terms,
 )
 
-# Global client instance - reuse across all calls to avoid connection issues
+# "reminder 2", "ID 2", "#2", "number 2"
+_REMINDER_ID_RE = re.compile(r'(?:\breminder|\bid|#|\bnumber)\s*#?\s*(\d+)\b', re.IGNORECASE)
+# Where an edit request moves from naming the reminder to the change: "move the dentist one | to 5pm"
+_EDIT_CHANGE_RE = re.compile(r'\b(?:to|at|for|until|on)\b', re.IGNORECASE)
+
+# Rule-based intents at or above this confidence skip the LLM
+INTENT_FAST_PATH_THRESHOLD = float(os.getenv('INTENT_FAST_PATH_THRESHOLD', '0.8'))
+# ('fast_path' | 'cache' | 'llm' | 'fallback', intent) -> messages classified that way;
+# 'fallback' is the rules' best guess when the LLM could not be reached
+_intent_counts = collections.Counter()
+_INTENT_ROUTES = ('fast_path', 'cache', 'llm', 'fallback')
+
+# LLM intents are cached per normalized message for every user; chat replies
+# only for short messages with no personal or time-dependent content.
+INTENT_CACHE_TTL_SECONDS = int(os.getenv('INTENT_CACHE_TTL_SECONDS', '86400'))
+CHAT_CACHE_TTL_SECONDS = int(os.getenv('CHAT_CACHE_TTL_SECONDS', '3600'))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '5000'))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+# Optional disk tier so the caches survive restarts, e.g. /data/response_cache.db on Fly
+RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH')
+CHAT_CACHE_MAX_WORDS = 12
+_UNCACHEABLE_CHAT_RE = re.compile(
+    r"\d|\b(?:i|i'm|im|i've|me|my|mine|we|our|us|today|tonight|tomorrow|yesterday|now|time|date|day|week|weekend|"
+    r"month|year|morning|evening|weather|news|latest|current|currently|recent|remind|reminder|reminders|health)\b",
+    re.IGNORECASE,
+)
+# Pleasantries answered the same whatever came before; they skip the history and stay cacheable
+_STANDALONE_CHAT_RE = re.compile(
+    r"(?:hi|hello|hey|thanks|thank you|thanks a lot|thx|ok|okay|cool|great|nice|bye|goodbye|good night)(?: zoey)?"
+)
+
+_cache_backend = SQLiteCacheBackend(RESPONSE_CACHE_PATH) if RESPONSE_CACHE_PATH else None
+_intent_cache = TTLCache(RESPONSE_CACHE_SIZE, INTENT_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_BYTES // 2,
+                         backend=_cache_backend, namespace='intent')
+_chat_cache = TTLCache(RESPONSE_CACHE_SIZE, CHAT_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_BYTES // 2,
+                       backend=_cache_backend, namespace='chat')
+
+CHAT_MODEL = 'gpt-3.5-turbo'
+# Per-call deadlines (seconds), including retries
+INTERPRET_DEADLINE_SECONDS = float(os.getenv('INTERPRET_DEADLINE_SECONDS', '8'))
+CHAT_DEADLINE_SECONDS = float(os.getenv('CHAT_DEADLINE_SECONDS', '15'))
+SUMMARY_DEADLINE_SECONDS = 30.0
+CHAT_UNAVAILABLE_REPLY = "I can't reach my language service right now, but reminders still work. Try something like 'Remind me to call mom at 3pm tomorrow'."
+BUSY_REPLY = "I'm handling a lot of messages right now. Please try again in a moment."
+
+# Shared transport: pooled keep-alive connections, deadlines, retries and a circuit breaker
+openai_transport = OpenAITransport()
+# Global concurrency cap, per-user rate limits and a fair queue in front of the transport
+openai_admission = AdmissionController()
+# Overrides the transport's client when set (used by tests)
 _client = None
 
 def get_client():
-    """Get or create AsyncOpenAI client."""
-    global _client
-    if _client is None:
-        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    return _client
-
-def get_central_time_context():
-    """Get current Central Time with timezone offset information."""
-    ct_tz = pytz.timezone('America/Chicago')
-    now_ct = datetime.datetime.now(ct_tz)
-    offset_str = now_ct.strftime('%z')  # e.g., -0500 or -0600
-    offset_formatted = f"{offset_str[:3]}:{offset_str[3:]}"  # e.g., -05:00 or -06:00
+    """Return the shared AsyncOpenAI client."""
+    return _client if _client is not None else openai_transport.client
+
+async def create_completion(deadline, **kwargs):
+    """Run a chat completion through admission control and the shared transport.
+
+    Raises AdmissionRejected when overloaded and CircuitOpenError while OpenAI is degraded.
+    """
+    async with openai_admission.slot():
+        return await _call_openai(deadline, **kwargs)
+
+async def _call_openai(deadline, **kwargs):
+    return await openai_transport.call(get_client().chat.completions.create, deadline=deadline, **kwargs)
+
+def get_intent_stats():
+    """How many messages were classified by rules, the intent cache or the LLM, and the fast-path share."""
+    totals = {route: 0 for route in _INTENT_ROUTES}
+    by_intent = {}
+    for (route, intent), count in _intent_counts.items():
+        totals[route] += count
+        by_intent.setdefault(intent, {name: 0 for name in _INTENT_ROUTES})[route] = count
+    classified = sum(totals.values())
     return {
-        "datetime_str": now_ct.strftime('%Y-%m-%d %H:%M'),
-        "day_name": now_ct.strftime('%A'),
-        "timezone_name": "America/Chicago (Central Time)",
-        "offset": offset_formatted
+        **totals,
+        'fast_path_share': totals['fast_path'] / classified if classified else 0.0,
+        'by_intent': by_intent,
     }
 
+def get_response_cache_stats():
+    """Hit-rate counters for the intent and chat reply caches."""
+    return {'intent': _intent_cache.stats(), 'chat': _chat_cache.stats()}
+
+def is_standalone_chat(user_message):
+    """Whether the message is a greeting or thanks whose reply does not depend on the conversation."""
+    return bool(_STANDALONE_CHAT_RE.fullmatch(normalize_key(user_message)))
+
+def is_cacheable_chat(user_message):
+    """Chat replies are shared between users, so only cache short, impersonal, timeless messages."""
+    key = normalize_key(user_message)
+    return bool(key) and len(key.split()) <= CHAT_CACHE_MAX_WORDS and not _UNCACHEABLE_CHAT_RE.search(key)
+
+class ReminderItem(BaseModel):
+    """One more reminder asked for in the same message."""
+    reminder_text: Optional[str] = Field(None, description='what to remind about')
+    date: Optional[str] = Field(None, description="YYYY-MM-DD, 'today' or 'tomorrow'")
+    time: Optional[str] = Field(None, description='HH:MM, 24-hour')
+    repeat: Optional[str] = Field(None, description="same rules as the top-level repeat, or null")
+
+class MessageDetails(BaseModel):
+    """Intent plus every reminder field, filled in by one structured LLM call."""
+    intent: Literal[INTENTS]
+    reminder_text: Optional[str] = Field(None, description='REMINDER: what to remind about')
+    date: Optional[str] = Field(None, description="REMINDER: YYYY-MM-DD, 'today' or 'tomorrow'")
+    time: Optional[str] = Field(None, description='REMINDER: HH:MM, 24-hour')
+    repeat: Optional[str] = Field(None, description="REMINDER: 'daily', 'weekly', 'weekdays', 'every N minutes/hours/days/weeks' or null")
+    timezone: Optional[str] = Field(None, description='REMINDER: IANA timezone name, only if the user names one')
+    reminder_id: Optional[int] = Field(None, description='EDIT_REMINDER/DELETE_REMINDER: the reminder ID, if given')
+    target_description: Optional[str] = Field(
+        None, description='EDIT_REMINDER/DELETE_REMINDER: the words naming the existing reminder, without the requested change')
+    new_text: Optional[str] = Field(None, description='EDIT_REMINDER: new reminder text')
+    new_date: Optional[str] = Field(None, description="EDIT_REMINDER: YYYY-MM-DD, 'today' or 'tomorrow'")
+    new_time: Optional[str] = Field(None, description='EDIT_REMINDER: HH:MM, 24-hour')
+    new_repeat: Optional[str] = Field(None, description="EDIT_REMINDER: new repeat rule, or 'none' to stop repeating")
+    more_reminders: Optional[List[ReminderItem]] = Field(
+        None, description='REMINDER: any further reminders in the same message; the first one goes in the fields above')
+
+    def reminder_items(self) -> List[ReminderItem]:
+        """Every reminder in the message, the top-level one first."""
+        first = ReminderItem(reminder_text=self.reminder_text, date=self.date, time=self.time, repeat=self.repeat)
+        return [first, *(self.more_reminders or [])]
+
+_MESSAGE_TOOL = {
+    'type': 'function',
+    'function': {
+        'name': 'record_message',
+        'description': "Record what the user wants and any reminder details in their message.",
+        'parameters': MessageDetails.model_json_schema(),
+    },
+}
+
 async def determine_intent(user_message):
-    """Use AI to determine what the user wants to do."""
+    """Determine what the user wants to do: local rules first, the LLM when they are unsure.
+
+    Returns (intent, details). details is a MessageDetails when the LLM was
+    asked, so handlers need no second call, or None on the fast path.
+    """
+    intent, confidence = classify_intent(user_message)
+    if confidence >= INTENT_FAST_PATH_THRESHOLD:
+        _intent_counts['fast_path', intent] += 1
+        return intent, None
+    key = normalize_key(user_message)
+    cached = _intent_cache.get(key)
+    if cached is not None:
+        _intent_counts['cache', cached] += 1
+        return cached, None
     try:
-        client = get_client()
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Classify intent. Respond with only one word: REMINDER, LIST_REMINDERS, EDIT_REMINDER, DELETE_REMINDER, or CHAT.\n\nREMINDER = User wants to create a new reminder\nLIST_REMINDERS = User wants to see their existing reminders\nEDIT_REMINDER = User wants to modify an existing reminder\nDELETE_REMINDER = User wants to remove an existing reminder\nCHAT = Everything else.\n\nExamples:\n'What's a good drink at Starbucks?' → CHAT\n'Recommend a book' → CHAT\n'I'm on PTO today' → CHAT\n'Tell me about yourself' → CHAT\n'What time is it' → CHAT\n'Remind me to call mom at 3pm tomorrow' → REMINDER\n'Set a reminder for my meeting tomorrow' → REMINDER\n'Don't let me forget to buy milk' → REMINDER\n'Ping me in an hour' → REMINDER\n'Alert me when it's 5pm' → REMINDER\n'Show me my reminders' → LIST_REMINDERS\n'List my reminders' → LIST_REMINDERS\n'What reminders do I have?' → LIST_REMINDERS\n'Edit reminder 1 to call dad' → EDIT_REMINDER\n'Change my 3pm reminder' → EDIT_REMINDER\n'Delete reminder 2' → DELETE_REMINDER\n'Remove the milk reminder' → DELETE_REMINDER"
-                },
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=10,
-            temperature=0,
-        )
-        intent = response.choices[0].message.content.strip().upper()
-        return intent if intent in [
-            'REMINDER',
-            'LIST_REMINDERS',
-            'EDIT_REMINDER',
-            'DELETE_REMINDER',
-            'CHAT',
-        ] else 'CHAT'
-    except:
-        return 'CHAT'
-
-async def parse_reminder_details(user_message, user_id):
-    """Use AI to extract date, time, reminder text, repeat pattern, and timezone."""
+        details = await interpret_message(user_message)
+    except AdmissionRejected:
+        details = None
+    if details is None:
+        # The call failed, was shed or the breaker is open: trust whatever the rules guessed
+        _intent_counts['fallback', intent] += 1
+        return intent, None
+    # Only the intent is cached: extracted fields like "today" depend on when it was said
+    _intent_cache.set(key, details.intent)
+    _intent_counts['llm', details.intent] += 1
+    return details.intent, details
+
+async def interpret_message(user_message, intent=None):
+    """Classify a message and extract its reminder fields in a single function call.
+
+    Pass `intent` when it is already known to only have the fields extracted.
+    Returns a validated MessageDetails, or None if the call or validation fails.
+    Raises AdmissionRejected when the call was turned away, so callers can say they are busy.
+    """
     try:
-        client = get_client()
-        ct_context = get_central_time_context()
-        current_time_info = f"Current date and time (Central Time, UTC{ct_context['offset']}): {ct_context['datetime_str']} ({ct_context['day_name']})"
-
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""Extract reminder details from the user's message. Respond with JSON only, with no surrounding markdown. Use this schema:\n{{\n  \"reminder_text\": \"what to remind about\",\n  \"date\": \"YYYY-MM-DD or 'today' or 'tomorrow'\",\n  \"time\": \"HH:MM (24-hour)\",\n  \"repeat\": \"daily\", \"weekly\", or null,\n  \"timezone\": \"IANA timezone name like America/New_York or null\"\n}}\n{current_time_info}\nAll times should be interpreted as Central Time unless otherwise specified.\nIf no reminder text is specified, use \"Reminder\". If no date is specified, use \"today\". If no time is specified, use current time + 1 hour. If no repeat is specified, use null. If no timezone is explicitly specified, use null.\n\nExamples:\n\"Remind me in 20 minutes\" -> {{\"reminder_text\": \"Reminder\", \"date\": \"today\", \"time\": \"HH:MM (20 mins from now in CT)\", \"repeat\": null, \"timezone\": null}}\n\"Remind me at 3pm tomorrow\" -> {{\"reminder_text\": \"Reminder\", \"date\": \"tomorrow\", \"time\": \"15:00\", \"repeat\": null, \"timezone\": null}}\n\"Call mom at 2:30\" -> {{\"reminder_text\": \"Call mom\", \"date\": \"today\", \"time\": \"14:30\", \"repeat\": null, \"timezone\": null}}\n\"Remind me daily to take my meds at 8am\" -> {{\"reminder_text\": \"Take my meds\", \"date\": \"today\", \"time\": \"08:00\", \"repeat\": \"daily\", \"timezone\": null}}"""
-                },
-                {"role": "user", "content": user_message},
-            ],
-            max_tokens=150,
-            temperature=0,
-        )
-        details = json.loads(response.choices[0].message.content.strip())
+        if intent:
+            prompt, context = EXTRACT_PROMPT, f"The user's intent is {intent}.\n{current_time_context()}"
+        else:
+            prompt, context = INTERPRET_PROMPT, current_time_context()
+
+        with llm_metrics.track('extract' if intent else 'intent', CHAT_MODEL) as call:
+            response = await create_completion(
+                INTERPRET_DEADLINE_SECONDS,
+                model=CHAT_MODEL,
+                messages=prompt.messages(user_message, context),
+                tools=[_MESSAGE_TOOL],
+                tool_choice={'type': 'function', 'function': {'name': 'record_message'}},
+                max_tokens=300,
+                temperature=0,
+            )
+            call.add_usage(getattr(response, 'usage', None))
+            tool_calls = response.choices[0].message.tool_calls
+            if not tool_calls:
+                # Raised inside track() so the call is recorded as a parse_error
+                raise ValueError('no tool call in the response')
+            details = MessageDetails.model_validate_json(tool_calls[0].function.arguments)
+        if intent:
+            details.intent = intent
         return details
-    except Exception as e:
-        print(f"Error parsing reminder details: {e}")
+    except ValueError as e:  # pydantic's ValidationError is a ValueError too
+        print(f"LLM returned invalid message details: {e}")
         return None
-
-async def parse_reminder_edit_details(user_message, user_id):
-    """Use AI to extract edit details from a reminder update request."""
-    try:
-        client = get_client()
-        ct_context = get_central_time_context()
-        current_time_info = f"Current date and time (Central Time, UTC{ct_context['offset']}): {ct_context['datetime_str']} ({ct_context['day_name']})"
-
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""Extract reminder edit details from the user's message. Respond with JSON only, using this schema:\n{{\n  \"reminder_id\": integer or null,\n  \"new_text\": string or null,\n  \"new_date\": \"YYYY-MM-DD\" or 'today' or 'tomorrow' or null,\n  \"new_time\": \"HH:MM\" or null,\n  \"new_repeat\": \"daily\" or \"weekly\" or \"none\" or null\n}}\n{current_time_info}\nAll times should be interpreted as Central Time unless otherwise specified."""
-                },
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=150,
-            temperature=0,
-        )
-        return json.loads(response.choices[0].message.content.strip())
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        print(f"Error parsing edit details: {e}")
-        return None
-
-async def parse_reminder_delete_details(user_message, user_id):
-    """Use AI to extract the reminder ID from a delete request."""
-    try:
-        client = get_client()
-        ct_context = get_central_time_context()
-        current_time_info = f"Current date and time (Central Time, UTC{ct_context['offset']}): {ct_context['datetime_str']} ({ct_context['day_name']})"
-
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""Extract the reminder ID from the user's message. Respond with JSON only, using this schema:\n{{\n  \"reminder_id\": integer or null\n}}\n{current_time_info}"""
-                },
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=50,
-            temperature=0,
-        )
-        return json.loads(response.choices[0].message.content.strip())
-    except Exception as e:
-        print(f"Error parsing delete details: {e}")
+        print(f"Error interpreting message: {e}")
         return None
 
 
@@ -185,31 +287,83 @@ def create_datetime_from_details(date_str, time_str, timezone_str='UTC'):
 
     return target_datetime
 
-async def handle_reminder(user_message, user_id):
-    """Handle reminder creation requests."""
-    try:
-        details = await parse_reminder_details(user_message, user_id)
-        if not details:
-            return "Sorry, I couldn't understand that reminder. Try something like 'Remind me to call mom at 3pm tomorrow'."
+_BATCH_STATUS_TEXT = {
+    'duplicate': 'already exists',
+    'past': 'is in the past',
+    'invalid': 'has an unknown repeat rule',
+    'bad_time': 'has a date/time I could not read',
+}
+
+def _format_batch_result(results, timezone_hint_text):
+    """Reply for a message that asked for several reminders: one line per reminder."""
+    added = sum(1 for *_, status in results if status == 'added')
+    lines = [f'✅ Set {added} of {len(results)} reminders:' if added else "I couldn't set any of those reminders:"]
+    for reminder_text, target_datetime, repeat, status in results:
+        if status == 'added':
+            repeat_text = f' repeating {repeat}' if repeat else ''
+            lines.append(f"• '{reminder_text}' on {target_datetime.strftime('%B %d at %I:%M %p %Z')}{repeat_text}")
+        else:
+            lines.append(f"• '{reminder_text}' {_BATCH_STATUS_TEXT[status]}")
+    return '\n'.join(lines) + (f'\n{timezone_hint_text.strip()}' if timezone_hint_text else '')
 
-        reminder_text = details.get('reminder_text') or 'Reminder'
-        date_str = details.get('date') or 'today'
-        time_str = details.get('time') or ''
-        repeat = details.get('repeat')
-        timezone_hint = details.get('timezone')
+async def handle_reminder(user_message, user_id, details=None):
+    """Handle reminder creation requests, including several reminders in one message.
 
+    `details` comes from determine_intent when it asked the LLM. Otherwise the
+    message is parsed locally, and the LLM is only asked (once, for all of
+    them) if that is unsure. Several reminders are stored in one transaction.
+    """
+    try:
         user_tz = await get_user_timezone(user_id)
-        timezone_to_use = timezone_hint or user_tz or 'UTC'
+        parsed = []
+        if details is None:
+            parsed = parse_reminders(user_message, await get_user_tzinfo(user_id))
+            if not parsed or min(item.confidence for item in parsed) < LOCAL_PARSE_THRESHOLD:
+                try:
+                    details = await interpret_message(user_message, 'REMINDER')
+                except AdmissionRejected:
+                    if not parsed:
+                        raise
+                # Keep an unsure local parse only when the LLM could not be reached
+                if details is not None:
+                    parsed = []
+
+        timezone_hint = None
+        if parsed:
+            items = [(item.text, item.when, item.repeat) for item in parsed]
+        else:
+            if not details:
+                return "Sorry, I couldn't understand that reminder. Try something like 'Remind me to call mom at 3pm tomorrow'."
+
+            timezone_hint = details.timezone
+            timezone_to_use = timezone_hint or user_tz or 'UTC'
+
+            if timezone_hint and timezone_hint != user_tz:
+                try:
+                    pytz.timezone(timezone_hint)
+                    await set_user_timezone(user_id, timezone_hint)
+                    user_tz = timezone_hint
+                except Exception:
+                    timezone_to_use = user_tz
+
+            items = [
+                (item.reminder_text or 'Reminder',
+                 create_datetime_from_details(item.date or 'today', item.time or '', timezone_to_use),
+                 item.repeat)
+                for item in details.reminder_items()
+            ]
 
-        if timezone_hint and timezone_hint != user_tz:
-            try:
-                pytz.timezone(timezone_hint)
-                await set_user_timezone(user_id, timezone_hint)
-                user_tz = timezone_hint
-            except Exception:
-                timezone_to_use = user_tz
+        timezone_hint_text = ''
+        if user_tz == 'UTC' and not timezone_hint:
+            timezone_hint_text = ' Tip: you can set your timezone with a message like "Set my timezone to America/New_York".'
 
-        target_datetime = create_datetime_from_details(date_str, time_str, timezone_to_use)
+        if len(items) > 1:
+            valid = [item for item in items if item[1]]
+            statuses = iter(await add_reminders(user_id, valid) if valid else [])
+            results = [(*item, next(statuses) if item[1] else 'bad_time') for item in items]
+            return _format_batch_result(results, timezone_hint_text)
+
+        reminder_text, target_datetime, repeat = items[0]
         if not target_datetime:
             return 'I could not schedule that reminder because the date/time looked invalid or was already in the past. Try again with a different date or time.'
 
@@ -219,57 +373,125 @@ async def handle_reminder(user_message, user_id):
 
         friendly_time = target_datetime.strftime('%B %d at %I:%M %p %Z')
         repeat_text = f' repeating {repeat}' if repeat else ''
-        timezone_hint_text = ''
-        if user_tz == 'UTC' and not timezone_hint:
-            timezone_hint_text = ' Tip: you can set your timezone with a message like "Set my timezone to America/New_York".'
-
         return f"✅ Reminder set: '{reminder_text}' on {friendly_time}{repeat_text}.{timezone_hint_text}"
+    except AdmissionRejected:
+        return BUSY_REPLY
     except Exception as e:
         print(f"Error handling reminder: {e}")
         return "Sorry, I couldn't set that reminder. Try something like 'Remind me to call mom at 3pm tomorrow'."
 
-async def handle_list_reminders(user_id):
-    """Return the user's current reminders."""
+async def get_reminder_list_page(user_id, after=None, before=None):
+    """Return (text, page) for one page of the user's reminders.
+
+    `page` carries the 'next'/'prev' cursors for paging buttons, or is None on error.
+    """
     try:
-        reminders_data = await list_reminders(user_id)
-        if not reminders_data:
-            return 'You have no reminders yet. Ask me to set one!'
+        page = await list_reminders_page(user_id, after=after, before=before)
+        if not page['reminders']:
+            if after is None and before is None:
+                return 'You have no reminders yet. Ask me to set one!', page
+            return 'No more reminders.', page
 
         lines = ['Your reminders:']
-        for reminder in reminders_data:
+        for reminder in page['reminders']:
             repeat_note = f' (repeats {reminder["repeat"]})' if reminder['repeat'] else ''
             lines.append(
                 f"ID {reminder['id']}: {reminder['text']} at {reminder['datetime']}{repeat_note}"
             )
-        return '\n'.join(lines)
+        return '\n'.join(lines), page
     except Exception as e:
         print(f"Error listing reminders: {e}")
-        return 'Sorry, I could not fetch your reminders right now.'
+        return 'Sorry, I could not fetch your reminders right now.', None
 
-async def handle_edit_reminder(user_message, user_id):
-    """Handle reminder edit requests."""
+async def handle_list_reminders(user_id):
+    """Return the first page of the user's current reminders."""
+    text, _ = await get_reminder_list_page(user_id)
+    return text
+
+def extract_reminder_id(user_message):
+    """Return the reminder ID if the message names one explicitly, e.g. 'delete reminder 2'."""
+    match = _REMINDER_ID_RE.search(user_message or '')
+    return int(match.group(1)) if match else None
+
+async def resolve_reminder_reference(user_message, user_id):
+    """Work out which reminder a message refers to without calling the LLM.
+
+    Returns (reminder_id, candidates). reminder_id is set when the message
+    names an ID or exactly one reminder matches every word of its
+    description; otherwise candidates holds the closest matches (possibly
+    none) for the user to confirm, so "the call mom reminder" never
+    silently picks "Call dad".
+    """
+    explicit_id = extract_reminder_id(user_message)
+    if explicit_id is not None:
+        return explicit_id, []
+    matches = await find_reminders(user_id, user_message)
+    exact = [match for match in matches if match['exact']]
+    if len(exact) == 1:
+        return exact[0]['id'], exact
+    return None, matches
+
+def edit_target_description(user_message, details):
+    """The part of an edit request that names the reminder, so the new text, date or time is not searched for."""
+    if details.target_description:
+        return details.target_description
+    message = user_message
+    if details.new_text:
+        message = re.sub(re.escape(details.new_text), ' ', message, flags=re.IGNORECASE)
+    head = _EDIT_CHANGE_RE.split(message, maxsplit=1)[0]
+    # "change reminder to call mom to 5pm" names nothing before the first "to"
+    return head if search_terms(head) else message
+
+def format_reminder_choices(candidates, action):
+    """Ask the user to confirm which of the matching reminders they mean."""
+    if len(candidates) > 1 and all(reminder['exact'] for reminder in candidates):
+        lines = ['I found more than one matching reminder:']
+    elif len(candidates) > 1:
+        lines = ["I couldn't find an exact match. These reminders come closest:"]
+    else:
+        lines = ["I couldn't find an exact match. Did you mean this reminder?"]
+    for reminder in candidates:
+        lines.append(f"ID {reminder['id']}: {reminder['text']} at {reminder['datetime']}")
+    lines.append(f'Reply with the ID, for example: "{action} reminder {candidates[0]["id"]}."')
+    return '\n'.join(lines)
+
+async def handle_edit_reminder(user_message, user_id, details=None):
+    """Handle reminder edit requests. `details` comes from determine_intent when it asked the LLM."""
     try:
-        details = await parse_reminder_edit_details(user_message, user_id)
-        if not details or details.get('reminder_id') is None:
+        if details is None:
+            details = await interpret_message(user_message, 'EDIT_REMINDER')
+        if not details:
             return 'Please include the reminder ID you want to edit, for example: "Edit reminder 2 to call dad tomorrow at 3pm."'
 
-        reminder_id = int(details['reminder_id'])
-        new_text = details.get('new_text') or None
-        new_date = details.get('new_date')
-        new_time = details.get('new_time')
-        raw_repeat = details.get('new_repeat')
+        if details.reminder_id is not None:
+            reminder_id = details.reminder_id
+        else:
+            reminder_id, candidates = await resolve_reminder_reference(
+                edit_target_description(user_message, details), user_id)
+            if reminder_id is None and candidates:
+                return format_reminder_choices(candidates, 'Edit')
+            if reminder_id is None:
+                return 'Please include the reminder ID you want to edit, for example: "Edit reminder 2 to call dad tomorrow at 3pm."'
+
+        new_text = details.new_text or None
+        new_date = details.new_date
+        new_time = details.new_time
+        raw_repeat = details.new_repeat
         new_repeat = None
-        if raw_repeat is not None:
-            if isinstance(raw_repeat, str) and raw_repeat.lower() == 'none':
+        if isinstance(raw_repeat, str):
+            if raw_repeat.lower() == 'none':
                 new_repeat = 'none'
-            elif raw_repeat in ('daily', 'weekly'):
-                new_repeat = raw_repeat
+            else:
+                try:
+                    new_repeat = normalize_rule(raw_repeat)
+                except ValueError:
+                    new_repeat = None
 
         new_datetime = None
         if new_date or new_time:
             user_tz = await get_user_timezone(user_id)
             if not new_time:
-                now_tz = pytz.timezone(user_tz)
+                now_tz = await get_user_tzinfo(user_id)
                 new_time = datetime.datetime.now(now_tz).strftime('%H:%M')
             new_datetime = create_datetime_from_details(new_date or 'today', new_time, user_tz)
             if not new_datetime:
@@ -280,46 +502,153 @@ async def handle_edit_reminder(user_message, user_id):
             return 'I could not update that reminder. Make sure the reminder ID is correct and try again.'
 
         return '✅ Reminder updated successfully.'
+    except AdmissionRejected:
+        return BUSY_REPLY
     except Exception as e:
         print(f"Error editing reminder: {e}")
         return 'Sorry, I could not edit that reminder.'
 
-async def handle_delete_reminder(user_message, user_id):
-    """Handle reminder deletion requests."""
+async def handle_delete_reminder(user_message, user_id, details=None):
+    """Handle reminder deletion requests. IDs and descriptions are resolved locally; the LLM is the fallback."""
     try:
-        details = await parse_reminder_delete_details(user_message, user_id)
-        if not details or details.get('reminder_id') is None:
-            return 'Please include the reminder ID you want to delete, for example: "Delete reminder 2."'
+        reminder_id, candidates = await resolve_reminder_reference(user_message, user_id)
+        if reminder_id is None and candidates:
+            return format_reminder_choices(candidates, 'Delete')
+        if reminder_id is None:
+            if details is None:
+                details = await interpret_message(user_message, 'DELETE_REMINDER')
+            if not details or details.reminder_id is None:
+                return 'Please include the reminder ID you want to delete, for example: "Delete reminder 2."'
+            reminder_id = details.reminder_id
 
-        reminder_id = int(details['reminder_id'])
         success = await delete_reminder(user_id, reminder_id)
         if not success:
             return 'I could not delete that reminder. Verify the reminder ID and try again.'
 
+        if candidates:
+            return f"✅ Reminder deleted: '{candidates[0]['text']}'."
         return '✅ Reminder deleted.'
+    except AdmissionRejected:
+        return BUSY_REPLY
     except Exception as e:
         print(f"Error deleting reminder: {e}")
         return 'Sorry, I could not delete that reminder.'
 
-async def handle_chat(user_message):
-    """Handle regular chat requests."""
-    try:
-        client = get_client()
-        now = datetime.datetime.now()
-        current_time_info = f"Current date and time: {now.strftime('%A, %B %d, %Y at %I:%M %p')}"
-
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are Zoey, a helpful personal assistant. Keep responses brief and friendly.\n\n{current_time_info}"
-                },
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=100,
+def _chat_messages(user_message, history=()):
+    return CHAT_PROMPT.messages(user_message, current_time_context(), history)
+
+async def summarize_conversation(summary, turns):
+    """Fold chat turns into the running conversation summary used by ConversationMemory."""
+    transcript = '\n'.join(f"{'User' if role == 'user' else 'Zoey'}: {content}" for role, content in turns)
+    with llm_metrics.track('summary', CHAT_MODEL) as call:
+        response = await create_completion(
+            SUMMARY_DEADLINE_SECONDS,
+            model=CHAT_MODEL,
+            messages=SUMMARY_PROMPT.messages(f"Summary so far: {summary or '(none)'}\n\nNew lines:\n{transcript}"),
+            max_tokens=CONVERSATION_SUMMARY_TOKENS,
             temperature=0,
         )
+        call.add_usage(getattr(response, 'usage', None))
         return response.choices[0].message.content.strip()
-    except Exception:
+
+conversation_memory = ConversationMemory(summarize_conversation)
+
+async def _chat_context(user_message, user_id):
+    """Return (history messages, whether the reply may come from or go to the shared cache)."""
+    if is_standalone_chat(user_message):
+        # Sent without history, so the shared reply cannot carry anything personal
+        return [], True
+    history = await conversation_memory.context(user_id) if user_id is not None else []
+    # A reply that depends on earlier turns must not be shared with other users
+    return history, not history and is_cacheable_chat(user_message)
+
+async def _remember(user_id, user_message, reply):
+    if user_id is None:
+        return
+    try:
+        await conversation_memory.record(user_id, user_message, reply)
+    except Exception as e:
+        print(f"Error saving conversation: {e}")
+
+async def handle_chat(user_message, user_id=None):
+    """Handle regular chat requests with the user's recent conversation as context.
+
+    Replies to common impersonal messages are reused from the cache when
+    there is no history they could depend on. Greetings and thanks are
+    answered without the history, so they stay cacheable for every user.
+    """
+    history, cacheable = await _chat_context(user_message, user_id)
+    if cacheable:
+        cached = _chat_cache.get(normalize_key(user_message))
+        if cached is not None:
+            await _remember(user_id, user_message, cached)
+            return cached
+    try:
+        with llm_metrics.track('chat', CHAT_MODEL) as call:
+            response = await create_completion(
+                CHAT_DEADLINE_SECONDS,
+                model=CHAT_MODEL,
+                messages=_chat_messages(user_message, history),
+                max_tokens=100,
+                temperature=0,
+            )
+            call.add_usage(getattr(response, 'usage', None))
+            reply = response.choices[0].message.content.strip()
+    except CircuitOpenError:
+        return CHAT_UNAVAILABLE_REPLY
+    except AdmissionRejected:
+        return BUSY_REPLY
+    except Exception as e:
+        print(f"Error handling chat: {e}")
         return 'Sorry, I had trouble understanding that.'
+    if cacheable:
+        _chat_cache.set(normalize_key(user_message), reply)
+    await _remember(user_id, user_message, reply)
+    return reply
+
+async def stream_chat(user_message, user_id=None):
+    """Like handle_chat, but yield the reply in pieces as the model generates it."""
+    history, cacheable = await _chat_context(user_message, user_id)
+    if cacheable:
+        cached = _chat_cache.get(normalize_key(user_message))
+        if cached is not None:
+            yield cached
+            await _remember(user_id, user_message, cached)
+            return
+    parts = []
+    try:
+        # The admission slot is held until the stream ends, not just until it starts
+        with llm_metrics.track('chat_stream', CHAT_MODEL) as call:
+            async with openai_admission.slot():
+                stream = await _call_openai(
+                    CHAT_DEADLINE_SECONDS,
+                    model=CHAT_MODEL,
+                    messages=_chat_messages(user_message, history),
+                    max_tokens=100,
+                    temperature=0,
+                    stream=True,
+                    # The last chunk then carries the token usage
+                    stream_options={'include_usage': True},
+                )
+                async for chunk in stream:
+                    call.add_usage(getattr(chunk, 'usage', None))
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        call.first_byte()
+                        parts.append(delta)
+                        yield delta
+    except CircuitOpenError:
+        yield CHAT_UNAVAILABLE_REPLY
+        return
+    except AdmissionRejected:
+        yield BUSY_REPLY
+        return
+    except Exception as e:
+        print(f"Error streaming chat reply: {e}")
+        if not parts:
+            yield 'Sorry, I had trouble understanding that.'
+        return
+    reply = ''.join(parts).strip()
+    if cacheable and reply:
+        _chat_cache.set(normalize_key(user_message), reply)
+    await _remember(user_id, user_message, reply)
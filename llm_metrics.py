@@ -0,0 +1,201 @@
+import asyncio
+import bisect
+import collections
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from openai import APITimeoutError
+
+from admission import AdmissionRejected
+from transport import CircuitOpenError
+
+# How often a one-line summary is printed; 0 turns it off
+LLM_METRICS_LOG_SECONDS = float(os.getenv('LLM_METRICS_LOG_SECONDS', '300'))
+# Upper bounds (ms) of the latency histogram buckets; slower calls land in the last, open bucket
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 750, 1000, 1500, 2500, 5000, 10000, 20000, 30000)
+OUTCOMES = ('ok', 'parse_error', 'fallback', 'shed', 'timeout', 'error', 'cancelled')
+
+
+class Histogram:
+    """Counts of observations per bucket, enough for approximate percentiles."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile, capped at the maximum seen."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(float(self.bounds[index]), self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max if self.count else None,
+            'buckets': {
+                **{f'le_{bound}': count for bound, count in zip(self.bounds, self.counts)},
+                'inf': self.counts[-1],
+            },
+        }
+
+
+class SiteStats:
+    def __init__(self):
+        self.outcomes = collections.Counter()
+        self.wall_ms = Histogram()
+        self.ttfb_ms = Histogram()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        calls = sum(self.outcomes.values())
+        return {
+            'calls': calls,
+            'outcomes': {outcome: self.outcomes[outcome] for outcome in OUTCOMES},
+            'wall_ms': self.wall_ms.snapshot(),
+            'ttfb_ms': self.ttfb_ms.snapshot(),
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'avg_total_tokens': (self.prompt_tokens + self.completion_tokens) / calls if calls else 0.0,
+        }
+
+
+def classify_outcome(exc: Optional[BaseException]) -> str:
+    if exc is None:
+        return 'ok'
+    if isinstance(exc, CircuitOpenError):
+        return 'fallback'
+    if isinstance(exc, AdmissionRejected):
+        return 'shed'
+    if isinstance(exc, (asyncio.TimeoutError, APITimeoutError)):
+        return 'timeout'
+    if isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+        return 'cancelled'
+    # pydantic's ValidationError and json's JSONDecodeError are both ValueErrors
+    if isinstance(exc, ValueError):
+        return 'parse_error'
+    return 'error'
+
+
+class LLMCall:
+    """One completion call being measured; see LLMMetrics.track."""
+
+    def __init__(self, metrics: 'LLMMetrics', site: str, model: str):
+        self._metrics = metrics
+        self.site = site
+        self.model = model
+        self.started = time.monotonic()
+        self.ttfb: Optional[float] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.outcome: Optional[str] = None
+
+    def first_byte(self):
+        """Mark the first streamed chunk; later calls are ignored."""
+        if self.ttfb is None:
+            self.ttfb = time.monotonic() - self.started
+
+    def add_usage(self, usage):
+        """Add token counts from a response's (or final stream chunk's) `usage`, if any."""
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+            self.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.monotonic() - self.started
+        outcome = self.outcome or classify_outcome(exc)
+        # A non-streamed response arrives in one piece, so its first byte is its last
+        ttfb = self.ttfb if self.ttfb is not None else (wall if outcome == 'ok' else None)
+        self._metrics.record(self.site, self.model, outcome, wall, ttfb,
+                             self.prompt_tokens, self.completion_tokens)
+        return False
+
+
+class LLMMetrics:
+    """Per call site and model latency histograms, token usage and outcome counts.
+
+    Call sites wrap each completion in `with metrics.track(site, model) as call:`;
+    the outcome is taken from the exception leaving the block unless the
+    site sets `call.outcome` itself. Snapshots are safe to take from the
+    health server's thread.
+    """
+
+    def __init__(self):
+        self._sites: Dict[tuple, SiteStats] = {}
+        self._lock = threading.Lock()
+
+    def track(self, site: str, model: str) -> LLMCall:
+        return LLMCall(self, site, model)
+
+    def record(self, site: str, model: str, outcome: str, wall: float, ttfb: Optional[float] = None,
+               prompt_tokens: int = 0, completion_tokens: int = 0):
+        with self._lock:
+            stats = self._sites.get((site, model))
+            if stats is None:
+                stats = self._sites[site, model] = SiteStats()
+            stats.outcomes[outcome] += 1
+            stats.wall_ms.observe(wall * 1000)
+            if ttfb is not None:
+                stats.ttfb_ms.observe(ttfb * 1000)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """{'site/model': stats} for every call site seen so far."""
+        with self._lock:
+            return {f'{site}/{model}': stats.snapshot() for (site, model), stats in sorted(self._sites.items())}
+
+    def summary_line(self) -> str:
+        parts = []
+        for name, stats in self.snapshot().items():
+            failed = ','.join(f'{outcome}={count}' for outcome, count in stats['outcomes'].items()
+                              if count and outcome != 'ok')
+            parts.append(
+                f"{name} n={stats['calls']} p50={_ms(stats['wall_ms']['p50'])} p95={_ms(stats['wall_ms']['p95'])} "
+                f"ttfb_p50={_ms(stats['ttfb_ms']['p50'])} tokens={stats['prompt_tokens']}+{stats['completion_tokens']}"
+                + (f' {failed}' if failed else '')
+            )
+        return 'LLM calls: ' + ('; '.join(parts) if parts else 'none')
+
+    def clear(self):
+        with self._lock:
+            self._sites.clear()
+
+
+def _ms(value: Optional[float]) -> str:
+    return '-' if value is None else f'{value:.0f}ms'
+
+
+async def log_periodically(metrics: LLMMetrics, interval: float = LLM_METRICS_LOG_SECONDS):
+    """Print the metrics summary every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        print(metrics.summary_line())
+
+
+metrics = LLMMetrics()
@@ -0,0 +1,164 @@
+import asyncio
+import collections
+import os
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from cache import LRUCache
+from reminders import append_conversation_turns, compact_conversation, load_conversation
+from tokens import CONVERSATION_SUMMARY_TOKENS, MESSAGE_OVERHEAD_TOKENS, estimate_tokens, truncate_to_tokens
+
+# Most history tokens (summary plus recent turns) added to one chat call
+CONVERSATION_TOKEN_BUDGET = int(os.getenv('CONVERSATION_TOKEN_BUDGET', '800'))
+# Turns kept verbatim per user before the oldest are folded into the summary
+CONVERSATION_MAX_TURNS = int(os.getenv('CONVERSATION_MAX_TURNS', '20'))
+# Users whose conversations stay in memory; others are reloaded from SQLite
+CONVERSATION_CACHE_SIZE = int(os.getenv('CONVERSATION_CACHE_SIZE', '1024'))
+
+# (turn_id, role, content)
+Turn = Tuple[int, str, str]
+# Called with (previous summary, [(role, content)] being folded in); returns the new summary
+Summarizer = Callable[[str, List[Tuple[str, str]]], Awaitable[str]]
+
+
+def _turn_tokens(turn: Turn) -> int:
+    return MESSAGE_OVERHEAD_TOKENS + estimate_tokens(turn[2])
+
+
+def summarize_locally(summary: str, turns: List[Tuple[str, str]], max_tokens: int = CONVERSATION_SUMMARY_TOKENS) -> str:
+    """Fallback summary without the LLM: the latest lines of the transcript that fit."""
+    lines = [summary] if summary else []
+    lines.extend(f"{'User' if role == 'user' else 'Zoey'}: {content}" for role, content in turns)
+    return truncate_to_tokens(' '.join(lines), max_tokens, keep_end=True)
+
+
+class _Conversation:
+    def __init__(self, summary: str, turns: List[Turn]):
+        self.summary = summary
+        self.turns: Deque[Turn] = collections.deque(turns)
+        self.lock = asyncio.Lock()
+
+    @property
+    def turn_tokens(self) -> int:
+        return sum(_turn_tokens(turn) for turn in self.turns)
+
+
+class ConversationMemory:
+    """Per-user chat history with a bounded prompt size.
+
+    Recent turns are kept in memory (an LRU of users) and in SQLite. Once
+    they exceed CONVERSATION_MAX_TURNS or their share of the token budget,
+    the oldest user/assistant pairs are folded into a running summary in
+    the background, so recording a turn never waits on the summarizer.
+    context() returns the summary plus as many recent turns as fit the
+    budget, and stats() reports the history tokens actually sent.
+    """
+
+    def __init__(self, summarize: Optional[Summarizer] = None, token_budget: int = CONVERSATION_TOKEN_BUDGET,
+                 summary_tokens: int = CONVERSATION_SUMMARY_TOKENS, max_turns: int = CONVERSATION_MAX_TURNS,
+                 cache_size: int = CONVERSATION_CACHE_SIZE):
+        self._summarize = summarize
+        self.token_budget = token_budget
+        self.summary_tokens = min(summary_tokens, token_budget // 2)
+        self.max_turns = max(2, max_turns)
+        self._conversations = LRUCache(cache_size)
+        self._tasks: Set[asyncio.Task] = set()
+        self.contexts = 0
+        self.context_tokens = 0
+        self.max_context_tokens = 0
+        self.compactions = 0
+
+    async def _load(self, user_id: int) -> _Conversation:
+        conversation = self._conversations.get(user_id)
+        if conversation is None:
+            summary, turns = await load_conversation(user_id, self.max_turns)
+            conversation = _Conversation(summary, turns)
+            self._conversations.set(user_id, conversation)
+        return conversation
+
+    async def context(self, user_id: int) -> List[Dict[str, str]]:
+        """Chat messages to send before the user's new message, within the token budget."""
+        conversation = await self._load(user_id)
+        messages = []
+        used = 0
+        if conversation.summary:
+            content = f'Summary of the earlier conversation: {conversation.summary}'
+            messages.append({'role': 'system', 'content': content})
+            used = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content)
+        recent = []
+        for turn in reversed(conversation.turns):
+            cost = _turn_tokens(turn)
+            if used + cost > self.token_budget:
+                break
+            used += cost
+            recent.append({'role': turn[1], 'content': turn[2]})
+        messages.extend(reversed(recent))
+        self.contexts += 1
+        self.context_tokens += used
+        self.max_context_tokens = max(self.max_context_tokens, used)
+        return messages
+
+    async def record(self, user_id: int, user_message: str, reply: str):
+        """Store one exchange and compact in the background if the history got too long."""
+        conversation = await self._load(user_id)
+        turns = [('user', user_message), ('assistant', reply)]
+        ids = await append_conversation_turns(user_id, turns)
+        conversation.turns.extend((turn_id, role, content) for turn_id, (role, content) in zip(ids, turns))
+        if self._overflowing(conversation):
+            task = asyncio.create_task(self._compact(user_id, conversation))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _overflowing(self, conversation: _Conversation) -> bool:
+        return (len(conversation.turns) > self.max_turns
+                or conversation.turn_tokens > self.token_budget - self.summary_tokens)
+
+    async def _compact(self, user_id: int, conversation: _Conversation):
+        async with conversation.lock:
+            # Fold whole exchanges, oldest first, until the rest fits; the newest exchange always stays
+            folded: List[Turn] = []
+            remaining = list(conversation.turns)
+            tokens = conversation.turn_tokens
+            while len(remaining) > 2 and (len(remaining) > self.max_turns or tokens > self.token_budget - self.summary_tokens):
+                for turn in remaining[:2]:
+                    tokens -= _turn_tokens(turn)
+                folded.extend(remaining[:2])
+                remaining = remaining[2:]
+            if not folded:
+                return
+            pairs = [(role, content) for _, role, content in folded]
+            summary = None
+            if self._summarize is not None:
+                try:
+                    summary = await self._summarize(conversation.summary, pairs)
+                except Exception as exc:
+                    print(f"Error summarizing conversation: {exc}")
+            if not summary:
+                summary = summarize_locally(conversation.summary, pairs, self.summary_tokens)
+            summary = truncate_to_tokens(summary.strip(), self.summary_tokens)
+            try:
+                await compact_conversation(user_id, folded[-1][0], summary)
+            except Exception as exc:
+                print(f"Error saving conversation summary: {exc}")
+                return
+            conversation.summary = summary
+            for _ in folded:
+                conversation.turns.popleft()
+            self.compactions += 1
+
+    async def drain(self):
+        """Wait for background compactions, e.g. before closing the database."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def clear(self):
+        self._conversations.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'contexts': self.contexts,
+            'avg_context_tokens': self.context_tokens / self.contexts if self.contexts else 0.0,
+            'max_context_tokens': self.max_context_tokens,
+            'token_budget': self.token_budget,
+            'compactions': self.compactions,
+            'users_cached': len(self._conversations),
+        }
@@ -1,4 +1,5 @@
 import argparse
+import asyncio
 import os
 
 from dotenv import load_dotenv
@@ -16,6 +17,9 @@ from telegram.ext import (
     filters,
 )
 
+from admission import set_current_user
+from coalescing import MessageCoalescer, commit
+from delivery import DeliveryEngine
 from health import (
     build_google_health_auth_url,
     build_health_dashboard,
@@ -24,17 +28,36 @@ from health import (
     start_health_callback_server,
 )
 from intents import (
+    conversation_memory,
     determine_intent,
+    get_intent_stats,
+    get_reminder_list_page,
+    get_response_cache_stats,
     handle_chat,
     handle_delete_reminder,
     handle_edit_reminder,
-    handle_list_reminders,
     handle_reminder,
+    openai_admission,
+    openai_transport,
+    stream_chat,
 )
-from reminders import get_due_reminders, init_db
+from llm_metrics import LLM_METRICS_LOG_SECONDS, log_periodically, metrics as llm_metrics
+from outbox import OutboxRelay
+from reminders import close_db, init_db, move_due_to_outbox
+from scheduler import ReminderScheduler, SchedulerLease
+from streaming import stream_reply
+
+# Stream chat replies into a progressively edited message instead of waiting for the full text
+CHAT_STREAMING = os.getenv('CHAT_STREAMING', '1') != '0'
 
 # Global application reference for sending reminders
 app = None
+# Started in post_init once the database is open
+scheduler = None
+scheduler_lease = None
+delivery_engine = None
+outbox_relay = None
+metrics_logger = None
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -66,9 +89,37 @@ async def handle_health_button(update: Update, context: ContextTypes.DEFAULT_TYP
     await query.edit_message_text(build_health_dashboard(metrics))
 
 
+def build_reminder_page_keyboard(page):
+    """Prev/Next buttons for a reminder list page, or None when it fits on one page.
+
+    Callback data is 'rem:<n|p>:<target_datetime>:<id>', well under Telegram's 64-byte limit.
+    """
+    if not page:
+        return None
+    buttons = []
+    if page['prev']:
+        buttons.append(InlineKeyboardButton('◀ Prev', callback_data='rem:p:{}:{}'.format(*page['prev'])))
+    if page['next']:
+        buttons.append(InlineKeyboardButton('Next ▶', callback_data='rem:n:{}:{}'.format(*page['next'])))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+async def handle_reminder_page_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Page through the user's reminders without going through intent classification."""
+    query = update.callback_query
+    await query.answer()
+
+    _, direction, target_ts, reminder_id = query.data.split(':')
+    cursor = (int(target_ts), int(reminder_id))
+    if direction == 'n':
+        text, page = await get_reminder_list_page(update.effective_user.id, after=cursor)
+    else:
+        text, page = await get_reminder_list_page(update.effective_user.id, before=cursor)
+    await query.edit_message_text(text, reply_markup=build_reminder_page_keyboard(page))
+
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_message = update.message.text
-    user_id = update.effective_user.id
 
     normalized_message = (user_message or "").strip().lower()
     if normalized_message in {"health", "show health", "health dashboard", "dashboard"}:
@@ -79,46 +130,110 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    intent = await determine_intent(user_message)
+    # Quick follow-ups are merged, so a thought split over several messages gets one answer
+    message_coalescer.submit(update.effective_chat.id, user_message, (update, context))
 
+
+async def process_message(user_message: str, payload) -> None:
+    """Answer one (possibly merged) message. Cancelled if a newer message arrives before commit()."""
+    update, context = payload
+    user_id = update.effective_user.id
+    # OpenAI calls below are rate limited and queued fairly per user
+    set_current_user(user_id)
+    intent, details = await determine_intent(user_message)
+
+    if intent in ('REMINDER', 'EDIT_REMINDER', 'DELETE_REMINDER'):
+        # These write to the database, which a later message cannot take back
+        commit()
     if intent == 'REMINDER':
-        response = await handle_reminder(user_message, user_id)
+        response = await handle_reminder(user_message, user_id, details)
     elif intent == 'LIST_REMINDERS':
-        response = await handle_list_reminders(user_id)
+        response, page = await get_reminder_list_page(user_id)
+        commit()
+        await update.message.reply_text(response, reply_markup=build_reminder_page_keyboard(page))
+        return
     elif intent == 'EDIT_REMINDER':
-        response = await handle_edit_reminder(user_message, user_id)
+        response = await handle_edit_reminder(user_message, user_id, details)
     elif intent == 'DELETE_REMINDER':
-        response = await handle_delete_reminder(user_message, user_id)
+        response = await handle_delete_reminder(user_message, user_id, details)
+    elif CHAT_STREAMING:
+        # Left uncommitted: if cancelled, the partial reply is removed and the merged message answered instead
+        await stream_reply(context.bot, update.effective_chat.id, stream_chat(user_message, user_id))
+        return
     else:
-        response = await handle_chat(user_message)
+        response = await handle_chat(user_message, user_id)
+        commit()
 
     await update.message.reply_text(response)
 
 
-async def reminder_job(context: ContextTypes.DEFAULT_TYPE):
-    """Job that runs every 30 seconds to check for due reminders."""
-    try:
-        due_reminders = await get_due_reminders()
-
-        for user_id, reminder_text in due_reminders:
-            try:
-                await context.bot.send_message(
-                    chat_id=user_id,
-                    text=f"⏰ Reminder: {reminder_text}",
-                )
-                print(f"Sent reminder to user {user_id}: {reminder_text}")
-            except Exception as exc:
-                print(f"Failed to send reminder to user {user_id}: {exc}")
+message_coalescer = MessageCoalescer(process_message)
 
-    except Exception as exc:
-        print(f"Error in reminder job: {exc}")
+
+async def deliver_due_reminders():
+    """Move due reminders into the outbox and wake the sender.
+
+    Called by the scheduler, which retries when this raises.
+    """
+    moved = await move_due_to_outbox()
+    if moved:
+        print(f"Queued {moved} reminders for delivery.")
+        outbox_relay.kick()
 
 
 async def post_init(application: Application) -> None:
-    """Initialize the database when the application starts."""
+    """Initialize the database and start the reminder scheduler and sender."""
+    global scheduler, scheduler_lease, delivery_engine, outbox_relay, metrics_logger
     print('Initializing database...')
     await init_db()
     print('Database initialized.')
+    delivery_engine = DeliveryEngine(
+        lambda chat_id, text: application.bot.send_message(chat_id=chat_id, text=text)
+    )
+    delivery_engine.start()
+    application.bot_data['delivery_engine'] = delivery_engine
+    outbox_relay = OutboxRelay(delivery_engine)
+    outbox_relay.start()
+    # Only the process holding the lease fires reminders; the outbox is safe to share
+    scheduler_lease = SchedulerLease()
+    scheduler_lease.start()
+    scheduler = ReminderScheduler(deliver_due_reminders, lease=scheduler_lease)
+    scheduler.start()
+    # Open a pooled connection to OpenAI before the first message needs it
+    await openai_transport.warmup()
+    if LLM_METRICS_LOG_SECONDS > 0:
+        metrics_logger = asyncio.create_task(log_periodically(llm_metrics))
+
+
+async def post_shutdown(application: Application) -> None:
+    """Stop the scheduler, drain the sender and close pooled database connections."""
+    if scheduler is not None:
+        await scheduler.stop()
+    if scheduler_lease is not None:
+        await scheduler_lease.stop()
+    if outbox_relay is not None:
+        await outbox_relay.stop()
+    if metrics_logger is not None:
+        metrics_logger.cancel()
+    await message_coalescer.close()
+    await conversation_memory.drain()
+    await openai_transport.close()
+    await close_db()
+    print('Database closed.')
+    print(f'Intent routing: {get_intent_stats()}')
+    print(f'Response caches: {get_response_cache_stats()}')
+    print(f'Conversation memory: {conversation_memory.stats()}')
+    print(f'Message coalescing: {message_coalescer.stats()}')
+    print(f'OpenAI transport: {openai_transport.stats()}')
+    print(f'OpenAI admission: {openai_admission.stats()}')
+    if delivery_engine is not None:
+        print(f'Reminder delivery: {delivery_engine.stats()}')
+    print(llm_metrics.summary_line())
+
+
+def delivery_stats():
+    """The reminder sender's counters, or None before post_init has started it."""
+    return delivery_engine.stats() if delivery_engine is not None else None
 
 
 def main():
@@ -138,15 +253,21 @@ def main():
         print(f'Token starts with: {token[:10]}...')
 
         print('Building Telegram application...')
-        app = Application.builder().token(token).post_init(post_init).build()
+        app = (
+            Application.builder()
+            .token(token)
+            .post_init(post_init)
+            .post_shutdown(post_shutdown)
+            .build()
+        )
         try:
-            start_health_callback_server(bot=getattr(app, 'bot', None))
+            start_health_callback_server(bot=getattr(app, 'bot', None), delivery_stats=delivery_stats)
         except Exception as exc:
             print(f'Health callback server startup warning: {exc}')
         app.add_handler(CommandHandler('start', start_command))
         app.add_handler(CallbackQueryHandler(handle_health_button, pattern='^health$'))
+        app.add_handler(CallbackQueryHandler(handle_reminder_page_button, pattern=r'^rem:[np]:\d+:\d+$'))
         app.add_handler(MessageHandler(filters.TEXT, handle_message))
-        app.job_queue.run_repeating(reminder_job, interval=30, first=60)
         print('Application built and handlers added.')
 
         if args.polling:
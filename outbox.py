@@ -0,0 +1,108 @@
+import asyncio
+import os
+from typing import List, Optional, Tuple
+
+from telegram.error import BadRequest, Forbidden
+
+from delivery import Delivery, DeliveryEngine
+from reminders import ack_outbox, claim_outbox, fail_outbox
+
+REMINDER_TEMPLATE = '⏰ Reminder: {text}'
+# Rows leased per claim; a new batch is only claimed once the engine is below it
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '200'))
+# Acknowledgements are written at most this often (or once a batch is full)
+ACK_FLUSH_SECONDS = 1.0
+# Safety net for retries whose backoff expired while nothing else happened
+OUTBOX_POLL_SECONDS = 30.0
+
+
+class OutboxRelay:
+    """Feeds outbox rows to a DeliveryEngine and writes results back in batches.
+
+    No transaction is held while messages are in flight: rows are leased by
+    claim_outbox, and acknowledged or failed later in one batch each.
+    Installs itself as the engine's on_result callback.
+    """
+
+    def __init__(self, engine: DeliveryEngine, batch_size: int = OUTBOX_BATCH_SIZE):
+        self._engine = engine
+        self._batch_size = batch_size
+        self._acks: List[int] = []
+        self._failures: List[Tuple[int, str, bool]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        engine.on_result = self._on_result
+
+    def kick(self):
+        """Wake the relay, e.g. after new rows were moved into the outbox."""
+        self._wakeup.set()
+
+    def _on_result(self, delivery: Delivery, ok: bool, error: Optional[BaseException]):
+        if ok:
+            self._acks.append(delivery.context)
+        else:
+            permanent = isinstance(error, (Forbidden, BadRequest))
+            self._failures.append((delivery.context, str(error), permanent))
+        if len(self._acks) + len(self._failures) >= self._batch_size:
+            self.kick()
+
+    async def flush(self):
+        """Write pending acknowledgements and failures."""
+        acks, self._acks = self._acks, []
+        failures, self._failures = self._failures, []
+        try:
+            await ack_outbox(acks)
+            await fail_outbox(failures)
+        except Exception:
+            # Keep them for the next flush; the rows stay leased meanwhile
+            self._acks[:0] = acks
+            self._failures[:0] = failures
+            raise
+
+    async def drain_once(self) -> int:
+        """Claim one batch of ready rows if the engine has room. Returns rows claimed."""
+        if self._engine.pending >= self._batch_size:
+            return 0
+        rows = await claim_outbox(self._batch_size)
+        for outbox_id, user_id, reminder_text in rows:
+            self._engine.submit(user_id, REMINDER_TEMPLATE.format(text=reminder_text), context=outbox_id)
+        return len(rows)
+
+    async def run(self):
+        while True:
+            try:
+                claimed = await self.drain_once()
+                await self.flush()
+                if claimed >= self._batch_size:
+                    continue
+                busy = self._engine.pending or self._acks or self._failures
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=ACK_FLUSH_SECONDS if busy else OUTBOX_POLL_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"Error in outbox relay: {exc}")
+                await asyncio.sleep(1)
+
+    def start(self) -> asyncio.Task:
+        """Start the relay loop; it immediately resumes rows left over from a previous run."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Stop claiming, let the engine drain and write the final results."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self._engine.stop()
+        await self.flush()
@@ -0,0 +1,110 @@
+import datetime
+import time
+from typing import Dict, List, Optional, Sequence
+
+import pytz
+
+from tokens import CONVERSATION_SUMMARY_TOKENS, estimate_message_tokens, estimate_tokens
+
+CENTRAL_TZ = pytz.timezone('America/Chicago')
+
+_registry: Dict[str, 'PromptTemplate'] = {}
+# (minute since the epoch, context line) from the last current_time_context() call
+_time_context = (None, '')
+
+
+class PromptTemplate:
+    """A system prompt built once at import time, with a token budget.
+
+    messages() puts the static system prompt first and anything that
+    changes per call (the current time, the known intent) in a second
+    system message just before the user's, so the start of every request
+    is identical and the provider can reuse its cached prefix.
+    """
+
+    def __init__(self, name: str, system: str, budget: int):
+        self.name = name
+        self.system = system
+        self.budget = budget
+        self.tokens = estimate_tokens(system)
+
+    def messages(self, user_content: str, context: Optional[str] = None,
+                 history: Sequence[Dict[str, str]] = ()) -> List[Dict[str, str]]:
+        messages = [{'role': 'system', 'content': self.system}, *history]
+        if context:
+            messages.append({'role': 'system', 'content': context})
+        messages.append({'role': 'user', 'content': user_content})
+        return messages
+
+
+def register(name: str, system: str, budget: int) -> PromptTemplate:
+    """Add a template to the registry; names must be unique."""
+    if name in _registry:
+        raise ValueError(f'Prompt {name!r} is already registered')
+    template = _registry[name] = PromptTemplate(name, system, budget)
+    return template
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    return _registry[name]
+
+
+def prompt_token_counts() -> Dict[str, Dict[str, int]]:
+    """Estimated tokens of each template's static part, against its budget."""
+    return {
+        name: {'tokens': template.tokens, 'budget': template.budget,
+               'request_tokens': estimate_message_tokens(template.messages(''))}
+        for name, template in sorted(_registry.items())
+    }
+
+
+def current_time_context() -> str:
+    """The current Central Time line for prompts, rebuilt at most once a minute."""
+    global _time_context
+    minute = int(time.time() // 60)
+    if _time_context[0] != minute:
+        now = datetime.datetime.now(CENTRAL_TZ)
+        offset = now.strftime('%z')
+        _time_context = (minute, f"Now (Central Time, UTC{offset[:3]}:{offset[3:]}): "
+                                 f"{now.strftime('%A %Y-%m-%d %H:%M')}")
+    return _time_context[1]
+
+
+_REMINDER_RULES = (
+    'All times are Central Time unless the user names another timezone.\n'
+    'For a new reminder, default the text to "Reminder", the date to "today" and the time to one hour from now. '
+    'Convert relative times like "in 20 minutes" to a date and time. If the message asks for several reminders, '
+    'put the first in the top-level fields and the others in more_reminders.'
+)
+
+INTERPRET = register('interpret', (
+    'Classify the intent and fill in the fields for it; leave the rest null.\n\n'
+    'REMINDER = create a new reminder\n'
+    'LIST_REMINDERS = see existing reminders\n'
+    'EDIT_REMINDER = change an existing reminder\n'
+    'DELETE_REMINDER = remove an existing reminder\n'
+    'CHAT = everything else\n\n'
+    'Examples:\n'
+    "'What's a good drink at Starbucks?' → CHAT\n"
+    "'I'm on PTO today' → CHAT\n"
+    "'What time is it' → CHAT\n"
+    "'Don't let me forget to buy milk' → REMINDER\n"
+    "'Alert me when it's 5pm' → REMINDER\n"
+    "'What reminders do I have?' → LIST_REMINDERS\n"
+    "'Change my 3pm reminder' → EDIT_REMINDER\n"
+    "'Remove the milk reminder' → DELETE_REMINDER\n\n"
+    + _REMINDER_RULES
+), budget=260)
+
+EXTRACT = register('extract', (
+    "Fill in the fields for the user's intent, which is given below, and leave the rest null.\n\n"
+    + _REMINDER_RULES
+), budget=125)
+
+CHAT = register('chat', 'You are Zoey, a helpful personal assistant. Keep responses brief and friendly.', budget=30)
+
+SUMMARY = register('summary', (
+    'Update the summary of a conversation between a user and their assistant Zoey with the new lines. '
+    'Keep facts, preferences and open questions the user may refer back to. '
+    f'Reply with the summary only, under {CONVERSATION_SUMMARY_TOKENS * 3 // 4} words.'
+), budget=64)
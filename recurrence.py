@@ -0,0 +1,261 @@
+import datetime
+import functools
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import FrozenSet, Optional, Tuple
+
+import pytz
+
+# What to do with a repeating reminder whose fire time was missed (e.g. the
+# machine was stopped): 'coalesce' fires it once and moves on to the next
+# future occurrence; 'skip' drops it unless it is less than
+# MISSED_GRACE_SECONDS late. Either way it never fires once per missed period.
+MISSED_POLICIES = ('coalesce', 'skip')
+MISSED_POLICY = os.getenv('REMINDER_MISSED_POLICY', 'coalesce')
+MISSED_GRACE_SECONDS = int(os.getenv('REMINDER_MISSED_GRACE_SECONDS', '300'))
+if MISSED_POLICY not in MISSED_POLICIES:
+    raise ValueError(f"REMINDER_MISSED_POLICY must be one of {', '.join(MISSED_POLICIES)}, got {MISSED_POLICY!r}")
+
+ALL_WEEKDAYS = frozenset(range(7))
+WORKDAYS = frozenset(range(5))
+
+_UNIT_SECONDS = {'minute': 60, 'hour': 3600}
+_UNIT_DAYS = {'day': 1, 'week': 7}
+_EVERY_RE = re.compile(r'^every\s+(\d+)\s+(minute|hour|day|week)s?$')
+_RRULE_FREQ = {'MINUTELY': 'minute', 'HOURLY': 'hour', 'DAILY': 'day', 'WEEKLY': 'week'}
+_RRULE_DAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+# Cron field bounds: minute, hour, day of month, month, day of week (0 or 7 = Sunday)
+_CRON_BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+# Longest cron search, enough for rules like "Feb 29 on a Monday"
+_CRON_SEARCH_DAYS = 366 * 8
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A parsed repeat rule.
+
+    kind is 'fixed' (every N seconds, for minute/hour units), 'calendar'
+    (every N days at the anchor's local wall time, optionally limited to
+    some weekdays) or 'cron'.
+    """
+    kind: str
+    step: int = 0
+    weekdays: FrozenSet[int] = ALL_WEEKDAYS
+    minutes: FrozenSet[int] = frozenset()
+    hours: FrozenSet[int] = frozenset()
+    month_days: FrozenSet[int] = frozenset()
+    months: FrozenSet[int] = frozenset()
+    cron_weekdays: FrozenSet[int] = frozenset()
+    day_restricted: bool = False
+    weekday_restricted: bool = False
+
+
+def _every(count: int, unit: str) -> Tuple[str, Rule]:
+    if count < 1:
+        raise ValueError('Repeat interval must be at least 1.')
+    if unit in _UNIT_SECONDS:
+        rule = Rule('fixed', step=count * _UNIT_SECONDS[unit])
+    else:
+        rule = Rule('calendar', step=count * _UNIT_DAYS[unit])
+    if count == 1 and unit in ('hour', 'day', 'week'):
+        canonical = {'hour': 'hourly', 'day': 'daily', 'week': 'weekly'}[unit]
+    else:
+        canonical = f'every {count} {unit}' + ('s' if count > 1 else '')
+    return canonical, rule
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in field.split(','):
+        body, _, step_text = part.partition('/')
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise ValueError(f'Invalid cron step: {part}')
+        if body == '*':
+            start, end = low, high
+        elif '-' in body:
+            start, end = (int(value) for value in body.split('-', 1))
+        else:
+            start = int(body)
+            end = high if step_text else start
+        if start < low or end > high or start > end:
+            raise ValueError(f'Cron value out of range: {part}')
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+def _parse_cron(expression: str) -> Tuple[str, Rule]:
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError('Cron rules need five fields: minute hour day month weekday.')
+    minutes, hours, month_days, months, weekdays = (
+        _parse_cron_field(field, low, high) for field, (low, high) in zip(fields, _CRON_BOUNDS)
+    )
+    # Cron counts Sunday as 0 (or 7); Python's weekday() counts Monday as 0
+    cron_weekdays = frozenset((day - 1) % 7 for day in weekdays)
+    rule = Rule(
+        'cron',
+        minutes=minutes,
+        hours=hours,
+        month_days=month_days,
+        months=months,
+        cron_weekdays=cron_weekdays,
+        day_restricted=fields[2] != '*',
+        weekday_restricted=fields[4] != '*',
+    )
+    return 'cron ' + ' '.join(fields), rule
+
+
+def _parse_rrule(expression: str) -> Tuple[str, Rule]:
+    parts = dict(part.split('=', 1) for part in expression.split(';') if '=' in part)
+    unit = _RRULE_FREQ.get(parts.get('FREQ', ''))
+    if unit is None:
+        raise ValueError('Supported RRULE frequencies are MINUTELY, HOURLY, DAILY and WEEKLY.')
+    unknown = set(parts) - {'FREQ', 'INTERVAL', 'BYDAY'}
+    if unknown:
+        raise ValueError(f'Unsupported RRULE parts: {", ".join(sorted(unknown))}')
+    interval = int(parts.get('INTERVAL', '1'))
+    _, rule = _every(interval, unit)
+    if 'BYDAY' in parts:
+        if unit not in ('day', 'week') or interval != 1:
+            raise ValueError('BYDAY is only supported with FREQ=DAILY or FREQ=WEEKLY and INTERVAL=1.')
+        byday = parts['BYDAY'].split(',')
+        for day in byday:
+            if day not in _RRULE_DAYS:
+                raise ValueError(f'unsupported BYDAY value {day!r}')
+        days = frozenset(_RRULE_DAYS[day] for day in byday)
+        rule = Rule('calendar', step=1, weekdays=days)
+    canonical = 'RRULE:' + ';'.join(f'{key}={parts[key]}' for key in ('FREQ', 'INTERVAL', 'BYDAY') if key in parts)
+    return canonical, rule
+
+
+@functools.lru_cache(maxsize=256)
+def _parse(rule_text: str) -> Tuple[str, Rule]:
+    text = ' '.join(rule_text.strip().split())
+    lowered = text.lower()
+    if lowered in ('daily', 'every day'):
+        return _every(1, 'day')
+    if lowered in ('weekly', 'every week'):
+        return _every(1, 'week')
+    if lowered in ('hourly', 'every hour'):
+        return _every(1, 'hour')
+    if lowered in ('weekdays', 'every weekday', 'workdays'):
+        return 'weekdays', Rule('calendar', step=1, weekdays=WORKDAYS)
+    match = _EVERY_RE.match(lowered)
+    if match:
+        return _every(int(match.group(1)), match.group(2))
+    if lowered.startswith('cron '):
+        return _parse_cron(text[5:])
+    if lowered.startswith('rrule:'):
+        return _parse_rrule(text[6:].upper())
+    raise ValueError(f'Unsupported repeat rule: {rule_text}')
+
+
+def normalize_rule(rule_text: Optional[str]) -> Optional[str]:
+    """Return the canonical form of a repeat rule, or None for no repeat.
+
+    Accepts 'daily', 'weekly', 'hourly', 'weekdays', 'every N minutes/hours/
+    days/weeks', 'cron M H DOM MON DOW' and an RRULE subset
+    ('RRULE:FREQ=DAILY;INTERVAL=2', 'RRULE:FREQ=WEEKLY;BYDAY=MO,WE').
+    Raises ValueError for anything else.
+    """
+    if rule_text is None or rule_text.strip().lower() in ('', 'none', 'null'):
+        return None
+    return _parse(rule_text)[0]
+
+
+def localize(tz, naive: datetime.datetime) -> datetime.datetime:
+    """Attach a pytz timezone to a naive wall time."""
+    # normalize() moves wall times that fall in a DST gap forward
+    return tz.normalize(tz.localize(naive))
+
+
+def _localize(tz, naive: datetime.datetime) -> int:
+    return int(localize(tz, naive).timestamp())
+
+
+def _next_calendar(rule: Rule, anchor: datetime.datetime, after_ts: int, tz) -> int:
+    wall_time = anchor.time().replace(tzinfo=None)
+    after_local = datetime.datetime.fromtimestamp(after_ts, tz).replace(tzinfo=None)
+    if rule.weekdays == ALL_WEEKDAYS:
+        elapsed_days = (after_local.date() - anchor.date()).days
+        periods = max(1, math.ceil(elapsed_days / rule.step))
+        candidate = _localize(tz, datetime.datetime.combine(anchor.date(), wall_time) + datetime.timedelta(days=periods * rule.step))
+        if candidate <= after_ts:
+            candidate = _localize(tz, datetime.datetime.combine(anchor.date(), wall_time) + datetime.timedelta(days=(periods + 1) * rule.step))
+        return candidate
+    # Weekday-limited daily rule: at most a week of candidates
+    day = max(after_local.date(), anchor.date() + datetime.timedelta(days=1))
+    for _ in range(8):
+        if day.weekday() in rule.weekdays:
+            candidate = _localize(tz, datetime.datetime.combine(day, wall_time))
+            if candidate > after_ts:
+                return candidate
+        day += datetime.timedelta(days=1)
+    raise ValueError('Repeat rule has no matching weekdays.')
+
+
+def _cron_day_matches(rule: Rule, day: datetime.date) -> bool:
+    if day.month not in rule.months:
+        return False
+    dom = day.day in rule.month_days
+    dow = day.weekday() in rule.cron_weekdays
+    # Standard cron: when both fields are restricted, either one may match
+    if rule.day_restricted and rule.weekday_restricted:
+        return dom or dow
+    return dom and dow
+
+
+def _next_cron(rule: Rule, after_ts: int, tz) -> int:
+    start = datetime.datetime.fromtimestamp(after_ts, tz).replace(tzinfo=None, second=0, microsecond=0)
+    start += datetime.timedelta(minutes=1)
+    hours = sorted(rule.hours)
+    minutes = sorted(rule.minutes)
+    day = start.date()
+    for _ in range(_CRON_SEARCH_DAYS):
+        if _cron_day_matches(rule, day):
+            for hour in hours:
+                for minute in minutes:
+                    candidate = datetime.datetime.combine(day, datetime.time(hour, minute))
+                    if candidate >= start:
+                        timestamp = _localize(tz, candidate)
+                        if timestamp > after_ts:
+                            return timestamp
+        day += datetime.timedelta(days=1)
+    raise ValueError('Cron rule never fires.')
+
+
+def next_occurrence(rule_text: str, anchor_ts: int, after_ts: int, timezone: str = 'UTC') -> int:
+    """Return the first occurrence strictly after `after_ts` (UTC epoch seconds).
+
+    Occurrences are aligned to `anchor_ts`, the reminder's current fire time,
+    and day-based rules keep its local wall time in `timezone` across DST
+    changes. Interval rules jump straight over missed periods instead of
+    stepping through them.
+    """
+    _, rule = _parse(rule_text)
+    after_ts = max(after_ts, anchor_ts)
+    if rule.kind == 'fixed':
+        periods = (after_ts - anchor_ts) // rule.step + 1
+        return anchor_ts + periods * rule.step
+    try:
+        tz = pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        tz = pytz.UTC
+    if rule.kind == 'calendar':
+        return _next_calendar(rule, datetime.datetime.fromtimestamp(anchor_ts, tz), after_ts, tz)
+    return _next_cron(rule, after_ts, tz)
+
+
+def advance(rule_text: str, scheduled_ts: int, now_ts: int, timezone: str = 'UTC',
+            policy: str = MISSED_POLICY, grace_seconds: int = MISSED_GRACE_SECONDS) -> Tuple[bool, int]:
+    """Decide whether a due repeating reminder fires now, and when it fires next.
+
+    Returns (fire, next_ts). The next fire time is always in the future, so
+    a reminder that was down for N periods is handled exactly once.
+    """
+    late = now_ts - scheduled_ts
+    fire = policy != 'skip' or late <= grace_seconds
+    return fire, next_occurrence(rule_text, scheduled_ts, now_ts, timezone)
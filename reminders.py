@@ -2,14 +2,213 @@ import os
 import asyncio
 import aiosqlite
 import datetime
+import difflib
+import re
+import time
 import pytz
-from typing import List, Tuple, Optional, Dict
+from typing import Awaitable, Callable, List, Tuple, Optional, Dict
+
+from cache import LRUCache
+from recurrence import advance, normalize_rule
+from storage import close_pool, get_pool, open_pool
 
 DB_PATH = os.getenv('DB_PATH', 'zoey.db')
+# Outbox rows handed to the sender stay invisible for this long; if they are
+# neither acknowledged nor failed by then (crash), they are sent again
+OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '120'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+OUTBOX_BASE_BACKOFF_SECONDS = 30
+OUTBOX_MAX_BACKOFF_SECONDS = 3600
+LIST_PAGE_SIZE = int(os.getenv('REMINDER_LIST_PAGE_SIZE', '10'))
+# Words that say what to do with a reminder rather than which one it is
+SEARCH_STOPWORDS = frozenset((
+    'a', 'about', 'all', 'an', 'and', 'at', 'cancel', 'change', 'delete', 'edit', 'for', 'get', 'i', 'in', 'it',
+    'me', 'move', 'my', 'of', 'on', 'one', 'please', 'remind', 'reminder', 'reminders', 'remove', 'rename', 'rid',
+    'set', 'that', 'the', 'to', 'update',
+))
+_SEARCH_TOKEN_RE = re.compile(r'\w+')
+FUZZY_MATCH_THRESHOLD = 0.75
+# user_settings rows kept in memory; each entry is a few hundred bytes
+USER_SETTINGS_CACHE_SIZE = int(os.getenv('USER_SETTINGS_CACHE_SIZE', '2048'))
+
+# Bumped whenever a migration is added to _MIGRATIONS (stored in PRAGMA user_version)
+SCHEMA_VERSION = 6
+
+# Called with (reminder_id, next fire time as UTC epoch seconds, or None when removed)
+ScheduleListener = Callable[[int, Optional[int]], None]
+_schedule_listeners: List[ScheduleListener] = []
+
+# user_id -> (timezone name, pytz timezone); updated write-through by set_user_timezone
+_settings_cache = LRUCache(USER_SETTINGS_CACHE_SIZE)
+
+def add_schedule_listener(listener: ScheduleListener):
+    """Register a callback for reminder fire-time changes."""
+    _schedule_listeners.append(listener)
+
+def remove_schedule_listener(listener: ScheduleListener):
+    """Unregister a callback added with add_schedule_listener."""
+    if listener in _schedule_listeners:
+        _schedule_listeners.remove(listener)
+
+def _notify_schedule(reminder_id: int, target_ts: Optional[int]):
+    for listener in list(_schedule_listeners):
+        try:
+            listener(reminder_id, target_ts)
+        except Exception as exc:
+            print(f"Error in schedule listener: {exc}")
+
+def _to_epoch(value: datetime.datetime) -> int:
+    """Convert a timezone-aware datetime to UTC epoch seconds."""
+    return int(value.timestamp())
+
+async def _migrate_epoch_times(db: aiosqlite.Connection):
+    """v1: store target_datetime and created_at as integer UTC epoch seconds.
+
+    Old rows hold ISO strings, some with a '+00:00' suffix and some naive
+    (always UTC). strftime('%s') handles both; unparseable times become due now.
+    """
+    await db.execute('''
+        CREATE TABLE reminders_v1 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            reminder_text TEXT NOT NULL,
+            target_datetime INTEGER NOT NULL,  -- UTC epoch seconds
+            repeat_interval TEXT CHECK(repeat_interval IS NULL OR repeat_interval IN ('daily', 'weekly')),
+            timezone TEXT NOT NULL DEFAULT 'UTC',
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),  -- UTC epoch seconds
+            UNIQUE(user_id, reminder_text)  -- Prevent duplicate texts per user
+        )
+    ''')
+    await db.execute('''
+        INSERT INTO reminders_v1 (id, user_id, reminder_text, target_datetime, repeat_interval, timezone, created_at)
+        SELECT id, user_id, reminder_text,
+               COALESCE(CAST(strftime('%s', target_datetime) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER)),
+               repeat_interval, timezone,
+               COALESCE(CAST(strftime('%s', created_at) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+        FROM reminders
+    ''')
+    await db.execute('DROP TABLE reminders')
+    await db.execute('ALTER TABLE reminders_v1 RENAME TO reminders')
+    await db.execute('CREATE INDEX idx_user_datetime ON reminders(user_id, target_datetime)')
+    await db.execute('CREATE INDEX idx_due_datetime ON reminders(target_datetime)')
+
+async def _migrate_free_form_repeat(db: aiosqlite.Connection):
+    """v2: drop the daily/weekly CHECK so repeat_interval can hold any rule recurrence.py accepts."""
+    await db.execute('''
+        CREATE TABLE reminders_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            reminder_text TEXT NOT NULL,
+            target_datetime INTEGER NOT NULL,  -- UTC epoch seconds, next fire time
+            repeat_interval TEXT,  -- Canonical recurrence rule, validated by recurrence.normalize_rule
+            timezone TEXT NOT NULL DEFAULT 'UTC',
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),  -- UTC epoch seconds
+            UNIQUE(user_id, reminder_text)  -- Prevent duplicate texts per user
+        )
+    ''')
+    await db.execute('INSERT INTO reminders_v2 SELECT id, user_id, reminder_text, target_datetime, repeat_interval, timezone, created_at FROM reminders')
+    await db.execute('DROP TABLE reminders')
+    await db.execute('ALTER TABLE reminders_v2 RENAME TO reminders')
+    await db.execute('CREATE INDEX idx_user_datetime ON reminders(user_id, target_datetime)')
+    await db.execute('CREATE INDEX idx_due_datetime ON reminders(target_datetime)')
+
+async def _migrate_outbox(db: aiosqlite.Connection):
+    """v3: add the delivery outbox that due reminders move into before sending."""
+    await db.execute('''
+        CREATE TABLE outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reminder_id INTEGER,
+            user_id INTEGER NOT NULL,
+            reminder_text TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at INTEGER NOT NULL,  -- UTC epoch seconds; pushed forward while leased
+            last_error TEXT,
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    await db.execute('CREATE INDEX idx_outbox_next_attempt ON outbox(next_attempt_at)')
+
+async def _migrate_leases(db: aiosqlite.Connection):
+    """v4: add named leases so only one process runs the due-reminder pipeline."""
+    await db.execute('''
+        CREATE TABLE leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL  -- UTC epoch seconds
+        )
+    ''')
+
+async def _migrate_reminder_search(db: aiosqlite.Connection):
+    """v5: FTS5 index over reminder_text, kept in sync by triggers.
+
+    External-content table: the text lives only in reminders. A later
+    migration that rebuilds reminders must recreate these triggers and
+    run the 'rebuild' command again.
+    """
+    await db.execute('''
+        CREATE VIRTUAL TABLE reminders_fts USING fts5(
+            reminder_text, content='reminders', content_rowid='id', tokenize='porter unicode61'
+        )
+    ''')
+    await db.execute('''
+        CREATE TRIGGER reminders_fts_insert AFTER INSERT ON reminders BEGIN
+            INSERT INTO reminders_fts(rowid, reminder_text) VALUES (new.id, new.reminder_text);
+        END
+    ''')
+    await db.execute('''
+        CREATE TRIGGER reminders_fts_delete AFTER DELETE ON reminders BEGIN
+            INSERT INTO reminders_fts(reminders_fts, rowid, reminder_text) VALUES ('delete', old.id, old.reminder_text);
+        END
+    ''')
+    # Only text changes touch the index; rescheduling a repeat does not
+    await db.execute('''
+        CREATE TRIGGER reminders_fts_update AFTER UPDATE OF reminder_text ON reminders BEGIN
+            INSERT INTO reminders_fts(reminders_fts, rowid, reminder_text) VALUES ('delete', old.id, old.reminder_text);
+            INSERT INTO reminders_fts(rowid, reminder_text) VALUES (new.id, new.reminder_text);
+        END
+    ''')
+    await db.execute("INSERT INTO reminders_fts(reminders_fts) VALUES ('rebuild')")
+
+async def _migrate_conversations(db: aiosqlite.Connection):
+    """v6: recent chat turns and a running summary of older ones, per user."""
+    await db.execute('''
+        CREATE TABLE conversation_turns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
+            content TEXT NOT NULL,
+            created_at INTEGER NOT NULL  -- UTC epoch seconds
+        )
+    ''')
+    await db.execute('CREATE INDEX idx_conversation_user ON conversation_turns(user_id, id)')
+    await db.execute('''
+        CREATE TABLE conversation_summaries (
+            user_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL,
+            updated_at INTEGER NOT NULL  -- UTC epoch seconds
+        )
+    ''')
+
+# Migration for each schema version, applied in order on top of the original schema
+_MIGRATIONS: Dict[int, Callable[[aiosqlite.Connection], Awaitable[None]]] = {
+    1: _migrate_epoch_times,
+    2: _migrate_free_form_repeat,
+    3: _migrate_outbox,
+    4: _migrate_leases,
+    5: _migrate_reminder_search,
+    6: _migrate_conversations,
+}
 
 async def init_db():
-    """Initialize the database and create tables."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    """Open the connection pool, create tables and migrate them to SCHEMA_VERSION.
+
+    Fresh databases start from the original schema and run every migration,
+    so there is a single path to the current layout. All of it runs in one
+    transaction: a failed migration leaves the file untouched.
+    """
+    pool = await open_pool(DB_PATH)
+    async with pool.write() as db:
+        await db.execute('BEGIN IMMEDIATE')
         await db.execute('''
             CREATE TABLE IF NOT EXISTS reminders (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -23,87 +222,343 @@ async def init_db():
             )
         ''')
         await db.execute('CREATE INDEX IF NOT EXISTS idx_user_datetime ON reminders(user_id, target_datetime)')
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_due_datetime ON reminders(target_datetime)')
         await db.execute('''
             CREATE TABLE IF NOT EXISTS user_settings (
                 user_id INTEGER PRIMARY KEY,
                 timezone TEXT NOT NULL DEFAULT 'UTC'
             )
         ''')
-        await db.commit()
+        async with db.execute('PRAGMA user_version') as cursor:
+            version = (await cursor.fetchone())[0]
+        for target_version in range(version + 1, SCHEMA_VERSION + 1):
+            print(f'Migrating database to schema version {target_version}...')
+            await _MIGRATIONS[target_version](db)
+            await db.execute(f'PRAGMA user_version = {target_version}')
+
+async def close_db():
+    """Close the connection pool opened by init_db."""
+    _settings_cache.clear()
+    await close_pool()
+
+def _settings_entry(timezone: str):
+    try:
+        return timezone, pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        return timezone, pytz.UTC
+
+async def _get_user_settings(user_id: int):
+    entry = _settings_cache.get(user_id)
+    if entry is None:
+        async with get_pool().read() as db:
+            async with db.execute('SELECT timezone FROM user_settings WHERE user_id = ?', (user_id,)) as cursor:
+                row = await cursor.fetchone()
+        entry = _settings_entry(row[0] if row else 'UTC')
+        _settings_cache.set(user_id, entry)
+    return entry
 
 async def get_user_timezone(user_id: int) -> str:
     """Get user's timezone, default to UTC."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('SELECT timezone FROM user_settings WHERE user_id = ?', (user_id,))
-        row = await cursor.fetchone()
-        return row[0] if row else 'UTC'
+    return (await _get_user_settings(user_id))[0]
+
+async def get_user_tzinfo(user_id: int) -> datetime.tzinfo:
+    """Get user's timezone as a pytz timezone, default to UTC."""
+    return (await _get_user_settings(user_id))[1]
 
 async def set_user_timezone(user_id: int, timezone: str):
     """Set or update user's timezone."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with get_pool().write() as db:
         await db.execute('INSERT OR REPLACE INTO user_settings (user_id, timezone) VALUES (?, ?)', (user_id, timezone))
-        await db.commit()
+    _settings_cache.set(user_id, _settings_entry(timezone))
+
+def get_settings_cache_stats() -> Dict:
+    """Hit/miss counters and size of the user settings cache."""
+    return _settings_cache.stats()
 
 async def add_reminder(user_id: int, reminder_text: str, target_time: datetime.datetime, repeat_interval: Optional[str] = None) -> bool:
-    """Add a reminder. Validates against past dates and duplicates. target_time should be timezone-aware."""
+    """Add a reminder. Validates against past dates, duplicates and unknown repeat rules. target_time should be timezone-aware."""
     now = datetime.datetime.now(pytz.UTC)
     if target_time <= now:
         return False  # Prevent past reminders
+    try:
+        repeat_interval = normalize_rule(repeat_interval)
+    except ValueError:
+        return False
     tz = await get_user_timezone(user_id)
-    utc_time = target_time.astimezone(pytz.UTC)
+    target_ts = _to_epoch(target_time)
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute('''
+        async with get_pool().write() as db:
+            cursor = await db.execute('''
                 INSERT INTO reminders (user_id, reminder_text, target_datetime, repeat_interval, timezone)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, reminder_text, utc_time.isoformat(), repeat_interval, tz))
-            await db.commit()
+            ''', (user_id, reminder_text, target_ts, repeat_interval, tz))
+        _notify_schedule(cursor.lastrowid, target_ts)
         return True
     except aiosqlite.IntegrityError:
         return False  # Duplicate text
 
-async def get_due_reminders() -> List[Tuple[int, str]]:
-    """Get due reminders, reschedule repeats, and delete non-repeats."""
+async def add_reminders(user_id: int, items: List[Tuple[str, datetime.datetime, Optional[str]]]) -> List[str]:
+    """Add several (reminder_text, target_time, repeat_interval) reminders in one transaction.
+
+    Applies add_reminder's checks to each item and returns one status per
+    item, in order: 'added', 'duplicate' (already stored or repeated in the
+    batch), 'past' or 'invalid' (unknown repeat rule). Existing texts are
+    looked up and the new rows inserted with one statement each, so a
+    message asking for several reminders takes the write lock once.
+    """
     now = datetime.datetime.now(pytz.UTC)
-    due = []
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('SELECT id, user_id, reminder_text, target_datetime, repeat_interval FROM reminders WHERE target_datetime <= ?', (now.isoformat(),))
-        rows = await cursor.fetchall()
-        for row in rows:
-            rid, uid, text, dt_str, repeat = row
-            due.append((uid, text))
-            if repeat:
-                # Reschedule next occurrence
-                dt = datetime.datetime.fromisoformat(dt_str).replace(tzinfo=pytz.UTC)
-                if repeat == 'daily':
-                    next_dt = dt + datetime.timedelta(days=1)
-                elif repeat == 'weekly':
-                    next_dt = dt + datetime.timedelta(weeks=1)
-                await db.execute('UPDATE reminders SET target_datetime = ? WHERE id = ?', (next_dt.isoformat(), rid))
-            else:
-                await db.execute('DELETE FROM reminders WHERE id = ?', (rid,))
-        await db.commit()
-    return due
+    statuses: List[str] = []
+    pending: Dict[str, Tuple[int, int, Optional[str]]] = {}
+    for index, (reminder_text, target_time, repeat_interval) in enumerate(items):
+        if target_time <= now:
+            statuses.append('past')
+            continue
+        try:
+            repeat_interval = normalize_rule(repeat_interval)
+        except ValueError:
+            statuses.append('invalid')
+            continue
+        if reminder_text in pending:
+            statuses.append('duplicate')
+            continue
+        pending[reminder_text] = (index, _to_epoch(target_time), repeat_interval)
+        statuses.append('added')
+    if not pending:
+        return statuses
+    tz = await get_user_timezone(user_id)
+    placeholders = ','.join('?' * len(pending))
+    async with get_pool().write() as db:
+        async with db.execute(
+            f'SELECT reminder_text FROM reminders WHERE user_id = ? AND reminder_text IN ({placeholders})',
+            (user_id, *pending),
+        ) as cursor:
+            for (reminder_text,) in await cursor.fetchall():
+                statuses[pending.pop(reminder_text)[0]] = 'duplicate'
+        if not pending:
+            return statuses
+        await db.executemany('''
+            INSERT INTO reminders (user_id, reminder_text, target_datetime, repeat_interval, timezone)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(user_id, text, target_ts, repeat, tz) for text, (_, target_ts, repeat) in pending.items()])
+        placeholders = ','.join('?' * len(pending))
+        async with db.execute(
+            f'SELECT id, target_datetime FROM reminders WHERE user_id = ? AND reminder_text IN ({placeholders})',
+            (user_id, *pending),
+        ) as cursor:
+            scheduled = await cursor.fetchall()
+    for reminder_id, target_ts in scheduled:
+        _notify_schedule(reminder_id, target_ts)
+    return statuses
+
+async def move_due_to_outbox() -> int:
+    """Move due reminders into the outbox, reschedule repeats, and delete non-repeats.
+
+    Everything happens in one short transaction: one-shot reminders are
+    copied and deleted with two statements on the due-time index, and
+    repeating ones get their next occurrence from recurrence.advance in
+    one executemany batch. Sending happens later from the outbox, so a
+    failed send or a crash no longer loses the reminder.
+    Returns the number of outbox rows created.
+    """
+    now = int(time.time())
+    rescheduled = []
+    fired = []
+    async with get_pool().write() as db:
+        cursor = await db.execute(
+            'INSERT INTO outbox (reminder_id, user_id, reminder_text, next_attempt_at) '
+            'SELECT id, user_id, reminder_text, ? FROM reminders WHERE target_datetime <= ? AND repeat_interval IS NULL',
+            (now, now),
+        )
+        moved = cursor.rowcount
+        await db.execute('DELETE FROM reminders WHERE target_datetime <= ? AND repeat_interval IS NULL', (now,))
+        async with db.execute(
+            'SELECT id, user_id, reminder_text, target_datetime, repeat_interval, timezone FROM reminders WHERE target_datetime <= ? AND repeat_interval IS NOT NULL',
+            (now,),
+        ) as cursor:
+            repeating = await cursor.fetchall()
+        broken = []
+        for rid, uid, text, target_ts, repeat, tz_name in repeating:
+            try:
+                fire, next_ts = advance(repeat, target_ts, now, tz_name)
+            except ValueError as exc:
+                print(f"Dropping reminder {rid} with invalid repeat rule {repeat!r}: {exc}")
+                fired.append((rid, uid, text, now))
+                broken.append((rid,))
+                continue
+            if fire:
+                fired.append((rid, uid, text, now))
+            rescheduled.append((next_ts, rid))
+        if rescheduled:
+            await db.executemany('UPDATE reminders SET target_datetime = ? WHERE id = ?', rescheduled)
+        if broken:
+            await db.executemany('DELETE FROM reminders WHERE id = ?', broken)
+        if fired:
+            await db.executemany(
+                'INSERT INTO outbox (reminder_id, user_id, reminder_text, next_attempt_at) VALUES (?, ?, ?, ?)', fired
+            )
+    for next_ts, rid in rescheduled:
+        _notify_schedule(rid, next_ts)
+    return moved + len(fired)
+
+async def claim_outbox(limit: int) -> List[Tuple[int, int, str]]:
+    """Lease up to `limit` outbox rows that are ready to send; returns (outbox_id, user_id, reminder_text)."""
+    now = int(time.time())
+    async with get_pool().write() as db:
+        async with db.execute('''
+            UPDATE outbox SET next_attempt_at = ?
+            WHERE id IN (SELECT id FROM outbox WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?)
+            RETURNING id, user_id, reminder_text
+        ''', (now + OUTBOX_LEASE_SECONDS, now, limit)) as cursor:
+            return list(await cursor.fetchall())
+
+async def ack_outbox(outbox_ids: List[int]):
+    """Delete delivered outbox rows in one batch."""
+    if outbox_ids:
+        async with get_pool().write() as db:
+            await db.executemany('DELETE FROM outbox WHERE id = ?', [(oid,) for oid in outbox_ids])
+
+async def fail_outbox(failures: List[Tuple[int, str, bool]]):
+    """Record failed sends as (outbox_id, error, permanent) in one batch.
+
+    Transient failures are retried with exponential backoff until
+    OUTBOX_MAX_ATTEMPTS; permanent ones and exhausted rows are dropped.
+    """
+    if not failures:
+        return
+    now = int(time.time())
+    retry = [(error, now, OUTBOX_MAX_BACKOFF_SECONDS, OUTBOX_BASE_BACKOFF_SECONDS, oid) for oid, error, permanent in failures if not permanent]
+    drop = [(oid,) for oid, _, permanent in failures if permanent]
+    async with get_pool().write() as db:
+        if retry:
+            await db.executemany('''
+                UPDATE outbox SET attempts = attempts + 1, last_error = ?,
+                    next_attempt_at = ? + MIN(?, ? * (1 << attempts))
+                WHERE id = ?
+            ''', retry)
+        if drop:
+            await db.executemany('DELETE FROM outbox WHERE id = ?', drop)
+        async with db.execute(
+            'DELETE FROM outbox WHERE attempts >= ? RETURNING user_id, reminder_text, last_error', (OUTBOX_MAX_ATTEMPTS,)
+        ) as cursor:
+            for uid, text, error in await cursor.fetchall():
+                print(f"Giving up on reminder for user {uid} after {OUTBOX_MAX_ATTEMPTS} attempts: {text} ({error})")
+
+async def get_upcoming_reminders(until_ts: int) -> List[Tuple[int, int]]:
+    """Return (id, UTC epoch fire time) for every reminder due at or before `until_ts`, including overdue ones."""
+    async with get_pool().read() as db:
+        async with db.execute('SELECT id, target_datetime FROM reminders WHERE target_datetime <= ?', (until_ts,)) as cursor:
+            return list(await cursor.fetchall())
+
+def _format_reminder(row, tz) -> Dict:
+    rid, text, target_ts, repeat = row
+    dt_local = datetime.datetime.fromtimestamp(target_ts, tz)
+    return {
+        'id': rid,
+        'text': text,
+        'datetime': dt_local.strftime('%Y-%m-%d %H:%M %Z'),
+        'repeat': repeat,
+        'cursor': (target_ts, rid),
+    }
 
 async def list_reminders(user_id: int) -> List[Dict]:
     """List all reminders for a user, with local timezone display."""
-    tz_str = await get_user_timezone(user_id)
-    tz = pytz.timezone(tz_str)
-    reminders = []
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('SELECT id, reminder_text, target_datetime, repeat_interval FROM reminders WHERE user_id = ? ORDER BY target_datetime', (user_id,))
-        rows = await cursor.fetchall()
-        for row in rows:
-            rid, text, dt_str, repeat = row
-            dt_utc = datetime.datetime.fromisoformat(dt_str).replace(tzinfo=pytz.UTC)
-            dt_local = dt_utc.astimezone(tz)
-            reminders.append({
-                'id': rid,
-                'text': text,
-                'datetime': dt_local.strftime('%Y-%m-%d %H:%M %Z'),
-                'repeat': repeat
-            })
-    return reminders
+    tz = await get_user_tzinfo(user_id)
+    async with get_pool().read() as db:
+        async with db.execute('SELECT id, reminder_text, target_datetime, repeat_interval FROM reminders WHERE user_id = ? ORDER BY target_datetime, id', (user_id,)) as cursor:
+            rows = await cursor.fetchall()
+    return [_format_reminder(row, tz) for row in rows]
+
+async def list_reminders_page(user_id: int, after: Optional[Tuple[int, int]] = None, before: Optional[Tuple[int, int]] = None,
+                              limit: int = LIST_PAGE_SIZE) -> Dict:
+    """One page of a user's reminders by keyset seek on (target_datetime, id).
+
+    Pass the 'next' cursor of a page as `after` or its 'prev' cursor as
+    `before`. Each page is a single range read on idx_user_datetime no
+    matter how many reminders the user has. Returns {'reminders', 'next', 'prev'},
+    where a cursor is None when there is nothing further in that direction.
+    """
+    tz = await get_user_tzinfo(user_id)
+    columns = 'SELECT id, reminder_text, target_datetime, repeat_interval FROM reminders WHERE user_id = ?'
+    async with get_pool().read() as db:
+        if before is not None:
+            query = f'{columns} AND (target_datetime, id) < (?, ?) ORDER BY target_datetime DESC, id DESC LIMIT ?'
+            params = (user_id, before[0], before[1], limit + 1)
+        elif after is not None:
+            query = f'{columns} AND (target_datetime, id) > (?, ?) ORDER BY target_datetime, id LIMIT ?'
+            params = (user_id, after[0], after[1], limit + 1)
+        else:
+            query = f'{columns} ORDER BY target_datetime, id LIMIT ?'
+            params = (user_id, limit + 1)
+        async with db.execute(query, params) as cursor:
+            rows = list(await cursor.fetchall())
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if before is not None:
+        rows.reverse()
+    items = [_format_reminder(row, tz) for row in rows]
+    if not items:
+        return {'reminders': [], 'next': None, 'prev': None}
+    has_next = more if before is None else True
+    has_prev = more if before is not None else after is not None
+    return {
+        'reminders': items,
+        'next': items[-1]['cursor'] if has_next else None,
+        'prev': items[0]['cursor'] if has_prev else None,
+    }
+
+def _fuzzy_score(terms: List[str], text: str) -> float:
+    """Average over terms of the best similarity to any word in `text`."""
+    words = _SEARCH_TOKEN_RE.findall(text.lower())
+    if not words:
+        return 0.0
+    return sum(
+        max(difflib.SequenceMatcher(None, term, word).ratio() for word in words) for term in terms
+    ) / len(terms)
+
+def search_terms(description: str) -> List[str]:
+    """The words of a description that find_reminders searches for (stopwords and numbers dropped)."""
+    return [
+        token for token in _SEARCH_TOKEN_RE.findall(description.lower())
+        if token not in SEARCH_STOPWORDS and not token.isdigit()
+    ]
+
+async def find_reminders(user_id: int, description: str, limit: int = 5) -> List[Dict]:
+    """Find a user's reminders matching a free-text description, best match first.
+
+    Uses the FTS5 index with prefix matching ("dentist" finds "Dentist
+    appointment"), ranked by bm25. Reminders matching every term come back
+    with 'exact' set; only when there are none are reminders matching some
+    of the terms returned, with 'exact' False. If nothing matches, falls
+    back to fuzzy matching against the user's reminder texts to tolerate
+    typos, which is exact when every term is close to a word in the text.
+    """
+    terms = search_terms(description)
+    if not terms:
+        return []
+    tz = await get_user_tzinfo(user_id)
+    async with get_pool().read() as db:
+        for joiner, exact in ((' AND ', True), (' OR ', False)):
+            match = joiner.join(f'"{term}"*' for term in terms)
+            async with db.execute('''
+                SELECT r.id, r.reminder_text, r.target_datetime, r.repeat_interval
+                FROM reminders_fts JOIN reminders r ON r.id = reminders_fts.rowid
+                WHERE reminders_fts MATCH ? AND r.user_id = ?
+                ORDER BY bm25(reminders_fts) LIMIT ?
+            ''', (match, user_id, limit)) as cursor:
+                rows = await cursor.fetchall()
+            if rows:
+                return [dict(_format_reminder(row, tz), exact=exact) for row in rows]
+        async with db.execute('SELECT id, reminder_text, target_datetime, repeat_interval FROM reminders WHERE user_id = ?', (user_id,)) as cursor:
+            candidates = await cursor.fetchall()
+    ranked = []
+    for row in candidates:
+        scores = [_fuzzy_score([term], row[1]) for term in terms]
+        ranked.append((sum(scores) / len(scores), min(scores), row))
+    ranked.sort(key=lambda item: -item[0])
+    return [
+        dict(_format_reminder(row, tz), exact=lowest >= FUZZY_MATCH_THRESHOLD)
+        for score, lowest, row in ranked if score >= FUZZY_MATCH_THRESHOLD
+    ][:limit]
 
 async def edit_reminder(user_id: int, reminder_id: int, new_text: Optional[str] = None, new_datetime: Optional[datetime.datetime] = None, new_repeat: Optional[str] = None) -> bool:
     """Edit a reminder. Validates ownership and past dates."""
@@ -117,25 +572,100 @@ async def edit_reminder(user_id: int, reminder_id: int, new_text: Optional[str]
         if new_datetime <= now:
             return False
         updates.append('target_datetime = ?')
-        params.append(new_datetime.astimezone(pytz.UTC).isoformat())
+        params.append(_to_epoch(new_datetime))
     if new_repeat is not None:
         if new_repeat == 'none':
             updates.append('repeat_interval = NULL')
         else:
+            try:
+                new_repeat = normalize_rule(new_repeat)
+            except ValueError:
+                return False
             updates.append('repeat_interval = ?')
             params.append(new_repeat)
     if not updates:
         return False
     params.append(reminder_id)
     params.append(user_id)
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(f'UPDATE reminders SET {", ".join(updates)} WHERE id = ? AND user_id = ?', params)
-        await db.commit()
-        return db.total_changes > 0
+    async with get_pool().write() as db:
+        cursor = await db.execute(f'UPDATE reminders SET {", ".join(updates)} WHERE id = ? AND user_id = ?', params)
+    # rowcount, not total_changes: the pooled connection is long-lived
+    changed = cursor.rowcount > 0
+    if changed and new_datetime:
+        _notify_schedule(reminder_id, _to_epoch(new_datetime))
+    return changed
 
 async def delete_reminder(user_id: int, reminder_id: int) -> bool:
     """Delete a reminder by ID, checking ownership."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('DELETE FROM reminders WHERE id = ? AND user_id = ?', (reminder_id, user_id))
-        await db.commit()
-        return db.total_changes > 0
\ No newline at end of file
+    async with get_pool().write() as db:
+        cursor = await db.execute('DELETE FROM reminders WHERE id = ? AND user_id = ?', (reminder_id, user_id))
+    deleted = cursor.rowcount > 0
+    if deleted:
+        _notify_schedule(reminder_id, None)
+    return deleted
+
+async def acquire_lease(name: str, holder: str, ttl_seconds: float) -> Optional[float]:
+    """Take or renew the named lease for `holder`.
+
+    Succeeds if the lease is free, expired, or already held by `holder`.
+    SQLite's write lock makes this atomic across processes sharing DB_PATH.
+    Returns the new expiry (UTC epoch seconds), or None if someone else holds it.
+    """
+    now = time.time()
+    expires_at = now + ttl_seconds
+    async with get_pool().write() as db:
+        cursor = await db.execute('''
+            INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE leases.holder = excluded.holder OR leases.expires_at <= ?
+        ''', (name, holder, expires_at, now))
+    return expires_at if cursor.rowcount > 0 else None
+
+async def get_data_version() -> int:
+    """SQLite's PRAGMA data_version on the writer connection.
+
+    Every write of this process goes through that connection, so the value
+    only changes when another process commits to the database.
+    """
+    async with get_pool().write() as db:
+        async with db.execute('PRAGMA data_version') as cursor:
+            return (await cursor.fetchone())[0]
+
+async def release_lease(name: str, holder: str):
+    """Give up the named lease if `holder` has it, so another process can take over at once."""
+    async with get_pool().write() as db:
+        await db.execute('DELETE FROM leases WHERE name = ? AND holder = ?', (name, holder))
+
+async def load_conversation(user_id: int, limit: int) -> Tuple[str, List[Tuple[int, str, str]]]:
+    """Return (summary, [(turn_id, role, content)]) with the user's latest `limit` turns, oldest first."""
+    async with get_pool().read() as db:
+        async with db.execute('SELECT summary FROM conversation_summaries WHERE user_id = ?', (user_id,)) as cursor:
+            row = await cursor.fetchone()
+        async with db.execute(
+            'SELECT id, role, content FROM conversation_turns WHERE user_id = ? ORDER BY id DESC LIMIT ?', (user_id, limit)
+        ) as cursor:
+            turns = await cursor.fetchall()
+    return (row[0] if row else ''), [tuple(turn) for turn in reversed(turns)]
+
+async def append_conversation_turns(user_id: int, turns: List[Tuple[str, str]]) -> List[int]:
+    """Store (role, content) turns and return their IDs."""
+    now = int(time.time())
+    ids = []
+    async with get_pool().write() as db:
+        for role, content in turns:
+            cursor = await db.execute(
+                'INSERT INTO conversation_turns (user_id, role, content, created_at) VALUES (?, ?, ?, ?)',
+                (user_id, role, content, now),
+            )
+            ids.append(cursor.lastrowid)
+    return ids
+
+async def compact_conversation(user_id: int, through_id: int, summary: str):
+    """Replace the user's turns up to and including `through_id` with a new running summary."""
+    now = int(time.time())
+    async with get_pool().write() as db:
+        await db.execute('DELETE FROM conversation_turns WHERE user_id = ? AND id <= ?', (user_id, through_id))
+        await db.execute('''
+            INSERT INTO conversation_summaries (user_id, summary, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET summary = excluded.summary, updated_at = excluded.updated_at
+        ''', (user_id, summary, now))
@@ -0,0 +1,268 @@
+import asyncio
+import heapq
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from reminders import (
+    acquire_lease,
+    add_schedule_listener,
+    get_data_version,
+    get_upcoming_reminders,
+    release_lease,
+    remove_schedule_listener,
+)
+
+# How far ahead reminders are loaded into memory. Anything later is picked
+# up by the next window refresh, which is the only periodic database read.
+WINDOW_SECONDS = int(os.getenv('REMINDER_WINDOW_SECONDS', '3600'))
+# A crashed lease holder is replaced within about this long; must exceed 3 * LEASE_SAFETY_SECONDS
+LEASE_TTL_SECONDS = float(os.getenv('SCHEDULER_LEASE_TTL_SECONDS', '30'))
+# Stop acting as holder this long before the lease runs out, to cover slow heartbeats
+LEASE_SAFETY_SECONDS = 2.0
+# Pause before retrying after an error, e.g. on_due hitting a locked database
+ERROR_RETRY_SECONDS = 1.0
+
+
+class SchedulerLease:
+    """Heartbeat on a named row in the leases table so one process holds the scheduler.
+
+    Every process tries to take the lease every TTL/3 seconds; the holder's
+    attempts renew it. If the holder dies, its lease expires and the next
+    attempt by another process takes over. Renew listeners run after every
+    heartbeat that finds the lease held.
+    """
+
+    def __init__(self, name: str = 'reminder-scheduler', ttl_seconds: float = LEASE_TTL_SECONDS):
+        if ttl_seconds <= 3 * LEASE_SAFETY_SECONDS:
+            # Heartbeats come every TTL/3, so a shorter lease would lapse between them and flap
+            raise ValueError(f'Scheduler lease TTL must be more than {3 * LEASE_SAFETY_SECONDS:g} seconds, got {ttl_seconds:g}')
+        self.name = name
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._ttl = ttl_seconds
+        self._expires_at = 0.0
+        self._acquired = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._renew_listeners: List[Callable[[], Awaitable[None]]] = []
+
+    def add_renew_listener(self, listener: Callable[[], Awaitable[None]]):
+        self._renew_listeners.append(listener)
+
+    def remove_renew_listener(self, listener: Callable[[], Awaitable[None]]):
+        if listener in self._renew_listeners:
+            self._renew_listeners.remove(listener)
+
+    @property
+    def expires_at(self) -> float:
+        """When `held` turns false unless the lease is renewed first."""
+        return self._expires_at - LEASE_SAFETY_SECONDS
+
+    @property
+    def held(self) -> bool:
+        return time.time() < self.expires_at
+
+    async def heartbeat(self) -> bool:
+        """Try to take or renew the lease once. Returns whether it is held."""
+        was_held = self.held
+        try:
+            expires_at = await acquire_lease(self.name, self.holder, self._ttl)
+        except Exception as exc:
+            # Keep what we had; the local expiry still bounds it
+            print(f"Scheduler lease heartbeat failed: {exc}")
+            expires_at = self._expires_at if was_held else None
+        self._expires_at = expires_at or 0.0
+        if self.held:
+            if not was_held:
+                print(f"Scheduler lease acquired by {self.holder}")
+            self._acquired.set()
+            for listener in list(self._renew_listeners):
+                try:
+                    await listener()
+                except Exception as exc:
+                    print(f"Error in scheduler lease listener: {exc}")
+        else:
+            if was_held:
+                print(f"Scheduler lease lost by {self.holder}")
+            self._acquired.clear()
+        return self.held
+
+    async def wait_held(self):
+        """Wait until this process holds the lease."""
+        while not self.held:
+            self._acquired.clear()
+            await self._acquired.wait()
+
+    async def run(self):
+        while True:
+            await self.heartbeat()
+            await asyncio.sleep(self._ttl / 3)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Stop heartbeating and release the lease so another process can take over at once."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._expires_at:
+            self._expires_at = 0.0
+            try:
+                await release_lease(self.name, self.holder)
+            except Exception as exc:
+                print(f"Could not release scheduler lease: {exc}")
+
+
+class ReminderScheduler:
+    """Min-heap of upcoming reminder fire times that sleeps until the next one.
+
+    The heap is filled from SQLite at startup and on every window refresh, and
+    kept current through the reminders schedule listener. Entries are removed
+    lazily: `_times` holds the live fire time per reminder and any heap entry
+    that disagrees with it is stale.
+
+    With a SchedulerLease, only the process holding it fires `on_due`; the
+    others wait for the lease and reload their window when they get it.
+    Reminders written by other processes never reach the listener, so on
+    every lease heartbeat the holder checks SQLite's data_version and
+    reloads the window when another process has committed since.
+    """
+
+    def __init__(self, on_due: Callable[[], Awaitable[None]], window_seconds: int = WINDOW_SECONDS,
+                 lease: Optional[SchedulerLease] = None):
+        self._on_due = on_due
+        self._lease = lease
+        self._window_seconds = window_seconds
+        self._heap: List[Tuple[int, int]] = []
+        self._times: Dict[int, int] = {}
+        self._window_end = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Changes that arrive while load_window is reading are replayed after it
+        self._pending: Optional[List[Tuple[int, Optional[int]]]] = None
+        self._data_version: Optional[int] = None
+
+    def schedule(self, reminder_id: int, timestamp: Optional[int]):
+        """Add, move or (with None) remove a reminder's fire time (UTC epoch seconds)."""
+        if self._pending is not None:
+            self._pending.append((reminder_id, timestamp))
+            return
+        if timestamp is None or timestamp > self._window_end:
+            self._times.pop(reminder_id, None)
+            return
+        next_fire = self.next_fire_time()
+        self._times[reminder_id] = timestamp
+        heapq.heappush(self._heap, (timestamp, reminder_id))
+        if next_fire is None or timestamp < next_fire:
+            self._wakeup.set()
+
+    def next_fire_time(self) -> Optional[int]:
+        """Return the earliest live fire time as a UNIX timestamp, if any."""
+        while self._heap:
+            timestamp, reminder_id = self._heap[0]
+            if self._times.get(reminder_id) == timestamp:
+                return timestamp
+            heapq.heappop(self._heap)
+        return None
+
+    def __len__(self):
+        return len(self._times)
+
+    async def load_window(self):
+        """Reload every reminder due before the end of the next window."""
+        window_end = int(time.time()) + self._window_seconds
+        self._pending = []
+        try:
+            # Read first, so a commit racing the query below still counts as a change
+            self._data_version = await get_data_version()
+            rows = await get_upcoming_reminders(window_end)
+            self._window_end = window_end
+            self._times = dict(rows)
+            self._heap = [(timestamp, reminder_id) for reminder_id, timestamp in self._times.items()]
+            heapq.heapify(self._heap)
+        finally:
+            pending, self._pending = self._pending, None
+        for reminder_id, timestamp in pending:
+            self.schedule(reminder_id, timestamp)
+
+    async def check_external_changes(self):
+        """Reload the window soon if another process has written to the database since it was loaded."""
+        if self._data_version is None:
+            return
+        if await get_data_version() != self._data_version:
+            self._window_end = 0
+            self._wakeup.set()
+
+    def _pop_due(self, now: float):
+        while True:
+            timestamp = self.next_fire_time()
+            if timestamp is None or timestamp > now:
+                return
+            _, reminder_id = heapq.heappop(self._heap)
+            del self._times[reminder_id]
+
+    async def run(self):
+        """Fire `on_due` whenever a reminder comes due; never returns on its own."""
+        while True:
+            try:
+                if self._lease is not None and not self._lease.held:
+                    await self._lease.wait_held()
+                    self._window_end = 0  # Reload: another process may have fired reminders meanwhile
+                    continue
+
+                now = time.time()
+                if now >= self._window_end:
+                    await self.load_window()
+                    continue
+
+                next_fire = self.next_fire_time()
+                if next_fire is not None and next_fire <= now:
+                    # Due entries stay until on_due succeeds, so a failure is retried below.
+                    # Repeating reminders come back through schedule() with a later time.
+                    await self._on_due()
+                    self._pop_due(now)
+                    continue
+
+                deadline = self._window_end if next_fire is None else min(next_fire, self._window_end)
+                if self._lease is not None:
+                    deadline = min(deadline, self._lease.expires_at)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=deadline - now)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"Error in reminder scheduler: {exc}")
+                await asyncio.sleep(ERROR_RETRY_SECONDS)
+
+    def start(self) -> asyncio.Task:
+        """Subscribe to reminder changes and start the run loop."""
+        if self._task is None:
+            add_schedule_listener(self.schedule)
+            if self._lease is not None:
+                self._lease.add_renew_listener(self.check_external_changes)
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Cancel the run loop and unsubscribe."""
+        remove_schedule_listener(self.schedule)
+        if self._lease is not None:
+            self._lease.remove_renew_listener(self.check_external_changes)
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,115 @@
+import asyncio
+import contextlib
+import os
+from typing import AsyncIterator, List, Optional
+
+import aiosqlite
+
+# Reader connections kept open alongside the single writer connection
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '3'))
+# Per-connection prepared statement cache (sqlite3 default is 128)
+CACHED_STATEMENTS = int(os.getenv('DB_CACHED_STATEMENTS', '256'))
+
+# Applied to every connection when it is opened
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',  # Safe with WAL, avoids an fsync per commit
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-4096',  # 4 MB page cache per connection
+    'PRAGMA foreign_keys=ON',
+)
+
+
+class ConnectionPool:
+    """Long-lived aiosqlite connections: one serialized writer and a few readers.
+
+    WAL mode lets the readers run while the writer holds a transaction, so
+    message handlers are not blocked by the reminder job.
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE, cached_statements: int = CACHED_STATEMENTS):
+        self.path = path
+        self.size = max(1, size)
+        self.cached_statements = cached_statements
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: 'asyncio.Queue[aiosqlite.Connection]' = asyncio.Queue()
+        self._connections: List[aiosqlite.Connection] = []
+
+    async def _connect(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path, cached_statements=self.cached_statements)
+        for pragma in PRAGMAS:
+            await db.execute(pragma)
+        self._connections.append(db)
+        return db
+
+    async def open(self):
+        """Open the writer first so the file and WAL exist before readers attach."""
+        self._writer = await self._connect()
+        for _ in range(self.size):
+            self._readers.put_nowait(await self._connect())
+
+    async def close(self):
+        """Close every connection. The pool cannot be reused afterwards."""
+        connections, self._connections = self._connections, []
+        self._writer = None
+        for db in connections:
+            try:
+                await db.close()
+            except Exception as exc:
+                print(f"Error closing database connection: {exc}")
+
+    @contextlib.asynccontextmanager
+    async def read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a reader connection for SELECT statements."""
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @contextlib.asynccontextmanager
+    async def write(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Run statements on the writer inside one transaction.
+
+        Commits when the block exits normally and rolls back on any error.
+        """
+        async with self._write_lock:
+            db = self._writer
+            if db is None:
+                raise RuntimeError('Database pool is closed.')
+            try:
+                yield db
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+
+
+_pool: Optional[ConnectionPool] = None
+
+
+async def open_pool(path: str) -> ConnectionPool:
+    """Open the shared pool if it is not already open and return it."""
+    global _pool
+    if _pool is None:
+        pool = ConnectionPool(path)
+        await pool.open()
+        _pool = pool
+    return _pool
+
+
+async def close_pool():
+    """Close the shared pool, if open."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the shared pool opened by open_pool()."""
+    if _pool is None:
+        raise RuntimeError('Database pool is not open; call init_db() first.')
+    return _pool
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Optional
+
+from telegram.constants import ChatAction, MessageLimit
+from telegram.error import BadRequest, RetryAfter
+
+from delivery import retry_after_seconds
+
+# Minimum gap between edits of one message; Telegram throttles bots that edit faster
+STREAM_EDIT_INTERVAL_SECONDS = float(os.getenv('STREAM_EDIT_INTERVAL_SECONDS', '1.0'))
+# Telegram shows a chat action for about five seconds
+TYPING_REFRESH_SECONDS = 4.0
+PLACEHOLDER_TEXT = '…'
+# Appended to partial text so it reads as still being written
+CURSOR = ' ▌'
+# Replaces the placeholder when the model streamed nothing
+EMPTY_REPLY_TEXT = 'Sorry, I had trouble understanding that.'
+
+
+class StreamingReply:
+    """Shows a reply while it is generated by editing one Telegram message.
+
+    start() sends a typing indicator and a placeholder in the background, so
+    the model request is not held up by Telegram round trips. append()
+    only records text; a background task applies it with edit_message_text
+    at most once per `min_interval`, so bursts of tokens are coalesced into
+    one edit. finish() writes the complete text, splitting it into further
+    messages if it is longer than Telegram allows.
+    """
+
+    def __init__(self, bot, chat_id: int, min_interval: float = STREAM_EDIT_INTERVAL_SECONDS):
+        self._bot = bot
+        self._chat_id = chat_id
+        self._min_interval = min_interval
+        self._text = ''
+        self._shown = ''
+        self._message_id: Optional[int] = None
+        self._placeholder: Optional[asyncio.Task] = None
+        self._last_edit = 0.0
+        self._dirty = asyncio.Event()
+        self._tasks = []
+        self.edits = 0
+
+    def start(self):
+        self._placeholder = asyncio.create_task(self._send_placeholder())
+        self._tasks.append(asyncio.create_task(self._keep_typing()))
+        self._tasks.append(asyncio.create_task(self._flush_loop()))
+
+    async def _send_placeholder(self):
+        message = await self._bot.send_message(chat_id=self._chat_id, text=PLACEHOLDER_TEXT)
+        self._message_id = message.message_id
+        self._shown = PLACEHOLDER_TEXT
+        self._last_edit = time.monotonic()
+
+    def append(self, chunk: str):
+        self._text += chunk
+        self._dirty.set()
+
+    async def _keep_typing(self):
+        while True:
+            try:
+                await self._bot.send_chat_action(chat_id=self._chat_id, action=ChatAction.TYPING)
+            except Exception as exc:
+                print(f"Could not send typing indicator: {exc}")
+            await asyncio.sleep(TYPING_REFRESH_SECONDS)
+
+    async def _edit(self, text: str):
+        text = text[:MessageLimit.MAX_TEXT_LENGTH]
+        if not text.strip() or text == self._shown:
+            return
+        try:
+            await self._bot.edit_message_text(text, chat_id=self._chat_id, message_id=self._message_id)
+        except BadRequest as exc:
+            # Raised when the text did not actually change; anything else is worth logging
+            if 'not modified' not in str(exc).lower():
+                print(f"Could not update streamed reply: {exc}")
+        self._shown = text
+        self._last_edit = time.monotonic()
+        self.edits += 1
+
+    async def _flush_loop(self):
+        # Shielded: cancelling this loop must not cancel the placeholder finish() waits for
+        await asyncio.shield(self._placeholder)
+        while True:
+            await self._dirty.wait()
+            wait = self._last_edit + self._min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._dirty.clear()
+            try:
+                await self._edit(self._text.strip() + CURSOR)
+            except RetryAfter as exc:
+                self._dirty.set()
+                await asyncio.sleep(retry_after_seconds(exc))
+
+    async def _stop_tasks(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def finish(self, text: Optional[str] = None) -> str:
+        """Stop streaming and show the final text (the appended text by default)."""
+        await self._stop_tasks()
+        final = (text if text is not None else self._text).strip() or EMPTY_REPLY_TEXT
+        limit = MessageLimit.MAX_TEXT_LENGTH
+        head, rest = final[:limit], final[limit:]
+        try:
+            await self._placeholder
+        except Exception as exc:
+            print(f"Could not send placeholder message: {exc}")
+        if self._message_id is None:
+            rest = final
+        else:
+            try:
+                await self._edit(head)
+            except RetryAfter as exc:
+                await asyncio.sleep(retry_after_seconds(exc))
+                await self._edit(head)
+        while rest:
+            await self._bot.send_message(chat_id=self._chat_id, text=rest[:limit])
+            rest = rest[limit:]
+        return final
+
+    async def abort(self):
+        """Stop streaming and remove the unfinished message, e.g. when a newer message superseded it."""
+        await self._stop_tasks()
+        if self._placeholder is not None:
+            self._placeholder.cancel()
+            await asyncio.gather(self._placeholder, return_exceptions=True)
+        if self._message_id is not None:
+            try:
+                await self._bot.delete_message(chat_id=self._chat_id, message_id=self._message_id)
+            except Exception as exc:
+                print(f"Could not remove unfinished reply: {exc}")
+            self._message_id = None
+
+
+async def stream_reply(bot, chat_id: int, chunks: AsyncIterator[str],
+                       min_interval: float = STREAM_EDIT_INTERVAL_SECONDS) -> str:
+    """Show `chunks` as one progressively edited message and return the full text."""
+    reply = StreamingReply(bot, chat_id, min_interval)
+    reply.start()
+    try:
+        async for chunk in chunks:
+            reply.append(chunk)
+    except BaseException:
+        await reply.abort()
+        raise
+    return await reply.finish()
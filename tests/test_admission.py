@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import intents
+from admission import AdmissionController, AdmissionRejected, set_current_user
+
+
+class AdmissionControllerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.order = []
+        self.gate = asyncio.Event()
+
+    async def call(self, controller, user, label=None):
+        async with controller.slot(user):
+            self.order.append(label or user)
+            await self.gate.wait()
+
+    async def test_concurrency_is_capped(self):
+        controller = AdmissionController(max_concurrency=2, user_rate=100, user_burst=100)
+        tasks = [asyncio.create_task(self.call(controller, user)) for user in range(5)]
+        await asyncio.sleep(0.01)
+
+        self.assertEqual((controller.active, controller.waiting), (2, 3))
+        self.gate.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(controller.stats()['admitted'], 5)
+        self.assertEqual((controller.active, controller.waiting), (0, 0))
+
+    async def test_queued_calls_are_served_round_robin(self):
+        controller = AdmissionController(max_concurrency=1, user_rate=100, user_burst=100)
+        blocker = asyncio.create_task(self.call(controller, 'blocker'))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(self.call(controller, 'spammer', f'spam{index}')) for index in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(self.call(controller, 'polite')))
+        await asyncio.sleep(0.01)
+
+        self.gate.set()
+        await asyncio.gather(blocker, *tasks)
+        self.assertEqual(self.order[:3], ['blocker', 'spam0', 'polite'])
+
+    async def test_full_queue_sheds_new_calls(self):
+        controller = AdmissionController(max_concurrency=1, queue_limit=1, user_rate=100, user_burst=100)
+        tasks = [asyncio.create_task(self.call(controller, user)) for user in range(2)]
+        await asyncio.sleep(0.01)
+
+        with self.assertRaises(AdmissionRejected) as caught:
+            await self.call(controller, 3)
+        self.assertEqual(caught.exception.reason, 'busy')
+        self.gate.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(controller.stats()['shed'], 1)
+
+    async def test_users_over_their_rate_are_rejected(self):
+        controller = AdmissionController(user_rate=0.01, user_burst=2)
+        self.gate.set()
+        await self.call(controller, 'a')
+        await self.call(controller, 'a')
+
+        with self.assertRaises(AdmissionRejected) as caught:
+            await self.call(controller, 'a')
+        self.assertEqual(caught.exception.reason, 'rate_limited')
+        await self.call(controller, 'b')
+
+    async def test_cancelled_waiters_do_not_leak_slots(self):
+        controller = AdmissionController(max_concurrency=1, user_rate=100, user_burst=100)
+        holder = asyncio.create_task(self.call(controller, 'a'))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(self.call(controller, 'b'))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        self.assertEqual(controller.waiting, 0)
+        self.gate.set()
+        await holder
+        self.assertEqual(controller.active, 0)
+        await self.call(controller, 'c')
+
+    async def test_current_user_is_used_by_default(self):
+        controller = AdmissionController(user_rate=0.01, user_burst=1)
+        self.gate.set()
+        set_current_user(42)
+        await self.call(controller, None)
+
+        with self.assertRaises(AdmissionRejected):
+            await self.call(controller, None)
+
+
+class BusyReplyTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.original_admission = intents.openai_admission
+        self.original_client = intents._client
+        intents.openai_admission = AdmissionController(user_rate=0.01, user_burst=1)
+        intents._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=self.create)))
+        intents._chat_cache.clear()
+        intents._intent_cache.clear()
+        self.calls = 0
+
+    async def asyncTearDown(self):
+        intents.openai_admission = self.original_admission
+        intents._client = self.original_client
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content='Sure.', tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def test_user_over_the_limit_gets_a_busy_reply(self):
+        set_current_user(7)
+        self.assertEqual(await intents.handle_chat('Recommend a book'), 'Sure.')
+        self.assertEqual(await intents.handle_chat('Recommend a film'), intents.BUSY_REPLY)
+        self.assertEqual([chunk async for chunk in intents.stream_chat('Recommend a song')], [intents.BUSY_REPLY])
+        self.assertEqual(self.calls, 1)
+
+    async def test_rejected_classification_falls_back_to_the_rules(self):
+        set_current_user(8)
+        await intents.handle_chat('Recommend a book')
+
+        intent, details = await intents.determine_intent('I need to see the doctor, remind me at 3')
+        self.assertEqual((intent, details), ('REMINDER', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from benchmarks.bench_pipeline import run_pipeline
+from benchmarks.replay import ReplayStore, synthesize
+from transport import CompletionRecorder
+
+
+class BenchPipelineTests(unittest.IsolatedAsyncioTestCase):
+    async def test_small_run_reports_every_section(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            report = await run_pipeline(messages=60, users=5, concurrency=8,
+                                        db_path=os.path.join(tmpdir, 'pipeline.db'))
+
+        results = report['results']
+        self.assertEqual(results['errors'], 0)
+        self.assertEqual(results['latency']['samples'], 60)
+        self.assertEqual(sum(kind['samples'] for kind in results['latency_by_kind'].values()), 60)
+        self.assertIn('read', results['db'])
+        self.assertGreater(results['telegram']['sent'], 0)
+        self.assertEqual(results['openai']['replayed'], 0)
+
+    async def test_recorded_responses_are_replayed(self):
+        request = {'model': 'gpt-3.5-turbo', 'messages': [{'role': 'user', 'content': 'Recommend a book'}]}
+        response = synthesize(request)['response']
+        response['choices'][0]['message']['content'] = 'Try Dune.'
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'openai.jsonl')
+            recorder = CompletionRecorder(path)
+            self.assertIs(recorder.capture(request, response), response)
+            stream = recorder.capture(dict(request, stream=True), _chunks(['Try ', 'Dune.']))
+            self.assertEqual([chunk.text async for chunk in stream], ['Try ', 'Dune.'])
+            with open(path, encoding='utf-8') as handle:
+                self.assertEqual([sorted(json.loads(line)) for line in handle],
+                                 [['request', 'response'], ['chunks', 'request']])
+
+            store = ReplayStore.load(path)
+            self.assertEqual(store.find({'messages': [{'role': 'user', 'content': 'recommend a BOOK'}]}), {
+                'request': request, 'response': response,
+            })
+            self.assertIsNone(store.find({'messages': [{'role': 'user', 'content': 'hello'}]}))
+
+
+async def _chunks(texts):
+    for text in texts:
+        yield SimpleNamespace(text=text)
+
+
+if __name__ == '__main__':
+    unittest.main()
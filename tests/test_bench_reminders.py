@@ -0,0 +1,28 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.bench_reminders import percentile, run_benchmark
+
+
+class BenchReminderTests(unittest.IsolatedAsyncioTestCase):
+    async def test_small_run_reports_every_section(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            report = await run_benchmark(
+                users=20, count=500, adds=10, list_samples=5, due_samples=3,
+                due_batch=2, spike=50, db_path=os.path.join(tmpdir, 'bench.db'),
+            )
+
+        results = report['results']
+        self.assertEqual(results['add_reminder']['count'], 10)
+        self.assertEqual(results['list_reminders']['samples'], 5)
+        self.assertEqual(results['spike']['acknowledged'], results['spike']['moved'])
+        self.assertEqual(report['meta']['params']['reminders'], 500)
+
+    def test_percentile(self):
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile(list(range(101)), 99), 99)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import time
+import unittest
+
+from cache import LRUCache, SQLiteCacheBackend, TTLCache, normalize_key
+
+
+class LRUCacheTests(unittest.TestCase):
+    def test_evicts_least_recently_used_entry(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+
+        cache.set('c', 3)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_counts_hits_and_misses(self):
+        cache = LRUCache(4)
+        cache.set('a', 1)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('missing'))
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+
+class TTLCacheTests(unittest.TestCase):
+    def test_entries_expire(self):
+        cache = TTLCache(4, ttl=0.05)
+        cache.set('hi', 'Hello!')
+        self.assertEqual(cache.get('hi'), 'Hello!')
+
+        time.sleep(0.06)
+
+        self.assertIsNone(cache.get('hi'))
+        self.assertEqual(cache.stats()['expired'], 1)
+
+    def test_memory_cap_evicts_oldest_entries(self):
+        cache = TTLCache(100, ttl=60, max_bytes=400)
+        for index in range(10):
+            cache.set(f'key {index}', 'x' * 100)
+
+        self.assertLessEqual(cache.stats()['bytes'], 400)
+        self.assertIn('key 9', cache)
+        self.assertNotIn('key 0', cache)
+
+    def test_disk_tier_survives_a_restart(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'cache.db')
+            backend = SQLiteCacheBackend(path)
+            TTLCache(4, ttl=60, backend=backend, namespace='chat').set('hi', 'Hello!')
+            backend.close()
+
+            backend = SQLiteCacheBackend(path)
+            restarted = TTLCache(4, ttl=60, backend=backend, namespace='chat')
+            other = TTLCache(4, ttl=60, backend=backend, namespace='intent')
+
+            self.assertEqual(restarted.get('hi'), 'Hello!')
+            self.assertEqual(restarted.stats()['backend_hits'], 1)
+            self.assertIsNone(other.get('hi'))
+            backend.close()
+
+    def test_normalize_key_ignores_case_spacing_and_punctuation(self):
+        self.assertEqual(normalize_key('  What can   you do?! '), 'what can you do')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+import intents
+from classifier import classify_intent
+
+# Commands that should never need the LLM
+FAST_PATH = {
+    'Remind me to call mom at 3pm tomorrow': 'REMINDER',
+    'Set a reminder for my meeting tomorrow': 'REMINDER',
+    "Don't let me forget to buy milk": 'REMINDER',
+    'please ping me in an hour': 'REMINDER',
+    'Show me my reminders': 'LIST_REMINDERS',
+    'List my reminders': 'LIST_REMINDERS',
+    'What reminders do I have?': 'LIST_REMINDERS',
+    'reminders': 'LIST_REMINDERS',
+    'Edit reminder 1 to call dad': 'EDIT_REMINDER',
+    'Change my 3pm reminder': 'EDIT_REMINDER',
+    'Delete reminder 2': 'DELETE_REMINDER',
+    'Remove the milk reminder': 'DELETE_REMINDER',
+    'cancel #4': 'DELETE_REMINDER',
+    'thanks!': 'CHAT',
+}
+
+# Messages the rules should leave to the LLM
+UNSURE = (
+    "What's a good drink at Starbucks?",
+    "I'm on PTO today",
+    'I need to see the doctor, remind me at 3',
+    'Show my reminders and delete reminder 2',
+)
+
+
+class ClassifierTests(unittest.TestCase):
+    def test_commands_are_classified_confidently(self):
+        for message, expected in FAST_PATH.items():
+            with self.subTest(message=message):
+                intent, confidence = classify_intent(message)
+                self.assertEqual(intent, expected)
+                self.assertGreaterEqual(confidence, intents.INTENT_FAST_PATH_THRESHOLD)
+
+    def test_ambiguous_messages_fall_below_the_threshold(self):
+        for message in UNSURE:
+            with self.subTest(message=message):
+                self.assertLess(classify_intent(message)[1], intents.INTENT_FAST_PATH_THRESHOLD)
+
+    def test_reminder_text_does_not_change_the_command(self):
+        self.assertEqual(classify_intent('Remind me to delete the old reminders at 5pm')[0], 'REMINDER')
+
+
+class DetermineIntentTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.llm_calls = []
+        self.original_llm = intents.interpret_message
+        intents._intent_counts.clear()
+        intents._intent_cache.clear()
+
+        async def fake_llm(message, intent=None):
+            self.llm_calls.append(message)
+            return intents.MessageDetails(intent='CHAT')
+
+        intents.interpret_message = fake_llm
+
+    async def asyncTearDown(self):
+        intents.interpret_message = self.original_llm
+        intents._intent_counts.clear()
+        intents._intent_cache.clear()
+
+    async def test_fast_path_skips_the_llm_and_is_counted(self):
+        self.assertEqual(await intents.determine_intent('delete reminder 2'), ('DELETE_REMINDER', None))
+        self.assertEqual(await intents.determine_intent('list my reminders'), ('LIST_REMINDERS', None))
+        intent, details = await intents.determine_intent('Recommend a book')
+        self.assertEqual((intent, details.intent), ('CHAT', 'CHAT'))
+
+        stats = intents.get_intent_stats()
+        self.assertEqual(self.llm_calls, ['Recommend a book'])
+        self.assertEqual((stats['fast_path'], stats['llm']), (2, 1))
+        self.assertAlmostEqual(stats['fast_path_share'], 2 / 3)
+        self.assertEqual(stats['by_intent']['DELETE_REMINDER'], {'fast_path': 1, 'cache': 0, 'llm': 0, 'fallback': 0})
+
+    async def test_llm_intents_are_cached_by_normalized_message(self):
+        await intents.determine_intent('Recommend a book')
+        intent, _ = await intents.determine_intent('  recommend a BOOK!')
+
+        self.assertEqual(intent, 'CHAT')
+        self.assertEqual(self.llm_calls, ['Recommend a book'])
+        self.assertEqual(intents.get_intent_stats()['cache'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+
+from coalescing import MessageCoalescer, commit
+
+
+class MessageCoalescerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.processed = []
+        self.started = []
+        self.delay = 0.0
+        self.commit_first = False
+
+    async def process(self, text, payload):
+        self.started.append(text)
+        if self.commit_first:
+            commit()
+        await asyncio.sleep(self.delay)
+        self.processed.append((text, payload))
+
+    async def test_quick_messages_are_answered_once(self):
+        coalescer = MessageCoalescer(self.process, window=0.05)
+        coalescer.submit(1, 'remind me to call mom', 'first')
+        await asyncio.sleep(0.02)
+        coalescer.submit(1, 'at 5pm', 'second')
+        coalescer.submit(2, 'hello', 'other chat')
+        await asyncio.sleep(0.15)
+
+        self.assertEqual(sorted(self.processed), [
+            ('hello', 'other chat'), ('remind me to call mom\nat 5pm', 'second'),
+        ])
+        self.assertEqual(coalescer.stats()['bursts'], 2)
+
+    async def test_newer_message_cancels_uncommitted_work(self):
+        self.delay = 0.2
+        coalescer = MessageCoalescer(self.process, window=0.02)
+        coalescer.submit(1, "what's a good book", 1)
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.started, ["what's a good book"])
+
+        coalescer.submit(1, 'about space', 2)
+        await asyncio.sleep(0.3)
+
+        self.assertEqual(self.processed, [("what's a good book\nabout space", 2)])
+        self.assertEqual(coalescer.stats()['cancelled'], 1)
+
+    async def test_committed_work_finishes_before_the_next_burst(self):
+        self.delay = 0.1
+        self.commit_first = True
+        coalescer = MessageCoalescer(self.process, window=0.01)
+        coalescer.submit(1, 'delete reminder 2', 1)
+        await asyncio.sleep(0.03)
+        coalescer.submit(1, 'thanks', 2)
+        await asyncio.sleep(0.3)
+
+        self.assertEqual(self.processed, [('delete reminder 2', 1), ('thanks', 2)])
+        self.assertEqual(coalescer.stats()['cancelled'], 0)
+
+    async def test_max_wait_bounds_a_steady_stream(self):
+        coalescer = MessageCoalescer(self.process, window=0.05, max_wait=0.1)
+        for index in range(6):
+            coalescer.submit(1, str(index))
+            await asyncio.sleep(0.03)
+        await asyncio.sleep(0.1)
+
+        self.assertGreaterEqual(len(self.processed), 2)
+        self.assertEqual('\n'.join(text for text, _ in self.processed), '\n'.join(map(str, range(6))))
+
+    async def test_commit_outside_a_burst_is_harmless(self):
+        commit()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import time
+import unittest
+
+from telegram.error import Forbidden, RetryAfter
+
+from delivery import DeliveryEngine, TokenBucket, TokenBuckets
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_reserve_reports_wait_once_burst_is_spent(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertFalse(bucket.try_acquire())
+
+    def test_idle_buckets_are_dropped(self):
+        buckets = TokenBuckets(rate=1000, capacity=1, idle_seconds=0.01)
+        buckets.get('idle').reserve()
+        self.assertIs(buckets.get('busy'), buckets.get('busy'))
+        self.assertEqual(len(buckets), 2)
+
+        time.sleep(0.02)
+        buckets.get('busy')
+
+        self.assertEqual(len(buckets), 1)
+
+
+class DeliveryEngineTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.sent = []
+        self.results = []
+        self.failures = {}
+
+    async def send(self, chat_id, text):
+        error = self.failures.get(text)
+        if error is not None:
+            self.failures[text] = None
+            raise error
+        self.sent.append((chat_id, text, time.monotonic()))
+
+    def make_engine(self, **kwargs):
+        engine = DeliveryEngine(self.send, on_result=lambda d, ok, err: self.results.append((d.text, ok)), **kwargs)
+        engine.start()
+        return engine
+
+    async def test_sends_to_many_chats_in_parallel(self):
+        engine = self.make_engine(workers=8, global_rate=1000, per_chat_rate=1)
+        for chat_id in range(50):
+            engine.submit(chat_id, f'hello {chat_id}')
+
+        await asyncio.wait_for(engine.join(), timeout=2)
+        await engine.stop()
+
+        self.assertEqual(len(self.sent), 50)
+        self.assertEqual(engine.stats()['sent'], 50)
+        self.assertEqual(engine.stats()['queue_depth'], 0)
+
+    async def test_per_chat_limit_spaces_messages_without_blocking_other_chats(self):
+        engine = self.make_engine(workers=2, global_rate=1000, per_chat_rate=20, per_chat_burst=1)
+        for index in range(3):
+            engine.submit(1, f'busy {index}')
+        engine.submit(2, 'quiet')
+
+        await asyncio.wait_for(engine.join(), timeout=2)
+        await engine.stop()
+
+        busy = [sent_at for chat_id, _, sent_at in self.sent if chat_id == 1]
+        self.assertGreaterEqual(busy[2] - busy[0], 0.09)
+        self.assertEqual(self.sent[1][1], 'quiet')
+
+    async def test_retry_after_is_retried_and_slows_the_global_rate(self):
+        engine = self.make_engine(workers=1, global_rate=100)
+        self.failures['flood'] = RetryAfter(0)
+
+        engine.submit(1, 'flood')
+        await asyncio.wait_for(engine.join(), timeout=2)
+        await engine.stop()
+
+        stats = engine.stats()
+        self.assertEqual((stats['sent'], stats['retried'], stats['rate_limited']), (1, 1, 1))
+        self.assertLess(stats['global_rate'], 100)
+        self.assertEqual(self.results, [('flood', True)])
+
+    async def test_permanent_errors_are_not_retried(self):
+        engine = self.make_engine(workers=1)
+        self.failures['blocked'] = Forbidden('bot was blocked by the user')
+
+        engine.submit(1, 'blocked')
+        await asyncio.wait_for(engine.join(), timeout=2)
+        await engine.stop()
+
+        self.assertEqual(engine.stats()['failed'], 1)
+        self.assertEqual(self.results, [('blocked', False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
+import json
 import os
 import unittest
+import urllib.request
 
 from health import (
     build_google_health_auth_url,
@@ -8,6 +10,7 @@ from health import (
     mark_health_connected,
     parse_health_callback_params,
     fetch_health_metrics,
+    start_health_callback_server,
 )
 
 
@@ -54,6 +57,20 @@ class HealthTests(unittest.TestCase):
         self.assertIn('sleep_hours', metrics)
         self.assertIn('calories', metrics)
 
+    def test_metrics_include_delivery_stats(self):
+        thread = start_health_callback_server(host='127.0.0.1', port=0, delivery_stats=lambda: {'sent': 3})
+        server = start_health_callback_server._server
+        self.addCleanup(setattr, start_health_callback_server, '_thread', None)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.assertIsNotNone(thread)
+
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.server_port}/metrics') as response:
+            body = json.loads(response.read())
+
+        self.assertEqual(body['delivery'], {'sent': 3})
+        self.assertIn('llm', body)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,223 @@
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import pytz
+
+import intents
+import reminders
+
+
+class FakeCompletions:
+    def __init__(self, arguments=None, content=None):
+        self.arguments = arguments
+        self.content = content
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        function = SimpleNamespace(name='record_message', arguments=self.arguments)
+        message = SimpleNamespace(content=self.content, tool_calls=[SimpleNamespace(function=function)])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class InterpretMessageTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.original_client = intents._client
+
+    async def asyncTearDown(self):
+        intents._client = self.original_client
+
+    def use_arguments(self, arguments):
+        completions = FakeCompletions(arguments)
+        intents._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return completions
+
+    async def test_one_call_returns_intent_and_fields(self):
+        completions = self.use_arguments(json.dumps({
+            'intent': 'REMINDER', 'reminder_text': 'Call mom', 'date': 'tomorrow', 'time': '15:00',
+        }))
+
+        details = await intents.interpret_message('Call mom tomorrow at 3pm')
+
+        self.assertEqual(len(completions.calls), 1)
+        self.assertEqual(completions.calls[0]['tool_choice']['function']['name'], 'record_message')
+        self.assertEqual((details.intent, details.reminder_text, details.time), ('REMINDER', 'Call mom', '15:00'))
+        self.assertIsNone(details.repeat)
+
+    async def test_arguments_outside_the_schema_are_rejected(self):
+        self.use_arguments(json.dumps({'intent': 'REBOOT'}))
+        self.assertIsNone(await intents.interpret_message('hello'))
+
+        self.use_arguments(json.dumps({'intent': 'DELETE_REMINDER', 'reminder_id': 'the milk one'}))
+        self.assertIsNone(await intents.interpret_message('remove the milk one'))
+
+        self.use_arguments('{"intent": "CHAT"')
+        self.assertIsNone(await intents.interpret_message('hello'))
+
+    async def test_known_intent_is_kept(self):
+        self.use_arguments(json.dumps({'intent': 'CHAT', 'new_time': '09:00'}))
+
+        details = await intents.interpret_message('Move reminder 3 to 9am', 'EDIT_REMINDER')
+
+        self.assertEqual((details.intent, details.new_time), ('EDIT_REMINDER', '09:00'))
+
+
+class ChatCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.original_client = intents._client
+        self.completions = FakeCompletions(content='Hi there!')
+        intents._client = SimpleNamespace(chat=SimpleNamespace(completions=self.completions))
+        intents._chat_cache.clear()
+
+    async def asyncTearDown(self):
+        intents._client = self.original_client
+        intents._chat_cache.clear()
+
+    async def test_impersonal_replies_are_reused(self):
+        self.assertEqual(await intents.handle_chat('Hello!'), 'Hi there!')
+        self.assertEqual(await intents.handle_chat('hello'), 'Hi there!')
+
+        self.assertEqual(len(self.completions.calls), 1)
+        self.assertEqual(intents.get_response_cache_stats()['chat']['hits'], 1)
+
+    async def test_thanks_stays_cached_for_users_with_history(self):
+        original_memory = intents.conversation_memory
+        recorded = []
+
+        class FakeMemory:
+            async def context(self, user_id):
+                return [{'role': 'user', 'content': 'Recommend a book'}, {'role': 'assistant', 'content': 'Dune.'}]
+
+            async def record(self, user_id, user_message, reply):
+                recorded.append((user_id, user_message, reply))
+
+        intents.conversation_memory = FakeMemory()
+        try:
+            await intents.handle_chat('Thanks!', 1)
+            await intents.handle_chat('thanks', 2)
+            await intents.handle_chat('Recommend a book', 1)
+            await intents.handle_chat('Recommend a book', 2)
+        finally:
+            intents.conversation_memory = original_memory
+
+        self.assertEqual(len(self.completions.calls), 3)
+        self.assertEqual([m['role'] for m in self.completions.calls[0]['messages']], ['system', 'system', 'user'])
+        self.assertEqual(len(recorded), 4)
+
+    async def test_personal_or_time_dependent_messages_are_not_cached(self):
+        for message in ('What time is it?', 'How was my week', 'Tell me the news'):
+            await intents.handle_chat(message)
+            await intents.handle_chat(message)
+
+        self.assertEqual(len(self.completions.calls), 6)
+
+
+class HandleReminderTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_db_path = reminders.DB_PATH
+        reminders.DB_PATH = os.path.join(self.tmpdir.name, 'test.db')
+        await reminders.init_db()
+        self.original_llm = intents.interpret_message
+        self.llm_calls = []
+
+        async def fake_llm(message, intent=None):
+            self.llm_calls.append(message)
+            return None
+
+        intents.interpret_message = fake_llm
+
+    async def asyncTearDown(self):
+        intents.interpret_message = self.original_llm
+        await reminders.close_db()
+        reminders.DB_PATH = self.original_db_path
+        self.tmpdir.cleanup()
+
+    async def test_common_reminder_is_scheduled_without_the_llm(self):
+        reply = await intents.handle_reminder('Remind me in 20 minutes to stretch', 1)
+
+        self.assertTrue(reply.startswith('✅'), reply)
+        self.assertEqual(self.llm_calls, [])
+        self.assertEqual([r['text'] for r in await reminders.list_reminders(1)], ['Stretch'])
+
+    async def test_unparsed_reminder_falls_back_to_the_llm(self):
+        await intents.handle_reminder('Remind me to buy milk', 1)
+
+        self.assertEqual(self.llm_calls, ['Remind me to buy milk'])
+
+
+    async def test_several_reminders_from_the_llm_are_stored_together(self):
+        async def fake_llm(message, intent=None):
+            return intents.MessageDetails(
+                intent='REMINDER', reminder_text='Take out trash', date='tomorrow', time='07:00',
+                more_reminders=[
+                    intents.ReminderItem(reminder_text='Call mom', date='tomorrow', time='08:00'),
+                    intents.ReminderItem(reminder_text='Take out trash', date='tomorrow', time='09:00'),
+                ],
+            )
+
+        intents.interpret_message = fake_llm
+        reply = await intents.handle_reminder('remind me to take out trash, call mom and so on', 1)
+
+        self.assertTrue(reply.startswith('✅ Set 2 of 3 reminders'), reply)
+        self.assertIn("'Take out trash' already exists", reply)
+        self.assertEqual(sorted(r['text'] for r in await reminders.list_reminders(1)), ['Call mom', 'Take out trash'])
+
+
+class DeleteReminderTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_db_path = reminders.DB_PATH
+        reminders.DB_PATH = os.path.join(self.tmpdir.name, 'test.db')
+        await reminders.init_db()
+        future = datetime.datetime.now(pytz.UTC) + datetime.timedelta(hours=2)
+        await reminders.add_reminder(1, 'Call dad', future)
+        await reminders.add_reminder(1, 'Dentist appointment', future)
+
+    async def asyncTearDown(self):
+        await reminders.close_db()
+        reminders.DB_PATH = self.original_db_path
+        self.tmpdir.cleanup()
+
+    async def test_reminder_matching_every_word_is_deleted(self):
+        reply = await intents.handle_delete_reminder('remove the dentist reminder', 1)
+
+        self.assertEqual(reply, "✅ Reminder deleted: 'Dentist appointment'.")
+        self.assertEqual([r['text'] for r in await reminders.list_reminders(1)], ['Call dad'])
+
+    async def test_reminder_is_edited_by_description(self):
+        original_llm = intents.interpret_message
+        requests = {
+            'move the dentist one to 5pm': intents.MessageDetails(intent='EDIT_REMINDER', new_time='17:00', new_date='tomorrow'),
+            'rename the call dad reminder to call dad back': intents.MessageDetails(
+                intent='EDIT_REMINDER', new_text='Call dad back'),
+            'change it to tomorrow please': intents.MessageDetails(
+                intent='EDIT_REMINDER', new_date='tomorrow', target_description='dentist appointment'),
+        }
+
+        async def fake_llm(message, intent=None):
+            return requests[message]
+
+        intents.interpret_message = fake_llm
+        try:
+            replies = [await intents.handle_edit_reminder(message, 1) for message in requests]
+        finally:
+            intents.interpret_message = original_llm
+
+        self.assertEqual(replies, ['✅ Reminder updated successfully.'] * 3)
+        self.assertEqual(sorted(r['text'] for r in await reminders.list_reminders(1)), ['Call dad back', 'Dentist appointment'])
+
+    async def test_partial_match_is_not_deleted_without_confirmation(self):
+        reply = await intents.handle_delete_reminder('remove the call mom reminder', 1)
+
+        self.assertIn('Did you mean this reminder?', reply)
+        self.assertIn('Call dad', reply)
+        self.assertEqual(len(await reminders.list_reminders(1)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
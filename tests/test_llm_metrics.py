@@ -0,0 +1,107 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+
+import intents
+from llm_metrics import Histogram, LLMMetrics, metrics
+from transport import CircuitOpenError
+
+
+class HistogramTests(unittest.TestCase):
+    def test_percentiles_come_from_bucket_bounds(self):
+        histogram = Histogram(bounds=(100, 500, 1000))
+        for value in (20, 80, 90, 300, 700, 4000):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.percentile(0.5), 100.0)
+        self.assertEqual(histogram.percentile(0.8), 1000.0)
+        self.assertEqual(histogram.percentile(0.99), 4000.0)
+        self.assertEqual(histogram.snapshot()['buckets'], {'le_100': 3, 'le_500': 1, 'le_1000': 1, 'inf': 1})
+
+    def test_empty_histogram_has_no_percentiles(self):
+        self.assertIsNone(Histogram().percentile(0.5))
+
+
+class TrackTests(unittest.TestCase):
+    def test_outcomes_are_taken_from_the_exception(self):
+        metrics = LLMMetrics()
+        with metrics.track('chat', 'model') as call:
+            call.add_usage(SimpleNamespace(prompt_tokens=30, completion_tokens=12))
+        for error in (ValueError('bad json'), CircuitOpenError(), asyncio.TimeoutError(), RuntimeError()):
+            with self.assertRaises(type(error)):
+                with metrics.track('chat', 'model'):
+                    raise error
+
+        stats = metrics.snapshot()['chat/model']
+        self.assertEqual(stats['calls'], 5)
+        self.assertEqual(
+            {outcome: count for outcome, count in stats['outcomes'].items() if count},
+            {'ok': 1, 'parse_error': 1, 'fallback': 1, 'timeout': 1, 'error': 1},
+        )
+        self.assertEqual((stats['prompt_tokens'], stats['completion_tokens']), (30, 12))
+        # Only the successful call has a first byte
+        self.assertEqual(stats['ttfb_ms']['count'], 1)
+        self.assertIn('chat/model n=5', metrics.summary_line())
+
+
+class CallSiteTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.original_client = intents._client
+        intents._chat_cache.clear()
+        metrics.clear()
+
+    async def asyncTearDown(self):
+        intents._client = self.original_client
+        metrics.clear()
+
+    def use_create(self, create):
+        intents._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def test_interpret_message_records_parse_errors_and_usage(self):
+        async def create(**kwargs):
+            function = SimpleNamespace(arguments=json.dumps({'intent': 'REBOOT'}))
+            message = SimpleNamespace(content=None, tool_calls=[SimpleNamespace(function=function)])
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                                   usage=SimpleNamespace(prompt_tokens=250, completion_tokens=20))
+
+        self.use_create(create)
+        self.assertIsNone(await intents.interpret_message('hello'))
+        await intents.interpret_message('call mom at 3', 'REMINDER')
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot[f'intent/{intents.CHAT_MODEL}']['outcomes']['parse_error'], 1)
+        self.assertEqual(snapshot[f'intent/{intents.CHAT_MODEL}']['prompt_tokens'], 250)
+        self.assertEqual(snapshot[f'extract/{intents.CHAT_MODEL}']['calls'], 1)
+
+    async def test_interpret_message_without_a_tool_call_is_a_parse_error(self):
+        async def create(**kwargs):
+            message = SimpleNamespace(content='CHAT', tool_calls=None)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+        self.use_create(create)
+        self.assertIsNone(await intents.interpret_message('hello'))
+
+        outcomes = metrics.snapshot()[f'intent/{intents.CHAT_MODEL}']['outcomes']
+        self.assertEqual(outcomes['parse_error'], 1)
+        self.assertEqual(outcomes.get('error', 0), 0)
+
+    async def test_stream_records_first_byte_and_final_usage(self):
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content='Hi'))], usage=None)
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=40, completion_tokens=2))
+
+        async def create(**kwargs):
+            self.assertEqual(kwargs['stream_options'], {'include_usage': True})
+            return chunks()
+
+        self.use_create(create)
+        self.assertEqual([chunk async for chunk in intents.stream_chat('Recommend a book')], ['Hi'])
+
+        stats = metrics.snapshot()[f'chat_stream/{intents.CHAT_MODEL}']
+        self.assertEqual((stats['outcomes']['ok'], stats['ttfb_ms']['count']), (1, 1))
+        self.assertEqual((stats['prompt_tokens'], stats['completion_tokens']), (40, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
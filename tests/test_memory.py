@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+import reminders
+from memory import ConversationMemory
+from tokens import estimate_message_tokens
+
+
+class ConversationMemoryTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_db_path = reminders.DB_PATH
+        reminders.DB_PATH = os.path.join(self.tmpdir.name, 'test.db')
+        await reminders.init_db()
+        self.summaries = []
+
+    async def asyncTearDown(self):
+        await reminders.close_db()
+        reminders.DB_PATH = self.original_db_path
+        self.tmpdir.cleanup()
+
+    async def summarize(self, summary, turns):
+        self.summaries.append(turns)
+        return f'{summary} {len(turns)} turns about ' + ', '.join(content.split()[-1] for role, content in turns if role == 'user')
+
+    def make_memory(self, **kwargs):
+        kwargs.setdefault('token_budget', 120)
+        kwargs.setdefault('summary_tokens', 40)
+        kwargs.setdefault('max_turns', 6)
+        return ConversationMemory(self.summarize, **kwargs)
+
+    async def test_context_returns_recent_turns_in_order(self):
+        memory = self.make_memory()
+        await memory.record(1, 'My dog is called Rex', 'Nice name!')
+        await memory.record(1, 'What is my dog called?', 'Rex.')
+
+        context = await memory.context(1)
+
+        self.assertEqual([m['content'] for m in context], ['My dog is called Rex', 'Nice name!', 'What is my dog called?', 'Rex.'])
+        self.assertEqual(await memory.context(2), [])
+
+    async def test_old_turns_are_folded_into_a_summary_within_budget(self):
+        memory = self.make_memory()
+        for index in range(12):
+            await memory.record(1, f'Tell me something about topic{index}', f'Here is a fact about topic {index}.')
+            await memory.drain()
+
+        context = await memory.context(1)
+
+        self.assertGreater(memory.compactions, 0)
+        self.assertEqual(context[0]['role'], 'system')
+        self.assertIn('topic0', context[0]['content'])
+        self.assertEqual(context[-1]['content'], 'Here is a fact about topic 11.')
+        self.assertLessEqual(len(context) - 1, 6)
+        self.assertLessEqual(estimate_message_tokens(context), 120 + 10)
+        self.assertLessEqual(memory.stats()['max_context_tokens'], 120)
+
+    async def test_history_and_summary_survive_a_restart(self):
+        memory = self.make_memory()
+        for index in range(8):
+            await memory.record(1, f'question{index}', f'answer{index}')
+        await memory.drain()
+
+        restarted = self.make_memory()
+        context = await restarted.context(1)
+
+        self.assertEqual(context, await memory.context(1))
+        self.assertEqual(context[-1]['content'], 'answer7')
+
+    async def test_summarizer_failure_falls_back_to_transcript(self):
+        async def broken(summary, turns):
+            raise RuntimeError('model unavailable')
+
+        memory = ConversationMemory(broken, token_budget=120, summary_tokens=40, max_turns=2)
+        await memory.record(1, 'I like green tea', 'Noted!')
+        await memory.record(1, 'And you?', 'I like all tea.')
+        await memory.drain()
+
+        context = await memory.context(1)
+
+        self.assertIn('green tea', context[0]['content'])
+        self.assertEqual(len(context), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
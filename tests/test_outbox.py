@@ -0,0 +1,73 @@
+import asyncio
+import datetime
+import os
+import tempfile
+import unittest
+
+import pytz
+from telegram.error import Forbidden
+
+import reminders
+import storage
+from delivery import DeliveryEngine
+from outbox import OutboxRelay
+
+
+class OutboxRelayTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_db_path = reminders.DB_PATH
+        reminders.DB_PATH = os.path.join(self.tmpdir.name, 'test.db')
+        await reminders.init_db()
+        self.sent = []
+
+    async def asyncTearDown(self):
+        await reminders.close_db()
+        reminders.DB_PATH = self.original_db_path
+        self.tmpdir.cleanup()
+
+    async def send(self, chat_id, text):
+        if chat_id == 666:
+            raise Forbidden('bot was blocked by the user')
+        self.sent.append((chat_id, text))
+
+    async def add_due(self, user_id, text):
+        past = datetime.datetime.now(pytz.UTC) - datetime.timedelta(minutes=1)
+        async with storage.get_pool().write() as db:
+            await db.execute(
+                'INSERT INTO reminders (user_id, reminder_text, target_datetime) VALUES (?, ?, ?)',
+                (user_id, text, int(past.timestamp())),
+            )
+
+    async def outbox_size(self):
+        async with storage.get_pool().read() as db:
+            async with db.execute('SELECT COUNT(*) FROM outbox') as cursor:
+                return (await cursor.fetchone())[0]
+
+    async def test_delivered_rows_are_acknowledged_and_removed(self):
+        for user_id in range(5):
+            await self.add_due(user_id, f'task {user_id}')
+        await self.add_due(666, 'blocked')
+        await reminders.move_due_to_outbox()
+
+        engine = DeliveryEngine(self.send, global_rate=1000)
+        engine.start()
+        relay = OutboxRelay(engine)
+        relay.start()
+        await asyncio.sleep(0.1)
+        await relay.stop()
+
+        self.assertEqual(len(self.sent), 5)
+        self.assertIn((0, '⏰ Reminder: task 0'), self.sent)
+        self.assertEqual(await self.outbox_size(), 0)
+
+    async def test_rows_survive_until_acknowledged(self):
+        await self.add_due(1, 'task')
+        await reminders.move_due_to_outbox()
+
+        # A crash before the send leaves the row in the outbox
+        self.assertEqual(await self.outbox_size(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
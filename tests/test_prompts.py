@@ -0,0 +1,53 @@
+import unittest
+from types import SimpleNamespace
+
+import intents
+import prompts
+
+
+class PromptRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.original_time = prompts.time
+        self.original_context = prompts._time_context
+        self.clock = 6000.0
+        prompts.time = SimpleNamespace(time=lambda: self.clock)
+
+    def tearDown(self):
+        prompts.time = self.original_time
+        prompts._time_context = self.original_context
+
+    def test_templates_fit_their_token_budgets(self):
+        counts = prompts.prompt_token_counts()
+
+        self.assertEqual(set(counts), {'interpret', 'extract', 'chat', 'summary'})
+        for name, count in counts.items():
+            with self.subTest(prompt=name):
+                self.assertLessEqual(count['tokens'], count['budget'])
+
+    def test_names_are_unique(self):
+        with self.assertRaises(ValueError):
+            prompts.register('chat', 'Another chat prompt', budget=10)
+
+    def test_time_context_comes_last_and_the_prefix_stays_the_same(self):
+        history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'Hello!'}]
+        first = intents._chat_messages('Recommend a book', history)
+        prompts._time_context = (int(self.clock // 60), 'Now: later')
+        later = intents._chat_messages('Recommend a book', history)
+
+        self.assertEqual(first[:3], later[:3])
+        self.assertEqual(later[3], {'role': 'system', 'content': 'Now: later'})
+        self.assertNotEqual(first[3], later[3])
+        self.assertEqual(later[-1], {'role': 'user', 'content': 'Recommend a book'})
+
+    def test_time_context_is_built_once_a_minute(self):
+        prompts.current_time_context()
+        prompts._time_context = (prompts._time_context[0], 'cached')
+        self.clock += 30
+        self.assertEqual(prompts.current_time_context(), 'cached')
+
+        self.clock += 60
+        self.assertTrue(prompts.current_time_context().startswith('Now (Central Time, UTC'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import datetime
+import os
+import subprocess
+import sys
+import unittest
+
+import pytz
+
+from recurrence import advance, next_occurrence, normalize_rule
+
+CHICAGO = pytz.timezone('America/Chicago')
+
+
+def chicago_ts(*args):
+    return int(CHICAGO.localize(datetime.datetime(*args)).timestamp())
+
+
+def chicago_wall(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, CHICAGO).replace(tzinfo=None)
+
+
+class RecurrenceTests(unittest.TestCase):
+    def test_normalize_rule_accepts_supported_forms(self):
+        self.assertEqual(normalize_rule('daily'), 'daily')
+        self.assertEqual(normalize_rule('Every  3 Days'), 'every 3 days')
+        self.assertEqual(normalize_rule('every 1 week'), 'weekly')
+        self.assertEqual(normalize_rule('every weekday'), 'weekdays')
+        self.assertEqual(normalize_rule('cron 0 9 * * 1-5'), 'cron 0 9 * * 1-5')
+        self.assertEqual(normalize_rule('rrule:freq=weekly;byday=mo,we'), 'RRULE:FREQ=WEEKLY;BYDAY=MO,WE')
+        self.assertIsNone(normalize_rule('none'))
+        self.assertIsNone(normalize_rule(None))
+
+    def test_normalize_rule_rejects_unknown_rules(self):
+        for rule in ('monthly', 'every 0 days', 'cron 61 * * * *', 'RRULE:FREQ=YEARLY'):
+            with self.assertRaises(ValueError):
+                normalize_rule(rule)
+
+    def test_daily_keeps_local_wall_time_across_dst(self):
+        # US DST starts 2026-03-08; 8am CST and 8am CDT are 23 hours apart
+        before = chicago_ts(2026, 3, 7, 8, 0)
+
+        after = next_occurrence('daily', before, before, 'America/Chicago')
+
+        self.assertEqual(chicago_wall(after), datetime.datetime(2026, 3, 8, 8, 0))
+        self.assertEqual(after - before, 23 * 3600)
+
+    def test_catch_up_jumps_over_missed_periods(self):
+        scheduled = chicago_ts(2026, 5, 1, 8, 0)
+        now = chicago_ts(2026, 5, 10, 12, 0)
+
+        fire, next_ts = advance('daily', scheduled, now, 'America/Chicago')
+
+        self.assertTrue(fire)
+        self.assertEqual(chicago_wall(next_ts), datetime.datetime(2026, 5, 11, 8, 0))
+
+    def test_skip_policy_drops_stale_occurrences_but_keeps_recent_ones(self):
+        scheduled = chicago_ts(2026, 5, 1, 8, 0)
+
+        fire, _ = advance('daily', scheduled, scheduled + 3 * 86400, 'America/Chicago', policy='skip')
+        self.assertFalse(fire)
+
+        fire, _ = advance('daily', scheduled, scheduled + 30, 'America/Chicago', policy='skip')
+        self.assertTrue(fire)
+
+    def test_fixed_intervals_stay_aligned_to_the_anchor(self):
+        anchor = 1_000_000
+
+        self.assertEqual(next_occurrence('every 90 minutes', anchor, anchor + 10_000), anchor + 2 * 5400)
+
+    def test_weekdays_skip_the_weekend(self):
+        friday = chicago_ts(2026, 5, 15, 9, 0)
+
+        monday = next_occurrence('weekdays', friday, friday, 'America/Chicago')
+
+        self.assertEqual(chicago_wall(monday), datetime.datetime(2026, 5, 18, 9, 0))
+
+    def test_every_n_days_from_a_long_gap(self):
+        anchor = chicago_ts(2026, 1, 1, 7, 30)
+        now = chicago_ts(2026, 1, 20, 12, 0)
+
+        next_ts = next_occurrence('every 3 days', anchor, now, 'America/Chicago')
+
+        self.assertEqual(chicago_wall(next_ts), datetime.datetime(2026, 1, 22, 7, 30))
+
+    def test_cron_weekday_mornings(self):
+        saturday_noon = chicago_ts(2026, 5, 16, 12, 0)
+
+        next_ts = next_occurrence('cron 30 9 * * 1-5', saturday_noon, saturday_noon, 'America/Chicago')
+
+        self.assertEqual(chicago_wall(next_ts), datetime.datetime(2026, 5, 18, 9, 30))
+
+    def test_rrule_byday(self):
+        monday = chicago_ts(2026, 5, 18, 18, 0)
+
+        next_ts = next_occurrence('RRULE:FREQ=WEEKLY;BYDAY=MO,TH', monday, monday, 'America/Chicago')
+
+        self.assertEqual(chicago_wall(next_ts), datetime.datetime(2026, 5, 21, 18, 0))
+
+    def test_rrule_rejects_unknown_byday_values(self):
+        for rule in ('RRULE:FREQ=WEEKLY;BYDAY=XX', 'RRULE:FREQ=WEEKLY;BYDAY=1MO', 'RRULE:FREQ=WEEKLY;BYDAY=MO,'):
+            with self.subTest(rule=rule), self.assertRaisesRegex(ValueError, 'unsupported BYDAY value'):
+                normalize_rule(rule)
+
+    def test_unknown_missed_policy_fails_at_startup(self):
+        result = subprocess.run(
+            [sys.executable, '-c', 'import recurrence'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=dict(os.environ, REMINDER_MISSED_POLICY='skp'),
+            capture_output=True, text=True,
+        )
+
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("REMINDER_MISSED_POLICY must be one of coalesce, skip, got 'skp'", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,283 @@
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import pytz
+
+import reminders
+import storage
+
+
+class ReminderStorageTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_db_path = reminders.DB_PATH
+        reminders.DB_PATH = os.path.join(self.tmpdir.name, 'test.db')
+        await reminders.init_db()
+
+    async def asyncTearDown(self):
+        await reminders.close_db()
+        reminders.DB_PATH = self.original_db_path
+        self.tmpdir.cleanup()
+
+    def future(self, **delta):
+        return datetime.datetime.now(pytz.UTC) + datetime.timedelta(**delta)
+
+    async def test_pool_runs_in_wal_mode(self):
+        async with storage.get_pool().read() as db:
+            async with db.execute('PRAGMA journal_mode') as cursor:
+                row = await cursor.fetchone()
+
+        self.assertEqual(row[0], 'wal')
+
+    async def test_add_and_list_reminder(self):
+        self.assertTrue(await reminders.add_reminder(1, 'Call mom', self.future(hours=1)))
+
+        listed = await reminders.list_reminders(1)
+
+        self.assertEqual(len(listed), 1)
+        self.assertEqual(listed[0]['text'], 'Call mom')
+
+    async def test_add_reminder_rejects_duplicates_and_past_times(self):
+        self.assertTrue(await reminders.add_reminder(1, 'Call mom', self.future(hours=1)))
+        self.assertFalse(await reminders.add_reminder(1, 'Call mom', self.future(hours=2)))
+        self.assertFalse(await reminders.add_reminder(1, 'Old news', self.future(hours=-1)))
+
+    async def test_edit_and_delete_report_changes_per_call(self):
+        await reminders.add_reminder(1, 'Call mom', self.future(hours=1))
+        reminder_id = (await reminders.list_reminders(1))[0]['id']
+
+        self.assertTrue(await reminders.edit_reminder(1, reminder_id, new_text='Call dad'))
+        self.assertFalse(await reminders.edit_reminder(2, reminder_id, new_text='Not mine'))
+        self.assertFalse(await reminders.delete_reminder(2, reminder_id))
+        self.assertTrue(await reminders.delete_reminder(1, reminder_id))
+        self.assertFalse(await reminders.delete_reminder(1, reminder_id))
+
+    async def insert_due(self, user_id, text, target, repeat=None):
+        async with storage.get_pool().write() as db:
+            await db.execute(
+                'INSERT INTO reminders (user_id, reminder_text, target_datetime, repeat_interval) VALUES (?, ?, ?, ?)',
+                (user_id, text, int(target.timestamp()), repeat),
+            )
+
+    async def claim_all(self):
+        return [(uid, text) for _, uid, text in await reminders.claim_outbox(100)]
+
+    async def test_move_due_to_outbox_deletes_one_shots_and_advances_repeats(self):
+        await self.insert_due(1, 'One shot', self.future(minutes=-5))
+        await self.insert_due(1, 'Daily', self.future(minutes=-5), 'daily')
+        await self.insert_due(2, 'Weekly', self.future(minutes=-5), 'weekly')
+        await reminders.add_reminder(2, 'Not yet', self.future(hours=1))
+
+        self.assertEqual(await reminders.move_due_to_outbox(), 3)
+
+        self.assertCountEqual(await self.claim_all(), [(1, 'One shot'), (1, 'Daily'), (2, 'Weekly')])
+        self.assertEqual([r['text'] for r in await reminders.list_reminders(1)], ['Daily'])
+        self.assertCountEqual([r['text'] for r in await reminders.list_reminders(2)], ['Not yet', 'Weekly'])
+        self.assertEqual(await reminders.move_due_to_outbox(), 0)
+
+    async def test_overdue_repeat_fires_once_and_moves_to_the_future(self):
+        await self.insert_due(1, 'Meds', self.future(days=-4, minutes=-1), 'daily')
+
+        self.assertEqual(await reminders.move_due_to_outbox(), 1)
+        self.assertEqual(await reminders.move_due_to_outbox(), 0)
+        self.assertEqual(await self.claim_all(), [(1, 'Meds')])
+        upcoming = await reminders.get_upcoming_reminders(int(self.future(days=1).timestamp()))
+        self.assertEqual(len(upcoming), 1)
+
+    async def test_outbox_lease_ack_and_retry(self):
+        await self.insert_due(1, 'Sent', self.future(minutes=-1))
+        await self.insert_due(1, 'Flaky', self.future(minutes=-1))
+        await self.insert_due(1, 'Blocked', self.future(minutes=-1))
+        await reminders.move_due_to_outbox()
+        ids = {text: oid for oid, _, text in await reminders.claim_outbox(10)}
+
+        # Leased rows are not handed out twice
+        self.assertEqual(await reminders.claim_outbox(10), [])
+
+        await reminders.ack_outbox([ids['Sent']])
+        await reminders.fail_outbox([(ids['Flaky'], 'timed out', False), (ids['Blocked'], 'forbidden', True)])
+
+        async with storage.get_pool().read() as db:
+            async with db.execute('SELECT reminder_text, attempts, last_error FROM outbox') as cursor:
+                rows = await cursor.fetchall()
+        self.assertEqual(rows, [('Flaky', 1, 'timed out')])
+
+    async def test_add_reminder_normalizes_repeat_rules(self):
+        self.assertTrue(await reminders.add_reminder(1, 'Water plants', self.future(hours=1), 'Every 3 Days'))
+        self.assertFalse(await reminders.add_reminder(1, 'Pay rent', self.future(hours=1), 'monthly'))
+
+        self.assertEqual((await reminders.list_reminders(1))[0]['repeat'], 'every 3 days')
+
+    async def test_add_reminders_reports_a_status_per_item(self):
+        await reminders.add_reminder(1, 'Call mom', self.future(hours=1))
+        scheduled = []
+        listener = lambda reminder_id, target_ts: scheduled.append(reminder_id)  # noqa: E731
+        reminders.add_schedule_listener(listener)
+        self.addCleanup(reminders.remove_schedule_listener, listener)
+
+        statuses = await reminders.add_reminders(1, [
+            ('Take out trash', self.future(hours=2), None),
+            ('Call mom', self.future(hours=3), None),
+            ('Old news', self.future(hours=-1), None),
+            ('Pay rent', self.future(days=3), 'monthly'),
+            ('Water plants', self.future(hours=4), 'Daily'),
+            ('Take out trash', self.future(hours=5), None),
+        ])
+
+        self.assertEqual(statuses, ['added', 'duplicate', 'past', 'invalid', 'added', 'duplicate'])
+        stored = {r['text']: r['repeat'] for r in await reminders.list_reminders(1)}
+        self.assertEqual(stored, {'Call mom': None, 'Take out trash': None, 'Water plants': 'daily'})
+        self.assertEqual(len(scheduled), 2)
+
+    async def test_list_reminders_page_seeks_forward_and_back(self):
+        for index in range(25):
+            await self.insert_due(1, f'task {index:02d}', self.future(hours=1 + index // 2))
+        await self.insert_due(2, 'someone else', self.future(hours=1))
+
+        first = await reminders.list_reminders_page(1, limit=10)
+        second = await reminders.list_reminders_page(1, after=first['next'], limit=10)
+        third = await reminders.list_reminders_page(1, after=second['next'], limit=10)
+        back = await reminders.list_reminders_page(1, before=third['prev'], limit=10)
+
+        self.assertIsNone(first['prev'])
+        self.assertEqual(len(third['reminders']), 5)
+        self.assertIsNone(third['next'])
+        self.assertEqual([r['id'] for r in back['reminders']], [r['id'] for r in second['reminders']])
+        paged = first['reminders'] + second['reminders'] + third['reminders']
+        self.assertEqual([r['id'] for r in paged], [r['id'] for r in await reminders.list_reminders(1)])
+
+    async def test_list_page_query_seeks_on_user_index(self):
+        async with storage.get_pool().read() as db:
+            async with db.execute(
+                'EXPLAIN QUERY PLAN SELECT id FROM reminders WHERE user_id = ? AND (target_datetime, id) > (?, ?) '
+                'ORDER BY target_datetime, id LIMIT 11', (1, 0, 0)
+            ) as cursor:
+                plan = ' '.join(row[-1] for row in await cursor.fetchall())
+
+        self.assertIn('idx_user_datetime', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    async def test_due_query_uses_due_time_index(self):
+        async with storage.get_pool().read() as db:
+            async with db.execute(
+                'EXPLAIN QUERY PLAN SELECT id FROM reminders WHERE target_datetime <= ?', (0,)
+            ) as cursor:
+                plan = ' '.join(row[-1] for row in await cursor.fetchall())
+
+        self.assertIn('idx_due_datetime', plan)
+
+    async def test_find_reminders_matches_prefixes_and_typos_per_user(self):
+        await reminders.add_reminder(1, 'Dentist appointment', self.future(hours=2))
+        await reminders.add_reminder(1, 'Call mom', self.future(hours=3))
+        await reminders.add_reminder(2, 'Dentist for the kids', self.future(hours=2))
+
+        found = await reminders.find_reminders(1, 'delete the dentist reminder')
+        typo = await reminders.find_reminders(1, 'cancel the dentsit one')
+
+        self.assertEqual([r['text'] for r in found], ['Dentist appointment'])
+        self.assertEqual([r['text'] for r in typo], ['Dentist appointment'])
+        self.assertEqual(await reminders.find_reminders(1, 'delete it'), [])
+
+    async def test_find_reminders_marks_partial_matches(self):
+        await reminders.add_reminder(1, 'Call dad', self.future(hours=2))
+
+        partial = await reminders.find_reminders(1, 'call mom')
+        full = await reminders.find_reminders(1, 'call dad')
+
+        self.assertEqual([(r['text'], r['exact']) for r in partial], [('Call dad', False)])
+        self.assertEqual([(r['text'], r['exact']) for r in full], [('Call dad', True)])
+
+    async def test_search_index_follows_edits_and_deletes(self):
+        await reminders.add_reminder(1, 'Dentist appointment', self.future(hours=2))
+        reminder_id = (await reminders.list_reminders(1))[0]['id']
+
+        await reminders.edit_reminder(1, reminder_id, new_text='Orthodontist checkup')
+        self.assertEqual([r['id'] for r in await reminders.find_reminders(1, 'orthodontist')], [reminder_id])
+        self.assertEqual(await reminders.find_reminders(1, 'appointment'), [])
+
+        await reminders.delete_reminder(1, reminder_id)
+        self.assertEqual(await reminders.find_reminders(1, 'orthodontist'), [])
+
+    async def test_user_timezone_round_trip(self):
+        self.assertEqual(await reminders.get_user_timezone(1), 'UTC')
+
+        await reminders.set_user_timezone(1, 'America/Chicago')
+
+        self.assertEqual(await reminders.get_user_timezone(1), 'America/Chicago')
+
+    async def test_user_settings_are_cached_write_through(self):
+        before = reminders.get_settings_cache_stats()
+        await reminders.get_user_timezone(5)
+        await reminders.set_user_timezone(5, 'Europe/Paris')
+
+        self.assertEqual(str(await reminders.get_user_tzinfo(5)), 'Europe/Paris')
+        after = reminders.get_settings_cache_stats()
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+
+class ReminderMigrationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_db_path = reminders.DB_PATH
+        reminders.DB_PATH = os.path.join(self.tmpdir.name, 'legacy.db')
+
+    async def asyncTearDown(self):
+        await reminders.close_db()
+        reminders.DB_PATH = self.original_db_path
+        self.tmpdir.cleanup()
+
+    def create_legacy_db(self):
+        with sqlite3.connect(reminders.DB_PATH) as conn:
+            conn.execute('''
+                CREATE TABLE reminders (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    reminder_text TEXT NOT NULL,
+                    target_datetime TEXT NOT NULL,
+                    repeat_interval TEXT CHECK(repeat_interval IS NULL OR repeat_interval IN ('daily', 'weekly')),
+                    timezone TEXT NOT NULL DEFAULT 'UTC',
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(user_id, reminder_text)
+                )
+            ''')
+            conn.executemany(
+                'INSERT INTO reminders (user_id, reminder_text, target_datetime, repeat_interval, created_at) VALUES (?, ?, ?, ?, ?)',
+                [
+                    (1, 'With offset', '2030-05-12T15:30:00.250000+00:00', None, '2026-01-01 08:00:00'),
+                    (1, 'Naive', '2030-05-12T15:30:00', 'daily', '2026-01-01 08:00:00'),
+                ],
+            )
+
+    async def test_init_db_converts_iso_strings_to_epoch_seconds(self):
+        self.create_legacy_db()
+
+        await reminders.init_db()
+
+        expected = int(datetime.datetime(2030, 5, 12, 15, 30, tzinfo=pytz.UTC).timestamp())
+        async with storage.get_pool().read() as db:
+            async with db.execute('SELECT reminder_text, target_datetime, created_at FROM reminders ORDER BY id') as cursor:
+                rows = await cursor.fetchall()
+            async with db.execute('PRAGMA user_version') as cursor:
+                version = (await cursor.fetchone())[0]
+
+        created = int(datetime.datetime(2026, 1, 1, 8, tzinfo=pytz.UTC).timestamp())
+        self.assertEqual(rows, [('With offset', expected, created), ('Naive', expected, created)])
+        self.assertEqual(version, reminders.SCHEMA_VERSION)
+        self.assertEqual([r['text'] for r in await reminders.list_reminders(1)], ['With offset', 'Naive'])
+
+    async def test_init_db_is_idempotent(self):
+        await reminders.init_db()
+        await reminders.close_db()
+        await reminders.init_db()
+
+        self.assertTrue(await reminders.add_reminder(
+            1, 'Works', datetime.datetime.now(pytz.UTC) + datetime.timedelta(hours=1)
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
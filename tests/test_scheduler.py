@@ -0,0 +1,183 @@
+import asyncio
+import datetime
+import os
+import tempfile
+import unittest
+
+import pytz
+
+import reminders
+import scheduler as scheduler_module
+import storage
+from scheduler import ReminderScheduler, SchedulerLease
+
+
+class ReminderSchedulerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_db_path = reminders.DB_PATH
+        reminders.DB_PATH = os.path.join(self.tmpdir.name, 'test.db')
+        await reminders.init_db()
+        self.delivered = []
+        self.fired = asyncio.Event()
+        self.scheduler = ReminderScheduler(self.on_due)
+        self.original_retry = scheduler_module.ERROR_RETRY_SECONDS
+
+    async def asyncTearDown(self):
+        await self.scheduler.stop()
+        await reminders.close_db()
+        reminders.DB_PATH = self.original_db_path
+        self.tmpdir.cleanup()
+
+    async def on_due(self):
+        await reminders.move_due_to_outbox()
+        self.delivered.extend((uid, text) for _, uid, text in await reminders.claim_outbox(100))
+        self.fired.set()
+
+    def future(self, **delta):
+        return datetime.datetime.now(pytz.UTC) + datetime.timedelta(**delta)
+
+    async def test_fires_reminder_added_after_start_without_polling(self):
+        self.scheduler.start()
+        await asyncio.sleep(0.05)
+
+        await reminders.add_reminder(1, 'Stretch', self.future(milliseconds=300))
+        await asyncio.wait_for(self.fired.wait(), timeout=2)
+
+        self.assertEqual(self.delivered, [(1, 'Stretch')])
+
+    async def test_failed_delivery_is_retried(self):
+        scheduler_module.ERROR_RETRY_SECONDS = 0.05
+        self.addCleanup(setattr, scheduler_module, 'ERROR_RETRY_SECONDS', self.original_retry)
+        attempts = []
+
+        async def flaky_on_due():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError('database is locked')
+            await self.on_due()
+
+        self.scheduler = ReminderScheduler(flaky_on_due)
+        self.scheduler.start()
+        await asyncio.sleep(0.05)
+
+        await reminders.add_reminder(1, 'Stretch', self.future(milliseconds=200))
+        await asyncio.wait_for(self.fired.wait(), timeout=2)
+
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(self.delivered, [(1, 'Stretch')])
+
+    async def test_loads_existing_reminders_at_startup(self):
+        await reminders.add_reminder(1, 'Later', self.future(minutes=10))
+        await reminders.add_reminder(1, 'Much later', self.future(days=3))
+
+        await self.scheduler.load_window()
+
+        self.assertEqual(len(self.scheduler), 1)
+
+    async def test_edit_and_delete_update_the_heap(self):
+        self.scheduler.start()
+        await asyncio.sleep(0.05)
+        await reminders.add_reminder(1, 'Stretch', self.future(minutes=10))
+        reminder_id = (await reminders.list_reminders(1))[0]['id']
+        first_fire = self.scheduler.next_fire_time()
+
+        await reminders.edit_reminder(1, reminder_id, new_datetime=self.future(minutes=5))
+        self.assertLess(self.scheduler.next_fire_time(), first_fire)
+
+        await reminders.delete_reminder(1, reminder_id)
+        self.assertIsNone(self.scheduler.next_fire_time())
+
+
+class SchedulerLeaseTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_db_path = reminders.DB_PATH
+        reminders.DB_PATH = os.path.join(self.tmpdir.name, 'test.db')
+        await reminders.init_db()
+
+    async def asyncTearDown(self):
+        await reminders.close_db()
+        reminders.DB_PATH = self.original_db_path
+        self.tmpdir.cleanup()
+
+    async def test_only_one_holder_and_release_hands_over(self):
+        first, second = SchedulerLease(), SchedulerLease()
+
+        self.assertTrue(await first.heartbeat())
+        self.assertFalse(await second.heartbeat())
+        self.assertTrue(await first.heartbeat())
+
+        await first.stop()
+
+        self.assertFalse(first.held)
+        self.assertTrue(await second.heartbeat())
+
+    def test_lease_shorter_than_the_heartbeat_margin_is_rejected(self):
+        with self.assertRaises(ValueError):
+            SchedulerLease(ttl_seconds=6)
+        self.assertEqual(SchedulerLease(ttl_seconds=6.5)._ttl, 6.5)
+
+    async def test_expired_lease_is_taken_over(self):
+        self.assertIsNotNone(await reminders.acquire_lease('job', 'crashed', 0.01))
+        self.assertIsNone(await reminders.acquire_lease('job', 'standby', 30))
+
+        await asyncio.sleep(0.02)
+
+        self.assertIsNotNone(await reminders.acquire_lease('job', 'standby', 30))
+
+    async def test_scheduler_without_the_lease_does_not_fire(self):
+        holder, standby = SchedulerLease(), SchedulerLease()
+        await holder.heartbeat()
+        fired = []
+
+        async def on_due():
+            fired.append(await reminders.move_due_to_outbox())
+
+        scheduler = ReminderScheduler(on_due, lease=standby)
+        scheduler.start()
+        await reminders.add_reminder(1, 'Stretch', datetime.datetime.now(pytz.UTC) + datetime.timedelta(milliseconds=100))
+        await asyncio.sleep(0.3)
+        self.assertEqual(fired, [])
+
+        await holder.stop()
+        await standby.heartbeat()
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+
+        self.assertEqual(fired, [1])
+
+    async def test_holder_picks_up_reminders_written_by_another_process(self):
+        lease = SchedulerLease()
+        await lease.heartbeat()
+        fired = asyncio.Event()
+
+        async def on_due():
+            if await reminders.move_due_to_outbox():
+                fired.set()
+
+        scheduler = ReminderScheduler(on_due, lease=lease)
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        # A second pool on the same file has its own connections, like another process
+        other = storage.ConnectionPool(reminders.DB_PATH)
+        await other.open()
+        try:
+            due = int((datetime.datetime.now(pytz.UTC) + datetime.timedelta(milliseconds=200)).timestamp())
+            async with other.write() as db:
+                await db.execute(
+                    "INSERT INTO reminders (user_id, reminder_text, target_datetime, timezone) VALUES (1, 'Stretch', ?, 'UTC')",
+                    (due,),
+                )
+        finally:
+            await other.close()
+        self.assertEqual(len(scheduler), 0)
+
+        await lease.heartbeat()
+        await asyncio.wait_for(fired.wait(), timeout=2)
+        await scheduler.stop()
+        await lease.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+
+from telegram.error import BadRequest
+
+import intents
+from streaming import CURSOR, EMPTY_REPLY_TEXT, PLACEHOLDER_TEXT, stream_reply
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.edits = []
+        self.actions = 0
+        self.deleted = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append(text)
+        return SimpleNamespace(message_id=len(self.sent))
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None):
+        if self.edits and self.edits[-1][1] == text:
+            raise BadRequest('Message is not modified')
+        self.edits.append((time.monotonic(), text))
+
+    async def send_chat_action(self, chat_id, action):
+        self.actions += 1
+
+    async def delete_message(self, chat_id, message_id):
+        self.deleted.append(message_id)
+
+
+async def tokens(words, delay=0.01):
+    for word in words:
+        await asyncio.sleep(delay)
+        yield word
+
+
+class StreamReplyTests(unittest.IsolatedAsyncioTestCase):
+    async def test_edits_are_coalesced_and_end_with_the_full_text(self):
+        bot = FakeBot()
+        words = [f'word{index} ' for index in range(30)]
+
+        final = await stream_reply(bot, 1, tokens(words), min_interval=0.05)
+
+        self.assertEqual(final, ''.join(words).strip())
+        self.assertEqual(bot.sent, [PLACEHOLDER_TEXT])
+        self.assertGreaterEqual(bot.actions, 1)
+        self.assertEqual(bot.edits[-1][1], final)
+        self.assertTrue(any(text.endswith(CURSOR) for _, text in bot.edits[:-1]))
+        self.assertLess(len(bot.edits), len(words) / 2)
+        gaps = [later - earlier for (earlier, _), (later, _) in zip(bot.edits, bot.edits[1:-1])]
+        self.assertTrue(all(gap >= 0.045 for gap in gaps), gaps)
+
+    async def test_empty_reply_replaces_the_placeholder(self):
+        bot = FakeBot()
+
+        final = await stream_reply(bot, 1, tokens(['', '  ']), min_interval=0)
+
+        self.assertEqual(final, EMPTY_REPLY_TEXT)
+        self.assertEqual(bot.sent, [PLACEHOLDER_TEXT])
+        self.assertEqual(bot.edits[-1][1], EMPTY_REPLY_TEXT)
+
+    async def test_long_replies_continue_in_new_messages(self):
+        bot = FakeBot()
+
+        final = await stream_reply(bot, 1, tokens(['x' * 5000], delay=0), min_interval=0)
+
+        self.assertEqual(len(final), 5000)
+        self.assertEqual(len(bot.edits[-1][1]), 4096)
+        self.assertEqual(bot.sent[1:], ['x' * 904])
+
+    async def test_reply_that_beats_a_slow_placeholder_is_still_shown(self):
+        bot = FakeBot()
+        send_message = bot.send_message
+
+        async def slow_send_message(chat_id, text):
+            await asyncio.sleep(0.05)
+            return await send_message(chat_id, text)
+
+        bot.send_message = slow_send_message
+
+        final = await stream_reply(bot, 1, tokens(['Hi'], delay=0), min_interval=0)
+
+        self.assertEqual(final, 'Hi')
+        self.assertEqual(bot.sent, [PLACEHOLDER_TEXT])
+        self.assertEqual(bot.edits[-1][1], 'Hi')
+
+    async def test_cancelled_reply_is_removed(self):
+        bot = FakeBot()
+        task = asyncio.create_task(stream_reply(bot, 1, tokens(['Hi'] * 100, delay=0.01), min_interval=0))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(bot.deleted, [1])
+
+
+class FakeStream:
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for piece in self.pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+
+class StreamChatTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.original_client = intents._client
+        self.calls = []
+
+        async def create(**kwargs):
+            self.calls.append(kwargs)
+            return FakeStream(['Hi', ' there', None, '!'])
+
+        intents._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        intents._chat_cache.clear()
+
+    async def asyncTearDown(self):
+        intents._client = self.original_client
+        intents._chat_cache.clear()
+
+    async def test_yields_deltas_and_caches_the_reply(self):
+        pieces = [piece async for piece in intents.stream_chat('hello')]
+        cached = [piece async for piece in intents.stream_chat('Hello!')]
+
+        self.assertEqual(pieces, ['Hi', ' there', '!'])
+        self.assertTrue(self.calls[0]['stream'])
+        self.assertEqual(cached, ['Hi there!'])
+        self.assertEqual(len(self.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
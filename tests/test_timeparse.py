@@ -0,0 +1,108 @@
+import datetime
+import unittest
+
+import pytz
+
+from timeparse import LOCAL_PARSE_THRESHOLD, parse_reminder, parse_reminders
+
+CHICAGO = pytz.timezone('America/Chicago')
+# Saturday afternoon, the day before the spring DST change
+NOW = CHICAGO.localize(datetime.datetime(2026, 3, 7, 14, 10))
+
+# message -> (text, local fire time, repeat)
+CORPUS = {
+    'Remind me in 20 minutes': ('Reminder', '2026-03-07 14:30', None),
+    'remind me in an hour and a half to stretch': ('Stretch', '2026-03-07 15:40', None),
+    'remind me in half an hour to check the oven': ('Check the oven', '2026-03-07 14:40', None),
+    'remind me in a few minutes to flip the laundry': ('Flip the laundry', '2026-03-07 14:13', None),
+    'remind me in 2 days to check mail': ('Check mail', '2026-03-09 14:10', None),
+    'Remind me at 3pm tomorrow to call mom': ('Call mom', '2026-03-08 15:00', None),
+    'remind me tomorrow at 9:15am about the standup': ('The standup', '2026-03-08 09:15', None),
+    'remind me tomorrow morning to water plants': ('Water plants', '2026-03-08 09:00', None),
+    'remind me to take out the trash tonight': ('Take out the trash', '2026-03-07 20:00', None),
+    'remind me tonight at 9 to lock the door': ('Lock the door', '2026-03-07 21:00', None),
+    'ping me at 17:45 about dinner': ('Dinner', '2026-03-07 17:45', None),
+    'remind me at noon to eat': ('Eat', '2026-03-08 12:00', None),
+    'remind me at 1am to sleep': ('Sleep', '2026-03-08 01:00', None),
+    'remind me at 12:30 to eat lunch': ('Eat lunch', '2026-03-08 12:30', None),
+    'remind me at 12 to stretch': ('Stretch', '2026-03-08 12:00', None),
+    'remind me to put on sun cream at 4pm': ('Put on sun cream', '2026-03-07 16:00', None),
+    'remind me next friday to book flights': ('Book flights', '2026-03-13 09:00', None),
+    'remind me on Monday at 8am to submit the report': ('Submit the report', '2026-03-09 08:00', None),
+    'remind me on 2026-04-01 at 10:00 to file taxes': ('File taxes', '2026-04-01 10:00', None),
+    'remind me 3/15 at noon dentist': ('Dentist', '2026-03-15 12:00', None),
+    'remind me on the 5th of april to renew passport': ('Renew passport', '2026-04-05 09:00', None),
+    'remind me to pay rent on March 1': ('Pay rent', '2027-03-01 09:00', None),
+    'Remind me daily to take my meds at 8am': ('Take my meds', '2026-03-08 08:00', 'daily'),
+    'remind me every monday at 9am to submit timesheet': ('Submit timesheet', '2026-03-09 09:00', 'weekly'),
+    'remind me every weekday at 7:30am to take the bus': ('Take the bus', '2026-03-09 07:30', 'weekdays'),
+    'remind me every 2 hours to drink water': ('Drink water', '2026-03-07 16:10', 'every 2 hours'),
+}
+
+# Left to the LLM: no time at all, or words the rules do not understand
+UNPARSED = (
+    'remind me to buy milk',
+    'remind me sometime next week to call bob',
+    'remind me in 20 minutes at 5pm',
+    'remind me to call mom at 3pm EST',
+)
+
+
+class ParseReminderTests(unittest.TestCase):
+    def test_corpus(self):
+        for message, (text, when, repeat) in CORPUS.items():
+            with self.subTest(message=message):
+                parsed = parse_reminder(message, CHICAGO, NOW)
+                self.assertIsNotNone(parsed)
+                self.assertEqual(parsed.text, text)
+                self.assertEqual(parsed.when.strftime('%Y-%m-%d %H:%M'), when)
+                self.assertEqual(parsed.repeat, repeat)
+                self.assertGreaterEqual(parsed.confidence, LOCAL_PARSE_THRESHOLD)
+
+    def test_unparsed_messages_fall_back_to_the_llm(self):
+        for message in UNPARSED:
+            with self.subTest(message=message):
+                parsed = parse_reminder(message, CHICAGO, NOW)
+                self.assertTrue(parsed is None or parsed.confidence < LOCAL_PARSE_THRESHOLD)
+
+    def test_ambiguous_hour_picks_the_next_one_with_lower_confidence(self):
+        parsed = parse_reminder('remind me at 3 to pick up the kids', CHICAGO, NOW)
+
+        self.assertEqual(parsed.when.strftime('%H:%M'), '15:00')
+        self.assertLess(parsed.confidence, 1.0)
+
+    def test_twelve_before_noon_is_today(self):
+        morning = CHICAGO.localize(datetime.datetime(2026, 3, 7, 9, 0))
+        for message, when in (('remind me at 12:30 to eat lunch', '2026-03-07 12:30'),
+                              ('remind me at 12 to stretch', '2026-03-07 12:00')):
+            with self.subTest(message=message):
+                self.assertEqual(parse_reminders(message, CHICAGO, morning)[0].when.strftime('%Y-%m-%d %H:%M'), when)
+
+    def test_times_are_timezone_aware_across_dst(self):
+        parsed = parse_reminder('remind me tomorrow at 8am to run', CHICAGO, NOW)
+
+        self.assertEqual(parsed.when.utcoffset(), datetime.timedelta(hours=-5))
+        self.assertEqual(parsed.when.astimezone(pytz.UTC).hour, 13)
+
+
+class ParseRemindersTests(unittest.TestCase):
+    def test_message_with_several_reminders_is_split(self):
+        parsed = parse_reminders('remind me to take out the trash at 7pm and call mom at 8pm; pay rent on friday', CHICAGO, NOW)
+
+        self.assertEqual(
+            [(item.text, item.when.strftime('%Y-%m-%d %H:%M')) for item in parsed],
+            [('Take out the trash', '2026-03-07 19:00'), ('Call mom', '2026-03-07 20:00'), ('Pay rent', '2026-03-13 09:00')],
+        )
+
+    def test_and_inside_one_reminder_is_not_split(self):
+        for message in ('remind me to call mom and dad at 5pm', 'remind me to buy milk at 5pm and eggs',
+                        'remind me in an hour and a half to stretch'):
+            with self.subTest(message=message):
+                self.assertEqual(len(parse_reminders(message, CHICAGO, NOW)), 1)
+
+    def test_unparsed_message_gives_no_reminders(self):
+        self.assertEqual(parse_reminders('hello there', CHICAGO, NOW), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
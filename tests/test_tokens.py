@@ -0,0 +1,27 @@
+import unittest
+
+from tokens import estimate_message_tokens, estimate_tokens, truncate_to_tokens
+
+
+class TokenEstimateTests(unittest.TestCase):
+    def test_estimates_scale_with_text(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('hello'), 2)
+        self.assertEqual(estimate_tokens('x' * 400), 100)
+        self.assertGreater(estimate_message_tokens([{'role': 'user', 'content': 'hi'}]), estimate_tokens('hi'))
+
+    def test_truncate_keeps_start_or_end_within_budget(self):
+        text = ' '.join(f'word{index}' for index in range(200))
+
+        head = truncate_to_tokens(text, 20)
+        tail = truncate_to_tokens(text, 20, keep_end=True)
+
+        self.assertLessEqual(estimate_tokens(head), 20)
+        self.assertTrue(head.startswith('word0 '))
+        self.assertLessEqual(estimate_tokens(tail), 20)
+        self.assertTrue(tail.endswith('word199'))
+        self.assertEqual(truncate_to_tokens('short', 20), 'short')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import intents
+import transport
+from transport import CircuitBreaker, CircuitOpenError, OpenAITransport
+
+
+class FlakyRequest:
+    """Fails with the queued exceptions, then returns 'ok'."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+class TransportTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.original_base = transport.RETRY_BASE_SECONDS
+        transport.RETRY_BASE_SECONDS = 0.001
+
+    def tearDown(self):
+        transport.RETRY_BASE_SECONDS = self.original_base
+
+    async def test_transient_errors_are_retried(self):
+        client = OpenAITransport(max_attempts=3)
+        request = FlakyRequest(asyncio.TimeoutError(), asyncio.TimeoutError())
+
+        self.assertEqual(await client.call(request, deadline=1), 'ok')
+        self.assertEqual((request.calls, client.retries, client.failures), (3, 2, 0))
+        self.assertEqual(client.breaker.state, 'closed')
+
+    async def test_other_errors_are_not_retried_or_counted_against_the_service(self):
+        client = OpenAITransport(breaker=CircuitBreaker(failure_threshold=1))
+        request = FlakyRequest(ValueError('bad request'))
+
+        with self.assertRaises(ValueError):
+            await client.call(request, deadline=1)
+        self.assertEqual((request.calls, client.retries), (1, 0))
+        self.assertEqual(client.breaker.state, 'closed')
+
+    async def test_slow_requests_are_cut_off_at_the_deadline(self):
+        client = OpenAITransport(max_attempts=5)
+
+        async def hang(**kwargs):
+            await asyncio.sleep(10)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await client.call(hang, deadline=0.05)
+        self.assertEqual(client.failures, 1)
+
+    async def test_breaker_fails_fast_then_lets_one_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+        client = OpenAITransport(breaker=breaker, max_attempts=1)
+        for _ in range(2):
+            with self.assertRaises(asyncio.TimeoutError):
+                await client.call(FlakyRequest(asyncio.TimeoutError()), deadline=1)
+
+        request = FlakyRequest()
+        with self.assertRaises(CircuitOpenError):
+            await client.call(request, deadline=1)
+        self.assertEqual((request.calls, breaker.state, breaker.rejected), (0, 'open', 1))
+
+        await asyncio.sleep(0.06)
+        self.assertEqual(breaker.state, 'half-open')
+        self.assertEqual(await client.call(request, deadline=1), 'ok')
+        self.assertEqual(breaker.state, 'closed')
+
+    async def test_failed_trial_reopens_the_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        client = OpenAITransport(breaker=breaker, max_attempts=1)
+        with self.assertRaises(asyncio.TimeoutError):
+            await client.call(FlakyRequest(asyncio.TimeoutError()), deadline=1)
+        await asyncio.sleep(0.06)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await client.call(FlakyRequest(asyncio.TimeoutError()), deadline=1)
+        self.assertEqual((breaker.state, breaker.times_opened), ('open', 2))
+
+    async def test_cancelled_trial_lets_the_next_call_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        client = OpenAITransport(breaker=breaker, max_attempts=1)
+        with self.assertRaises(asyncio.TimeoutError):
+            await client.call(FlakyRequest(asyncio.TimeoutError()), deadline=1)
+        await asyncio.sleep(0.06)
+
+        async def hang(**kwargs):
+            await asyncio.sleep(10)
+
+        trial = asyncio.create_task(client.call(hang, deadline=5))
+        await asyncio.sleep(0.01)
+        self.assertTrue(breaker.trial_in_flight)
+        trial.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await trial
+
+        self.assertEqual((breaker.state, breaker.trial_in_flight, breaker.times_opened), ('half-open', False, 1))
+        self.assertEqual(await client.call(FlakyRequest(), deadline=1), 'ok')
+        self.assertEqual(breaker.state, 'closed')
+
+
+class FallbackTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.original_client = intents._client
+        self.original_transport = intents.openai_transport
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        breaker.record_failure()
+        intents.openai_transport = OpenAITransport(breaker=breaker)
+        self.completions = FlakyRequest()
+        intents._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=self.completions)))
+        intents._intent_counts.clear()
+        intents._intent_cache.clear()
+        intents._chat_cache.clear()
+
+    async def asyncTearDown(self):
+        intents._client = self.original_client
+        intents.openai_transport = self.original_transport
+        intents._intent_counts.clear()
+
+    async def test_open_breaker_falls_back_to_the_rules(self):
+        intent, details = await intents.determine_intent('I need to see the doctor, remind me at 3')
+
+        self.assertEqual((intent, details), ('REMINDER', None))
+        self.assertEqual(self.completions.calls, 0)
+        self.assertEqual(intents.get_intent_stats()['fallback'], 1)
+
+    async def test_chat_says_reminders_still_work(self):
+        self.assertEqual(await intents.handle_chat('Recommend a book'), intents.CHAT_UNAVAILABLE_REPLY)
+        chunks = [chunk async for chunk in intents.stream_chat('Recommend a book')]
+        self.assertEqual(chunks, [intents.CHAT_UNAVAILABLE_REPLY])
+        self.assertEqual(self.completions.calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,312 @@
+import datetime
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import pytz
+
+from recurrence import localize, normalize_rule
+
+# Messages parsed at or above this confidence are scheduled without the LLM
+LOCAL_PARSE_THRESHOLD = 0.8
+
+# No "wed", "sat" or "sun": they are ordinary words too often ("sun cream")
+_WEEKDAYS = {
+    'monday': 0, 'mon': 0, 'tuesday': 1, 'tue': 1, 'tues': 1, 'wednesday': 2,
+    'thursday': 3, 'thu': 3, 'thurs': 3, 'friday': 4, 'fri': 4, 'saturday': 5, 'sunday': 6,
+}
+_MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3, 'apr': 4, 'april': 4, 'may': 5,
+    'jun': 6, 'june': 6, 'jul': 7, 'july': 7, 'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9,
+    'oct': 10, 'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12,
+}
+_NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'fifteen': 15, 'twenty': 20,
+    'thirty': 30, 'forty': 40, 'forty-five': 45, 'a couple of': 2, 'a few': 3,
+}
+# Default wall-clock hour for a part of the day without an explicit time
+_PART_OF_DAY_HOURS = {'morning': 9, 'afternoon': 15, 'evening': 18, 'night': 20, 'tonight': 20}
+# Hour used when a date is named without any time, e.g. "on Friday"
+DEFAULT_HOUR = 9
+DEFAULT_TEXT = 'Reminder'
+# Where a message asking for several reminders may be split
+_SPLIT_RE = re.compile(r'\s+and\s+(?:then\s+)?|\s*;\s*', re.IGNORECASE)
+
+_WEEKDAY_NAMES = '|'.join(sorted(_WEEKDAYS, key=len, reverse=True))
+_MONTH_NAMES = '|'.join(sorted(_MONTHS, key=len, reverse=True))
+_LONG_MONTH_NAMES = '|'.join(name for name in _MONTHS if len(name) > 3)
+_NUMBER = r'\d+|' + '|'.join(sorted(_NUMBER_WORDS, key=len, reverse=True))
+_UNITS = {'m': 'minute', 'min': 'minute', 'mins': 'minute', 'minute': 'minute', 'minutes': 'minute',
+          'h': 'hour', 'hr': 'hour', 'hrs': 'hour', 'hour': 'hour', 'hours': 'hour',
+          'd': 'day', 'day': 'day', 'days': 'day', 'w': 'week', 'wk': 'week', 'week': 'week', 'weeks': 'week'}
+_UNIT = '|'.join(sorted(_UNITS, key=len, reverse=True))
+
+
+def _compile(pattern: str) -> 're.Pattern[str]':
+    return re.compile(pattern, re.IGNORECASE)
+
+
+_LEAD_RE = _compile(
+    r"^\s*(?:(?:please|pls|hey zoey|zoey)[\s,]+)*"
+    r"(?:remind me|set (?:up )?(?:a |an )?reminder|add (?:a )?reminder|create (?:a )?reminder|"
+    r"don'?t let me forget|ping me|alert me|nudge me)\b[\s,:]*"
+)
+_REPEAT_EVERY_RE = _compile(rf'\bevery\s+({_NUMBER})\s+({_UNIT})\b')
+_REPEAT_WEEKDAY_RE = _compile(rf'\b(?:every|each)\s+({_WEEKDAY_NAMES})\b')
+_REPEAT_WORD_RE = _compile(r'\b(?:every\s+(day|week|hour|weekday)|(daily|weekly|hourly)|(?:on\s+)?(weekdays))\b')
+_RELATIVE_RE = _compile(
+    rf'\bin\s+(?:(half\s+an?\s+hour)|({_NUMBER})\s*({_UNIT})(?:\s+and\s+(?:a\s+)?(half|{_NUMBER})\s*({_UNIT})?)?)\b'
+)
+_ISO_DATE_RE = _compile(r'\b(?:on\s+)?(\d{4})-(\d{1,2})-(\d{1,2})\b')
+_SLASH_DATE_RE = _compile(r'\b(?:on\s+)?(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b')
+_MONTH_DAY_RE = _compile(rf'\b(?:on\s+)?({_MONTH_NAMES})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(\d{{4}}))?\b')
+_DAY_MONTH_RE = _compile(rf'\b(?:on\s+)?(?:the\s+)?(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH_NAMES})(?:,?\s+(\d{{4}}))?\b')
+_WEEKDAY_RE = _compile(rf'\b(?:on\s+)?(?:(this|next|coming)\s+)?({_WEEKDAY_NAMES})\b')
+_DAY_WORD_RE = _compile(r'\b(day after tomorrow|today|tonight|tomorrow|tmrw|tmr)\b')
+_PART_OF_DAY_RE = _compile(r'\b(?:(?:this|in the)\s+)?(morning|afternoon|evening|night)\b')
+_MERIDIEM_TIME_RE = _compile(r'\b(?:at\s+|by\s+|@\s*)?(\d{1,2})(?:[:.](\d{2}))?\s*([ap])\.?\s*m\b\.?')
+_CLOCK_TIME_RE = _compile(r'\b(?:at\s+|by\s+|@\s*)?([01]?\d|2[0-3]):([0-5]\d)\b')
+_NAMED_TIME_RE = _compile(r'\b(?:at\s+|by\s+)?(noon|midday|midnight)\b')
+_BARE_HOUR_RE = _compile(r"\b(?:at|by|@)\s*(\d{1,2})(?:\s*o'?clock)?\b(?!\s*(?:%|/|\.\d))")
+
+# Leftovers that suggest a time expression the rules did not understand
+_UNPARSED_TIME_RE = _compile(
+    rf"\d|\b(?:next|tomorrow|tonight|today|noon|midnight|o'?clock|am|pm|every|later|after|before|until|till|"
+    rf"minutes?|hours?|days?|weeks?|months?|years?|weekend|morning|afternoon|evening|"
+    rf"est|edt|cst|cdt|mst|mdt|pst|pdt|utc|gmt|{_WEEKDAY_NAMES}|{_LONG_MONTH_NAMES})\b"
+)
+_FILLER_START_RE = _compile(r'^(?:to|about|that|for|at|on|in|by|,|-|:)\s+')
+_FILLER_END_RE = _compile(r'\s+(?:at|on|in|by|for|and|from|,|-)$')
+
+
+@dataclass
+class ParsedReminder:
+    """A reminder read from a message without the LLM."""
+    text: str
+    when: datetime.datetime
+    repeat: Optional[str]
+    confidence: float
+
+
+class _Scanner:
+    """Holds the remaining message text; each take() cuts out what it matched."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def take(self, pattern: 're.Pattern[str]') -> Optional['re.Match[str]']:
+        match = pattern.search(self.text)
+        if match:
+            self.text = f'{self.text[:match.start()]} {self.text[match.end():]}'
+        return match
+
+
+def _number(text: str) -> int:
+    text = ' '.join(text.lower().split())
+    return int(text) if text.isdigit() else _NUMBER_WORDS[text]
+
+
+def _take_repeat(scanner: _Scanner) -> Tuple[Optional[str], Optional[int], Optional[datetime.timedelta]]:
+    """Return (canonical repeat rule, weekday it is pinned to, interval for minute/hour rules)."""
+    match = scanner.take(_REPEAT_EVERY_RE)
+    if match:
+        count, unit = _number(match.group(1)), _UNITS[match.group(2).lower()]
+        interval = datetime.timedelta(**{unit + 's': count}) if unit in ('minute', 'hour') else None
+        return normalize_rule(f'every {count} {unit}s'), None, interval
+    match = scanner.take(_REPEAT_WEEKDAY_RE)
+    if match:
+        return 'weekly', _WEEKDAYS[match.group(1).lower()], None
+    match = scanner.take(_REPEAT_WORD_RE)
+    if match:
+        word = (match.group(1) or match.group(2) or match.group(3)).lower()
+        rule = normalize_rule({'weekday': 'weekdays', 'day': 'daily', 'week': 'weekly', 'hour': 'hourly'}.get(word, word))
+        return rule, None, datetime.timedelta(hours=1) if rule == 'hourly' else None
+    return None, None, None
+
+
+def _take_relative(scanner: _Scanner) -> Optional[datetime.timedelta]:
+    match = scanner.take(_RELATIVE_RE)
+    if not match:
+        return None
+    if match.group(1):
+        return datetime.timedelta(minutes=30)
+    unit = _UNITS[match.group(3).lower()]
+    delta = datetime.timedelta(**{unit + 's': _number(match.group(2))})
+    extra, extra_unit = match.group(4), match.group(5)
+    if extra:
+        if extra.lower() == 'half':
+            delta += datetime.timedelta(**{unit + 's': 0.5})
+        else:
+            delta += datetime.timedelta(**{_UNITS[(extra_unit or 'minutes').lower()] + 's': _number(extra)})
+    return delta
+
+
+def _year_for(month: int, day: int, year: Optional[str], today: datetime.date) -> datetime.date:
+    if year:
+        value = int(year)
+        return datetime.date(value + 2000 if value < 100 else value, month, day)
+    candidate = datetime.date(today.year, month, day)
+    return candidate if candidate >= today else datetime.date(today.year + 1, month, day)
+
+
+def _take_date(scanner: _Scanner, today: datetime.date) -> Tuple[Optional[datetime.date], Optional[int], Optional[str]]:
+    """Return (explicit date, weekday, day word such as 'tonight' or 'next')."""
+    match = scanner.take(_ISO_DATE_RE)
+    if match:
+        return datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3))), None, None
+    match = scanner.take(_MONTH_DAY_RE)
+    if match:
+        return _year_for(_MONTHS[match.group(1).lower()], int(match.group(2)), match.group(3), today), None, None
+    match = scanner.take(_DAY_MONTH_RE)
+    if match:
+        return _year_for(_MONTHS[match.group(2).lower()], int(match.group(1)), match.group(3), today), None, None
+    match = scanner.take(_SLASH_DATE_RE)
+    if match:
+        return _year_for(int(match.group(1)), int(match.group(2)), match.group(3), today), None, None
+    match = scanner.take(_WEEKDAY_RE)
+    if match:
+        return None, _WEEKDAYS[match.group(2).lower()], (match.group(1) or '').lower() or None
+    match = scanner.take(_DAY_WORD_RE)
+    if match:
+        return None, None, match.group(1).lower()
+    return None, None, None
+
+
+def _take_time(scanner: _Scanner) -> Tuple[Optional[datetime.time], bool]:
+    """Return (time of day, whether am/pm had to be guessed)."""
+    match = scanner.take(_MERIDIEM_TIME_RE)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if not 1 <= hour <= 12 or minute > 59:
+            raise ValueError('Invalid 12-hour time')
+        hour = hour % 12 + (12 if match.group(3).lower() == 'p' else 0)
+        return datetime.time(hour, minute), False
+    match = scanner.take(_CLOCK_TIME_RE)
+    if match:
+        # "2:30" may mean 14:30; "02:30" and "14:30" are unambiguous
+        hour = int(match.group(1))
+        return datetime.time(hour, int(match.group(2))), 1 <= hour <= 12 and not match.group(1).startswith('0')
+    match = scanner.take(_NAMED_TIME_RE)
+    if match:
+        return datetime.time(0 if match.group(1).lower() == 'midnight' else 12), False
+    match = scanner.take(_BARE_HOUR_RE)
+    if match:
+        hour = int(match.group(1))
+        if hour > 23:
+            raise ValueError('Invalid hour')
+        return datetime.time(hour), hour <= 12
+    return None, False
+
+
+def _clean_text(text: str) -> str:
+    text = ' '.join(text.split()).strip(' ,.;:!-')
+    previous = None
+    while previous != text:
+        previous = text
+        text = _FILLER_END_RE.sub('', _FILLER_START_RE.sub('', text)).strip(' ,.;:!-')
+    return text[:1].upper() + text[1:] if text else DEFAULT_TEXT
+
+
+def parse_reminder(message: str, timezone='UTC', now: Optional[datetime.datetime] = None) -> Optional[ParsedReminder]:
+    """Read the text, fire time and repeat rule of a reminder from a message.
+
+    Understands relative offsets ("in 20 minutes", "in an hour and a half"),
+    weekdays, today/tonight/tomorrow, parts of the day, 12- and 24-hour clock
+    times, ISO, slash and month-name dates, and simple repeats ("every day",
+    "every Monday", "every 2 hours"). Returns None when the message has no
+    time the rules understand or names a time in the past; a low confidence
+    means leftover words look like a time expression the rules missed.
+    """
+    tz = pytz.timezone(timezone) if isinstance(timezone, str) else timezone
+    now = (now or datetime.datetime.now(pytz.UTC)).astimezone(tz)
+    today = now.date()
+    scanner = _Scanner(_LEAD_RE.sub('', message or '', count=1))
+    try:
+        repeat, repeat_weekday, interval = _take_repeat(scanner)
+        offset = _take_relative(scanner)
+        date, weekday, day_word = _take_date(scanner, today)
+        part_of_day = scanner.take(_PART_OF_DAY_RE)
+        time_of_day, guessed_meridiem = _take_time(scanner)
+    except (ValueError, KeyError):
+        return None
+
+    weekday = repeat_weekday if repeat_weekday is not None else weekday
+    part = part_of_day.group(1).lower() if part_of_day else ('tonight' if day_word == 'tonight' else None)
+    if offset is None and date is None and weekday is None and day_word is None and part is None and time_of_day is None:
+        if interval is None:
+            return None
+        # "every 2 hours" alone: the first one is an interval from now
+        offset = interval
+    if offset is not None and offset.days == 0 and (date or weekday is not None or day_word or part or time_of_day):
+        # "in 20 minutes at 5pm" contradicts itself
+        return None
+
+    confidence = 1.0
+    if offset is not None and time_of_day is None and part is None:
+        when = now + offset
+    else:
+        if time_of_day is None:
+            time_of_day = datetime.time(_PART_OF_DAY_HOURS.get(part, DEFAULT_HOUR))
+            if part is None:
+                confidence = 0.9
+        elif guessed_meridiem and time_of_day.hour < 12:
+            # "at 3": pm in the afternoon/evening, otherwise whichever 3 o'clock comes next
+            if part in ('afternoon', 'evening', 'night', 'tonight'):
+                time_of_day = time_of_day.replace(hour=time_of_day.hour + 12)
+                guessed_meridiem = False
+            else:
+                confidence = 0.85
+
+        if offset is not None:
+            day = today + datetime.timedelta(days=offset.days)
+        elif date is not None:
+            day = date
+        elif weekday is not None:
+            days_ahead = (weekday - today.weekday()) % 7
+            day = today + datetime.timedelta(days=days_ahead or (7 if day_word == 'next' else 0))
+        elif day_word in ('tomorrow', 'tmrw', 'tmr'):
+            day = today + datetime.timedelta(days=1)
+        elif day_word == 'day after tomorrow':
+            day = today + datetime.timedelta(days=2)
+        else:
+            day = today
+
+        when = localize(tz, datetime.datetime.combine(day, time_of_day))
+        if guessed_meridiem and time_of_day.hour < 12 and when <= now:
+            # "at 12" is read as noon, so only 1-11 have a later pm reading
+            afternoon = localize(tz, datetime.datetime.combine(day, time_of_day.replace(hour=time_of_day.hour + 12)))
+            if afternoon > now:
+                when = afternoon
+        if when <= now and offset is None and date is None and day_word in (None, 'today', 'tonight', 'this', 'coming'):
+            # A time that already passed today means the next one; a weekday means next week
+            step = 7 if weekday is not None else 1
+            when = localize(tz, datetime.datetime.combine(day + datetime.timedelta(days=step), when.time().replace(tzinfo=None)))
+        if repeat == 'weekdays':
+            while when.weekday() >= 5:
+                when = localize(tz, datetime.datetime.combine(when.date() + datetime.timedelta(days=1), when.time().replace(tzinfo=None)))
+
+    if when <= now:
+        return None
+    text = _clean_text(scanner.text)
+    if _UNPARSED_TIME_RE.search(text):
+        confidence = min(confidence, 0.5)
+    return ParsedReminder(text, when, repeat, confidence)
+
+
+def parse_reminders(message: str, timezone='UTC', now: Optional[datetime.datetime] = None) -> List[ParsedReminder]:
+    """Like parse_reminder, for messages that may ask for several reminders.
+
+    "Take out the trash at 7 and call mom at 8" is split at "and" (or ";")
+    only when every part confidently reads as a reminder with its own text
+    and time, so "call mom and dad at 5" stays one reminder. Returns an
+    empty list when nothing was understood.
+    """
+    parts = [part for part in _SPLIT_RE.split(message or '') if part.strip()]
+    if len(parts) > 1:
+        parsed = [parse_reminder(part, timezone, now) for part in parts]
+        if all(item is not None and item.confidence >= LOCAL_PARSE_THRESHOLD and item.text != DEFAULT_TEXT
+               for item in parsed):
+            return parsed
+    single = parse_reminder(message, timezone, now)
+    return [single] if single is not None else []
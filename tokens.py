@@ -0,0 +1,43 @@
+import math
+import os
+import re
+from typing import Dict, Iterable
+
+# English text averages about four characters per token with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+# Role and separator tokens the chat format adds to every message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Tokens that prime the assistant's reply
+REPLY_PRIMING_TOKENS = 3
+# Tokens reserved for the running summary of older chat turns, out of memory's CONVERSATION_TOKEN_BUDGET
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv('CONVERSATION_SUMMARY_TOKENS', '200'))
+_PIECE_RE = re.compile(r'\w+|[^\w\s]')
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of `text` without a tokenizer.
+
+    Takes the larger of characters / CHARS_PER_TOKEN and the number of words
+    and punctuation marks, so short punctuated text is not underestimated.
+    """
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / CHARS_PER_TOKEN), len(_PIECE_RE.findall(text)))
+
+
+def estimate_message_tokens(messages: Iterable[Dict[str, str]]) -> int:
+    """Approximate prompt tokens for a list of chat messages."""
+    return REPLY_PRIMING_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get('content') or '') for message in messages
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Cut `text` to roughly `max_tokens`, keeping the start (or the end with keep_end)."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, max_tokens * CHARS_PER_TOKEN - 1)
+    cut = text[-limit:] if keep_end else text[:limit]
+    while cut and estimate_tokens(cut) + 1 > max_tokens:
+        cut = cut[len(cut) // 10 + 1:] if keep_end else cut[:-(len(cut) // 10 + 1)]
+    return '…' + cut if keep_end else cut + '…'
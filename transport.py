@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
+
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '20'))
+OPENAI_MAX_KEEPALIVE = int(os.getenv('OPENAI_MAX_KEEPALIVE', '10'))
+OPENAI_KEEPALIVE_SECONDS = float(os.getenv('OPENAI_KEEPALIVE_SECONDS', '90'))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', '5'))
+# Backstop for a single HTTP read; callers pass tighter per-call deadlines
+OPENAI_READ_TIMEOUT = float(os.getenv('OPENAI_READ_TIMEOUT', '30'))
+OPENAI_MAX_ATTEMPTS = int(os.getenv('OPENAI_MAX_ATTEMPTS', '3'))
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 4.0
+# Consecutive failures that open the breaker, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('OPENAI_BREAKER_FAILURES', '5'))
+BREAKER_RESET_SECONDS = float(os.getenv('OPENAI_BREAKER_RESET_SECONDS', '30'))
+DEFAULT_DEADLINE_SECONDS = 20.0
+# Append every completion request and response to this JSONL file, for
+# benchmarks/replay.py. It contains users' messages, so only set it for capture sessions.
+OPENAI_RECORD_PATH = os.getenv('OPENAI_RECORD_PATH')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling OpenAI while the circuit breaker is open."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx are worth retrying; other 4xx are not."""
+    if isinstance(exc, (asyncio.TimeoutError, APIConnectionError, RateLimitError, InternalServerError)):
+        return True
+    return isinstance(exc, APIStatusError) and exc.status_code >= 500
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, 'response', None)
+    value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _dump(obj) -> Any:
+    return obj.model_dump(mode='json', exclude_none=True) if hasattr(obj, 'model_dump') else obj
+
+
+class CompletionRecorder:
+    """Writes {"request": ..., "response": ...} lines; streams are written as "chunks" once they end."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.recorded = 0
+
+    def _write(self, entry: Dict[str, Any]):
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps(entry, default=str) + '\n')
+        self.recorded += 1
+
+    def capture(self, request: Dict[str, Any], result: Any) -> Any:
+        """Record `result` for `request` and return it (wrapped, if it is a stream)."""
+        if request.get('stream'):
+            return self._capture_stream(request, result)
+        self._write({'request': request, 'response': _dump(result)})
+        return result
+
+    async def _capture_stream(self, request: Dict[str, Any], stream):
+        chunks = []
+        async for chunk in stream:
+            chunks.append(_dump(chunk))
+            yield chunk
+        self._write({'request': request, 'chunks': chunks})
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and fails fast for `reset_seconds`.
+
+    After that one trial call is let through (half-open): success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half-open' and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_in_flight or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self.times_opened += 1
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a trial call that ended without a result (it was cancelled), so another may run."""
+        self.trial_in_flight = False
+
+
+class OpenAITransport:
+    """Shared OpenAI client on a tuned httpx pool, with deadlines, retries and a circuit breaker.
+
+    call() runs one API request: the breaker is checked first, retryable
+    errors are retried with jittered exponential backoff (honouring
+    Retry-After) until the attempts or the deadline run out, and the result
+    feeds the breaker. While the breaker is open, call() raises
+    CircuitOpenError at once so callers can use their local fallbacks.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = OPENAI_BASE_URL,
+                 breaker: Optional[CircuitBreaker] = None, max_attempts: int = OPENAI_MAX_ATTEMPTS,
+                 record_path: Optional[str] = OPENAI_RECORD_PATH):
+        self._api_key = api_key
+        self._base_url = base_url
+        self.breaker = breaker or CircuitBreaker()
+        self.max_attempts = max(1, max_attempts)
+        self.recorder = CompletionRecorder(record_path) if record_path else None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncOpenAI] = None
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+                    keepalive_expiry=OPENAI_KEEPALIVE_SECONDS,
+                ),
+                timeout=httpx.Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+            )
+        return self._http
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            # Retries are done by call() so they share the deadline and the breaker
+            self._client = AsyncOpenAI(
+                api_key=self._api_key or os.getenv('OPENAI_API_KEY'),
+                base_url=self._base_url,
+                http_client=self.http_client,
+                max_retries=0,
+            )
+        return self._client
+
+    async def call(self, request: Callable[..., Awaitable[Any]], *args,
+                   deadline: float = DEFAULT_DEADLINE_SECONDS, **kwargs) -> Any:
+        """Run `request(*args, **kwargs)` within `deadline` seconds, retrying transient failures."""
+        trial = self.breaker.state == 'half-open'
+        if not self.breaker.allow():
+            raise CircuitOpenError('OpenAI circuit breaker is open')
+        self.calls += 1
+        expires = time.monotonic() + deadline
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                remaining = expires - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    result = await asyncio.wait_for(request(*args, **kwargs), timeout=remaining)
+                except Exception as exc:
+                    if not is_retryable(exc):
+                        # A 4xx answer (or a local bug) says nothing about the service's health
+                        self.breaker.record_success()
+                        raise
+                    delay = _retry_after(exc)
+                    if delay is None:
+                        delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+                    if attempt >= self.max_attempts or time.monotonic() + delay >= expires:
+                        self.failures += 1
+                        self.breaker.record_failure()
+                        raise
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+                else:
+                    self.breaker.record_success()
+                    if self.recorder is not None:
+                        return self.recorder.capture(kwargs, result)
+                    return result
+        except BaseException:
+            if trial and self.breaker.trial_in_flight:
+                # Cancelled before an answer: neither a success nor a failure
+                self.breaker.release_trial()
+            raise
+
+    async def warmup(self, timeout: float = 5.0):
+        """Open a keep-alive connection (DNS, TCP and TLS) so the first message does not pay for it."""
+        try:
+            await self.http_client.get(self._base_url.rstrip('/') + '/models', timeout=timeout,
+                                       headers={'Authorization': f"Bearer {self._api_key or os.getenv('OPENAI_API_KEY', '')}"})
+        except Exception as exc:
+            print(f"OpenAI warmup failed: {exc}")
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'failures': self.failures,
+            'breaker_state': self.breaker.state,
+            'breaker_opened': self.breaker.times_opened,
+            'breaker_rejected': self.breaker.rejected,
+        }